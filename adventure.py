@@ -1,11 +1,34 @@
+import asyncio
+import copy
 import random
 import time
 import sys
-import os
-from typing import Dict, List, Optional
+from array import array
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Mapping, Optional, Set, Tuple
+
+import loot
+import metrics
+import quests
+import render
+import routes
+from render import Colors
+from world import World, load_world
+
+ENCOUNTER_CHANCE = 0.3
+ESCAPE_CHANCE = 0.4
+LOOT_CHANCE = 0.7
+EXPERIENCE_REWARD = (20, 50)
+GOLD_REWARD = (10, 30)
+POTION_HEALING = {
+    "small_potion": 20,
+    "medium_potion": 50,
+    "large_potion": 100
+}
 
 def clear_screen():
-    os.system('cls' if os.name == 'nt' else 'clear')
+    sys.stdout.write(render.CLEAR)
+    sys.stdout.flush()
 
 def print_slow(text: str, delay: float = 0.03):
     for char in text:
@@ -14,44 +37,216 @@ def print_slow(text: str, delay: float = 0.03):
         time.sleep(delay)
     print()
 
-class Colors:
-    HEADER = '\033[95m'
-    BLUE = '\033[94m'
-    GREEN = '\033[92m'
-    YELLOW = '\033[93m'
-    RED = '\033[91m'
-    ENDC = '\033[0m'
-    BOLD = '\033[1m'
+class ConsoleIO:
+    def __init__(self, typewriter: bool = True):
+        self.typewriter = typewriter
+
+    async def input(self, prompt: str = "") -> str:
+        return input(prompt)
+
+    def print(self, text: str = ""):
+        print(text)
+
+    def write(self, text: str):
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+    async def print_slow(self, text: str, delay: float = 0.03):
+        if self.typewriter:
+            print_slow(text, delay)
+        else:
+            self.write(text + "\n")
+
+    async def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+    def clear(self):
+        clear_screen()
+
+class NullIO:
+    typewriter = False
+
+    async def input(self, prompt: str = "") -> str:
+        raise EOFError
+
+    def print(self, text: str = ""):
+        pass
+
+    def write(self, text: str):
+        pass
+
+    async def print_slow(self, text: str, delay: float = 0.03):
+        pass
+
+    async def sleep(self, seconds: float):
+        pass
+
+    def clear(self):
+        pass
 
 class Item:
+    __slots__ = ("id", "key", "name", "description", "value", "damage")
+
     def __init__(self, name: str, description: str, value: int = 0, damage: int = 0):
+        self.id = -1
+        self.key = ""
         self.name = name
         self.description = description
         self.value = value
         self.damage = damage
 
 class Enemy:
-    def __init__(self, name: str, health: int, damage: int, loot: List[str]):
+    __slots__ = ("id", "key", "name", "health", "damage", "boss")
+
+    def __init__(self, name: str, health: int, damage: int, boss: bool = False):
+        self.id = -1
+        self.key = ""
         self.name = name
         self.health = health
         self.damage = damage
-        self.loot = loot
+        self.boss = boss
+
+def _register(table: Dict[str, object]) -> Dict[str, object]:
+    for i, (key, entry) in enumerate(table.items()):
+        entry.id = i
+        entry.key = key
+    return table
+
+# Shared by every Game in the process; look entries up by key or by their small integer id.
+_ITEMS: Dict[str, Item] = _register({
+    "rusty_sword": Item("Rusty Sword", "An old but serviceable blade", 10, 5),
+    "steel_sword": Item("Steel Sword", "A well-crafted weapon", 50, 10),
+    "magic_cutlass": Item("Magic Cutlass", "A powerful enchanted blade", 200, 20),
+    "small_potion": Item("Small Health Potion", "Restores 20 HP", 10),
+    "medium_potion": Item("Medium Health Potion", "Restores 50 HP", 25),
+    "large_potion": Item("Large Health Potion", "Restores 100 HP", 50),
+    "compass": Item("Golden Compass", "Points to mysterious locations", 100),
+    "treasure_map": Item("Ancient Map", "Shows the way to great treasure", 150),
+    "spectral_key": Item("Spectral Key", "Opens supernatural locks", 300),
+    "ghost_essence": Item("Ghost Essence", "Mysterious ethereal substance", 200),
+    "kraken_tentacle": Item("Kraken Tentacle", "A powerful magical ingredient", 400),
+    "ocean_pearl": Item("Ocean Pearl", "A rare and valuable gem", 500),
+    "treasure": Item("Legendary Treasure", "Riches beyond imagining", 1000)
+})
+ITEMS: Mapping[str, Item] = MappingProxyType(_ITEMS)
+ITEM_KEYS: List[str] = list(_ITEMS)
+ITEM_IDS: Dict[str, int] = {key: item.id for key, item in _ITEMS.items()}
+
+ENEMIES: Mapping[str, Enemy] = MappingProxyType(_register({
+    "rookie_pirate": Enemy("Rookie Pirate", 30, 5),
+    "seasoned_pirate": Enemy("Seasoned Pirate", 50, 10),
+    "pirate_captain": Enemy("Pirate Captain", 100, 15, boss=True),
+    "ghost_pirate": Enemy("Ghost Pirate", 80, 20),
+    "kraken_spawn": Enemy("Kraken Spawn", 120, 25, boss=True)
+}))
+ENEMY_KEYS: List[str] = list(ENEMIES)
+
+def register_item(key: str) -> int:
+    """The item's registry id, registering it first if it's new.
+
+    Worlds loaded from data can mention items the built-in registry doesn't know. The registry only
+    grows, by one entry per distinct item name, so only adding an item or loading a world registers
+    one; looking items up (`in`, `count`) never does.
+    """
+    item = _ITEMS.get(key)
+    if item is None:
+        item = _ITEMS[key] = Item(key.replace("_", " ").title(), "")
+        item.id = ITEM_IDS[key] = len(ITEM_KEYS)
+        item.key = key
+        ITEM_KEYS.append(key)
+    return item.id
+
+# Counts are unsigned 16-bit.
+MAX_STACK = 0xFFFF
+
+class Inventory:
+    """Item counts by registry id, plus the set of ids held, so walking it skips everything else."""
+    __slots__ = ("counts", "held", "size")
+
+    def __init__(self):
+        self.counts = array("H", bytes(2 * len(ITEM_KEYS)))
+        self.held: Set[int] = set()
+        self.size = 0
+
+    def __contains__(self, key: str) -> bool:
+        i = ITEM_IDS.get(key, len(self.counts))
+        return i < len(self.counts) and self.counts[i] > 0
+
+    def __iter__(self) -> Iterator[str]:
+        counts = self.counts
+        for i in sorted(self.held):
+            for _ in range(counts[i]):
+                yield ITEM_KEYS[i]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def count(self, key: str) -> int:
+        i = ITEM_IDS.get(key, len(self.counts))
+        return self.counts[i] if i < len(self.counts) else 0
+
+    def add(self, key: str):
+        i = register_item(key)
+        if i >= len(self.counts):
+            self.counts.extend(bytes(2 * (i + 1 - len(self.counts))))
+        if self.counts[i] == MAX_STACK:
+            raise ValueError(f"can't hold more than {MAX_STACK} of {key}")
+        self.counts[i] += 1
+        self.held.add(i)
+        self.size += 1
+
+    def remove(self, key: str):
+        if key not in self:
+            raise ValueError(f"{key} not in inventory")
+        i = ITEM_IDS[key]
+        self.counts[i] -= 1
+        if not self.counts[i]:
+            self.held.discard(i)
+        self.size -= 1
+
+    def fork(self) -> "Inventory":
+        child = Inventory.__new__(Inventory)
+        child.counts = self.counts[:]
+        child.held = set(self.held)
+        child.size = self.size
+        return child
+
+    def state(self) -> Dict[str, int]:
+        return {ITEM_KEYS[i]: self.counts[i] for i in sorted(self.held)}
+
+    def restore(self, state: Mapping[str, int]):
+        self.counts = array("H", bytes(2 * len(ITEM_KEYS)))
+        self.held = set()
+        self.size = 0
+        for key, count in state.items():
+            for _ in range(count):
+                self.add(key)
 
 class Player:
+    __slots__ = ("health", "max_health", "gold", "inventory", "current_location", "level",
+                 "experience", "experience_to_level", "base_damage", "equipped_weapon")
+    # Everything but the inventory, which saves itself.
+    FIELDS = tuple(field for field in __slots__ if field != "inventory")
+
     def __init__(self):
         self.health = 100
         self.max_health = 100
         self.gold = 0
-        self.inventory: List[str] = []
+        self.inventory = Inventory()
         self.current_location = "dock"
-        self.has_map = False
-        self.has_key = False
         self.level = 1
         self.experience = 0
         self.experience_to_level = 100
         self.base_damage = 10
         self.equipped_weapon: Optional[str] = None
 
+    def fork(self) -> "Player":
+        child = Player.__new__(Player)
+        for field in Player.FIELDS:
+            setattr(child, field, getattr(self, field))
+        child.inventory = self.inventory.fork()
+        return child
+
     def level_up(self):
         self.level += 1
         self.max_health += 20
@@ -68,47 +263,102 @@ class Player:
         return ""
 
     def get_total_damage(self) -> int:
-        weapon_damage = 0
-        if self.equipped_weapon == "rusty_sword":
-            weapon_damage = 5
-        elif self.equipped_weapon == "steel_sword":
-            weapon_damage = 10
-        elif self.equipped_weapon == "magic_cutlass":
-            weapon_damage = 20
-        return self.base_damage + weapon_damage
+        weapon = ITEMS.get(self.equipped_weapon) if self.equipped_weapon else None
+        return self.base_damage + (weapon.damage if weapon else 0)
+
+class Fight:
+    def __init__(self, game: "Game", enemy_type: str):
+        self.game = game
+        self.player = game.player
+        self.enemy_type = enemy_type
+        self.enemy = game.enemies[enemy_type]
+        # In a shared world this is the enemy everyone at the location is fighting.
+        self.foe = game.world.engage(self.player.current_location, enemy_type, self.enemy.health)
+        self.enemy_health = self.foe.health if self.foe else self.enemy.health
+        # Whether this player struck the killing blow; a shared enemy can also fall to someone else's.
+        self.won = False
+
+    def slain_by_other(self) -> bool:
+        """Whether a shared enemy has fallen to someone else's blow, which ends the fight with nothing won.
+
+        Others fight it while this player decides, so this is checked before every round.
+        """
+        if self.foe and not self.won:
+            self.enemy_health = self.foe.health
+            return self.enemy_health <= 0
+        return False
+
+    def attack(self) -> Tuple[int, int]:
+        if self.slain_by_other():
+            return 0, 0
+        damage = self.player.get_total_damage()
+        if self.foe:
+            self.won = self.game.world.hit(self.player.current_location, self.enemy_type, self.foe, damage)
+            self.enemy_health = self.foe.health
+        else:
+            self.enemy_health -= damage
+            self.won = self.enemy_health <= 0
+        player_damage = 0
+        if self.enemy_health > 0:
+            player_damage = self.enemy.damage
+            self.player.health -= player_damage
+        return damage, player_damage
+
+    def flee(self) -> bool:
+        if self.slain_by_other():
+            # Nothing left to run from.
+            return True
+        if self.game.rng.random() < ESCAPE_CHANCE:
+            return True
+        self.player.health -= self.enemy.damage
+        return False
+
+    def victory(self) -> Tuple[int, str, int, List[str]]:
+        rng = self.game.rng
+        if self.enemy.boss:
+            self.game.world.defeat(self.player.current_location, self.enemy_type)
+        exp_gain = rng.randint(*EXPERIENCE_REWARD)
+        level_up_message = self.player.gain_experience(exp_gain)
+        if level_up_message and metrics.active:
+            metrics.active.level_ups.inc()
+        gold_reward = rng.randint(*GOLD_REWARD) * self.player.level
+        self.player.gold += gold_reward
+
+        drops = self.game.loot.roll(rng, self.enemy_type, self.player.current_location, self.player.level,
+                                    self.player.inventory, self.game.pity)
+        for item in drops:
+            self.player.inventory.add(item)
+        self.game.quest_event(quests.DEFEAT, self.enemy_type)
+        for item in drops:
+            self.game.quest_event(quests.PICKUP, item)
+        return exp_gain, level_up_message, gold_reward, drops
 
 class Game:
-    def __init__(self):
+    def __init__(self, io=None, world: Optional[World] = None, rng: Optional[random.Random] = None,
+                 quest_book: Optional[quests.QuestBook] = None, loot_book: Optional[loot.LootBook] = None):
+        self.io = io or ConsoleIO()
+        self.rng = rng or random.Random()
+        # A World, MappedWorld or SharedWorld; each gives the session its own view of it.
+        self.world = (world or DEFAULT_WORLD).session()
         self.player = Player()
         self.game_running = True
-        self.quest_log: List[str] = []
-        self.enemies = self._initialize_enemies()
-        self.items = self._initialize_items()
-
-    def _initialize_enemies(self) -> Dict[str, Enemy]:
-        return {
-            "rookie_pirate": Enemy("Rookie Pirate", 30, 5, ["rusty_sword", "small_potion"]),
-            "seasoned_pirate": Enemy("Seasoned Pirate", 50, 10, ["steel_sword", "medium_potion"]),
-            "pirate_captain": Enemy("Pirate Captain", 100, 15, ["magic_cutlass", "large_potion", "treasure_map"]),
-            "ghost_pirate": Enemy("Ghost Pirate", 80, 20, ["spectral_key", "ghost_essence"]),
-            "kraken_spawn": Enemy("Kraken Spawn", 120, 25, ["kraken_tentacle", "ocean_pearl"])
-        }
-
-    def _initialize_items(self) -> Dict[str, Item]:
-        return {
-            "rusty_sword": Item("Rusty Sword", "An old but serviceable blade", 10, 5),
-            "steel_sword": Item("Steel Sword", "A well-crafted weapon", 50, 10),
-            "magic_cutlass": Item("Magic Cutlass", "A powerful enchanted blade", 200, 20),
-            "small_potion": Item("Small Health Potion", "Restores 20 HP", 10),
-            "medium_potion": Item("Medium Health Potion", "Restores 50 HP", 25),
-            "large_potion": Item("Large Health Potion", "Restores 100 HP", 50),
-            "compass": Item("Golden Compass", "Points to mysterious locations", 100),
-            "treasure_map": Item("Ancient Map", "Shows the way to great treasure", 150),
-            "spectral_key": Item("Spectral Key", "Opens supernatural locks", 300),
-            "ghost_essence": Item("Ghost Essence", "Mysterious ethereal substance", 200),
-            "kraken_tentacle": Item("Kraken Tentacle", "A powerful magical ingredient", 400),
-            "ocean_pearl": Item("Ocean Pearl", "A rare and valuable gem", 500)
-        }
+        self.quests = quests.QuestLog(quest_book or DEFAULT_QUESTS)
+        # Active quests by title.
+        self.quest_log = self.quests.active
+        self.loot = loot_book or DEFAULT_LOOT
+        # Kills since each pity-protected loot table last paid out, by table name.
+        self.pity: Dict[str, int] = {}
+        # Optional saves.Journal; every state-changing action is appended to it.
+        self.journal = None
+        # Seconds spent waiting for the player (counted by metrics.TimingIO), so timings can leave it out.
+        self.waited = 0.0
+        # Optional leaderboard.Leaderboard; the run is recorded there when the game ends.
+        self.leaderboard = None
+        self.captain: Optional[str] = None
+        self.turns_taken = 0
+        self.started = time.time()
+        self.enemies = ENEMIES
+        self.items = ITEMS
         
     ASCII_ART = {
         "ship": r"""
@@ -195,13 +445,15 @@ class Game:
             "description": "A mysterious island shrouded in legends of buried treasure.",
             "connections": ["ship", "cave", "jungle"],
             "items": ["treasure_map"],
-            "enemies": ["ghost_pirate"]
+            "enemies": ["ghost_pirate"],
+            "requires": "compass"
         },
         "cave": {
             "description": "A dark cave with ancient markings and the echoes of the ocean.",
             "connections": ["island", "treasure_room"],
             "items": ["spectral_key"],
-            "enemies": ["pirate_captain"]
+            "enemies": ["pirate_captain"],
+            "requires": "treasure_map"
         },
         "alley": {
             "description": "A dangerous back alley where cutthroats and thieves lurk in shadows.",
@@ -249,335 +501,523 @@ class Game:
             "description": "A grand chamber filled with unimaginable riches.",
             "connections": ["cave"],
             "items": ["treasure"],
-            "enemies": []
+            "enemies": [],
+            "requires": "spectral_key"
         }
     }
 
+    # Drops per enemy: a "chance" roll, then one of "drops" picked by weight. Tables can also
+    # have "guaranteed" drops, weights that grow by "per_level" for each player level above the
+    # first, and a "pity" count that guarantees a drop after that many kills without one; an
+    # optional "locations" section adds tables for kills at particular places. The defaults are
+    # the original drops: a 70% chance of one item, each equally likely.
+    LOOT = {
+        "enemies": {
+            "rookie_pirate": {"chance": LOOT_CHANCE, "drops": {"rusty_sword": 1, "small_potion": 1}},
+            "seasoned_pirate": {"chance": LOOT_CHANCE, "drops": {"steel_sword": 1, "medium_potion": 1}},
+            "pirate_captain": {"chance": LOOT_CHANCE, "drops": {"magic_cutlass": 1, "large_potion": 1,
+                                                                "treasure_map": 1}},
+            "ghost_pirate": {"chance": LOOT_CHANCE, "drops": {"spectral_key": 1, "ghost_essence": 1}},
+            "kraken_spawn": {"chance": LOOT_CHANCE, "drops": {"kraken_tentacle": 1, "ocean_pearl": 1}}
+        }
+    }
+
+    # Triggers are [event, key] pairs: "enter" a location, "pickup" an item, "defeat" an
+    # enemy, or reach a "gold" amount. The two original quests can be taken again.
+    QUESTS = {
+        "Find the ghost ship": {
+            "start": ["enter", "tavern"],
+            "complete": ["enter", "ghost_ship"],
+            "gold": 200,
+            "repeatable": True
+        },
+        "Explore the temple ruins": {
+            "start": ["enter", "island"],
+            "complete": ["enter", "temple_ruins"],
+            "gold": 300,
+            "repeatable": True
+        }
+    }
+
+    def fork(self, io=None, rng: Optional[random.Random] = None) -> "Game":
+        """A copy of this game to try things out in, playing silently unless given an io.
+
+        World data, quest and loot tables and the registries are shared; only the player, the
+        quest log and this session's world changes are copied, so the cost doesn't grow with
+        the world. Without `rng` the fork carries on this game's random stream.
+        """
+        child = copy.copy(self)
+        child.io = io or NullIO()
+        if rng is None:
+            # Skip seeding from the OS; setstate() overwrites it anyway.
+            rng = random.Random.__new__(random.Random)
+            rng.setstate(self.rng.getstate())
+        child.rng = rng
+        child.world = self.world.fork()
+        child.player = self.player.fork()
+        child.quests = self.quests.fork()
+        child.quest_log = child.quests.active
+        child.pity = dict(self.pity)
+        child.journal = None
+        child.leaderboard = None
+        child.waited = 0.0
+        return child
+
+    def snapshot(self) -> dict:
+        player = self.player
+        state = {field: getattr(player, field) for field in Player.FIELDS}
+        state["inventory"] = player.inventory.state()
+        state["world"] = self.world.state()
+        state["quests"] = self.quests.state()
+        state["pity"] = dict(self.pity)
+        return state
+
+    def restore(self, state: dict):
+        player = self.player
+        for field in Player.FIELDS:
+            setattr(player, field, state[field])
+        player.inventory.restore(state["inventory"])
+        self.world.restore(state["world"])
+        self.quests.restore(state["quests"])
+        self.quest_log = self.quests.active
+        self.pity = dict(state.get("pity", {}))
+
+    def save(self, event: str, key=None):
+        if self.journal is not None:
+            self.journal.record(self, event, key)
+
     def display_status_bar(self):
-        health_percentage = (self.player.health / self.player.max_health) * 20
-        health_bar = "█" * int(health_percentage) + "░" * (20 - int(health_percentage))
-        exp_percentage = (self.player.experience / self.player.experience_to_level) * 20
-        exp_bar = "█" * int(exp_percentage) + "░" * (20 - int(exp_percentage))
-        
-        print(f"\n{Colors.BOLD}{'='*60}{Colors.ENDC}")
-        print(f"{Colors.BOLD}Level: {self.player.level} | Gold: {self.player.gold}{Colors.ENDC}")
-        print(f"{Colors.RED}Health: [{health_bar}] {self.player.health}/{self.player.max_health}{Colors.ENDC}")
-        print(f"{Colors.BLUE}EXP:    [{exp_bar}] {self.player.experience}/{self.player.experience_to_level}{Colors.ENDC}")
-        print(f"{Colors.BOLD}{'='*60}{Colors.ENDC}\n")
+        self.io.write(render.status_bar(self.player))
 
-    def display_location(self):
-        clear_screen()
-        self.display_status_bar()
-        location = self.LOCATIONS[self.player.current_location]
-        
-        print(f"{Colors.BOLD}{Colors.YELLOW}Location: {self.player.current_location.upper()}{Colors.ENDC}")
-        print_slow(f"{Colors.BLUE}{location['description']}{Colors.ENDC}")
+    async def _timed(self, histogram, label, awaitable):
+        started, waited = time.perf_counter(), self.waited
+        result = await awaitable
+        histogram.observe(time.perf_counter() - started - (self.waited - waited), label)
+        return result
+
+    async def display_location(self):
+        m = metrics.active
+        started = time.perf_counter() if m else 0.0
+        if self.io.typewriter:
+            head, description, tail = render.location_frame(self)
+            self.io.write(render.CLEAR + head)
+            if m:
+                # The typewriter's deliberate delays aren't render cost.
+                m.render_seconds.observe(time.perf_counter() - started)
+            await self.io.print_slow(description)
+            self.io.write(tail)
+        else:
+            self.io.write(render.frame(self))
+            if m:
+                m.render_seconds.observe(time.perf_counter() - started)
+
+    async def handle_combat(self, enemy_type: str):
+        fight = Fight(self, enemy_type)
+        enemy = fight.enemy
+        self.io.print(f"\n{Colors.RED}A {enemy.name} appears!{Colors.ENDC}")
+        self.io.print(self.ASCII_ART["skull"])
         
-        if self.player.current_location in self.ASCII_ART:
-            print(f"{Colors.GREEN}{self.ASCII_ART[self.player.current_location]}{Colors.ENDC}")
+        while fight.enemy_health > 0 and self.player.health > 0:
+            self.io.print(f"\n{Colors.RED}Enemy Health: {fight.enemy_health}/{enemy.health}{Colors.ENDC}")
+            action = (await self.io.input(f"\n{Colors.YELLOW}What do you do? (attack/use_potion/run/hint):{Colors.ENDC} ")).lower()
+            m = metrics.active
+            combat_round = self.combat_round(fight, action)
+            if m:
+                combat_round = self._timed(m.combat_round_seconds, enemy_type, combat_round)
+            result = await combat_round
+            if result is not None:
+                return result
             
-        print(f"\n{Colors.YELLOW}Paths:{Colors.ENDC} {', '.join(location['connections'])}")
-        if location['items']:
-            print(f"{Colors.GREEN}Items here:{Colors.ENDC} {', '.join(location['items'])}")
-        if self.player.inventory:
-            print(f"{Colors.BLUE}Inventory:{Colors.ENDC} {', '.join(self.player.inventory)}")
-        if self.quest_log:
-            print(f"\n{Colors.YELLOW}Active Quests:{Colors.ENDC}")
-            for quest in self.quest_log:
-                print(f"- {quest}")
-
-    def handle_combat(self, enemy_type: str):
-        enemy = self.enemies[enemy_type]
-        enemy_current_health = enemy.health
-        print(f"\n{Colors.RED}A {enemy.name} appears!{Colors.ENDC}")
-        print(self.ASCII_ART["skull"])
-        
-        while enemy_current_health > 0 and self.player.health > 0:
-            print(f"\n{Colors.RED}Enemy Health: {enemy_current_health}/{enemy.health}{Colors.ENDC}")
-            action = input(f"\n{Colors.YELLOW}What do you do? (attack/use_potion/run):{Colors.ENDC} ").lower()
+        if self.player.health <= 0:
+            self.io.print(f"\n{Colors.RED}You have been defeated...{Colors.ENDC}")
+            self.game_running = False
+            if metrics.active:
+                metrics.active.deaths.inc(self.player.current_location)
+            return False
+
+    async def combat_round(self, fight: Fight, action: str) -> Optional[bool]:
+        # None while the fight goes on; otherwise what handle_combat() returns.
+        enemy = fight.enemy
+        if fight.slain_by_other():
+            self.io.print(f"\n{Colors.YELLOW}Another captain struck down the {enemy.name} first.{Colors.ENDC}")
+            return False
+        if action == "attack":
+            damage, player_damage = fight.attack()
+            self.io.print(f"\n{Colors.GREEN}You dealt {damage} damage to the {enemy.name}!{Colors.ENDC}")
             
-            if action == "attack":
-                damage = self.player.get_total_damage()
-                enemy_current_health -= damage
-                print(f"\n{Colors.GREEN}You dealt {damage} damage to the {enemy.name}!{Colors.ENDC}")
+            if player_damage:
+                self.io.print(f"{Colors.RED}The {enemy.name} hit you for {player_damage} damage!{Colors.ENDC}")
                 
-                if enemy_current_health > 0:
-                    player_damage = enemy.damage
-                    self.player.health -= player_damage
-                    print(f"{Colors.RED}The {enemy.name} hit you for {player_damage} damage!{Colors.ENDC}")
-                    
-            elif action == "use_potion":
-                potions = [item for item in self.player.inventory if "potion" in item]
-                if not potions:
-                    print(f"{Colors.RED}You don't have any potions!{Colors.ENDC}")
-                    continue
-                    
-                print(f"\n{Colors.GREEN}Available potions:{Colors.ENDC}")
-                for i, potion in enumerate(potions, 1):
-                    print(f"{i}. {potion}")
-                    
-                try:
-                    choice = int(input("Choose a potion (number): ")) - 1
-                    if 0 <= choice < len(potions):
-                        potion = potions[choice]
-                        self.use_potion(potion)
-                    else:
-                        print(f"{Colors.RED}Invalid choice!{Colors.ENDC}")
-                except ValueError:
-                    print(f"{Colors.RED}Invalid input!{Colors.ENDC}")
-                    
-            elif action == "run":
-                if random.random() < 0.4:
-                    print(f"\n{Colors.GREEN}You successfully escaped!{Colors.ENDC}")
-                    return True
+        elif action == "use_potion":
+            potions = [item for item in self.player.inventory if item in POTION_HEALING]
+            if not potions:
+                self.io.print(f"{Colors.RED}You don't have any potions!{Colors.ENDC}")
+                return None
+                
+            self.io.print(f"\n{Colors.GREEN}Available potions:{Colors.ENDC}")
+            for i, potion in enumerate(potions, 1):
+                self.io.print(f"{i}. {potion}")
+                
+            try:
+                choice = int(await self.io.input("Choose a potion (number): ")) - 1
+                if 0 <= choice < len(potions):
+                    potion = potions[choice]
+                    self.use_potion(potion)
                 else:
-                    print(f"\n{Colors.RED}You failed to escape!{Colors.ENDC}")
-                    player_damage = enemy.damage
-                    self.player.health -= player_damage
-                    print(f"{Colors.RED}The {enemy.name} hit you for {player_damage} damage!{Colors.ENDC}")
-            
-            if enemy_current_health <= 0:
-                print(f"\n{Colors.GREEN}You defeated the {enemy.name}!{Colors.ENDC}")
-                exp_gain = random.randint(20, 50)
-                level_up_message = self.player.gain_experience(exp_gain)
-                print(f"{print(f"{Colors.GREEN}You gained {exp_gain} experience!{Colors.ENDC}")
-                if level_up_message:
-                    print(level_up_message)
-                    
-                # Handle loot
-                gold_reward = random.randint(10, 30) * self.player.level
-                self.player.gold += gold_reward
-                print(f"{Colors.YELLOW}You found {gold_reward} gold!{Colors.ENDC}")
+                    self.io.print(f"{Colors.RED}Invalid choice!{Colors.ENDC}")
+            except ValueError:
+                self.io.print(f"{Colors.RED}Invalid input!{Colors.ENDC}")
                 
-                # Drop random loot
-                if enemy.loot and random.random() < 0.7:
-                    dropped_item = random.choice(enemy.loot)
-                    if dropped_item not in self.player.inventory:
-                        self.player.inventory.append(dropped_item)
-                        print(f"{Colors.GREEN}You found: {dropped_item}!{Colors.ENDC}")
-                return False
-            
-        if self.player.health <= 0:
-            print(f"\n{Colors.RED}You have been defeated...{Colors.ENDC}")
-            self.game_running = False
+        elif action == "hint":
+            # Imported here because the solver itself builds on this module.
+            import solver
+            best, survival = solver.shared().best_action(self.player, fight.enemy_type, fight.enemy_health)
+            move = f"drink a {best.replace('_', ' ')}" if best in POTION_HEALING else best
+            self.io.print(f"\n{Colors.BLUE}Hint: {move} (best odds of surviving: {survival:.0%}){Colors.ENDC}")
+            return None
+
+        elif action == "run":
+            if fight.flee():
+                self.io.print(f"\n{Colors.GREEN}You successfully escaped!{Colors.ENDC}")
+                if metrics.active:
+                    metrics.active.escapes.inc(fight.enemy_type)
+                return True
+            else:
+                self.io.print(f"\n{Colors.RED}You failed to escape!{Colors.ENDC}")
+                self.io.print(f"{Colors.RED}The {enemy.name} hit you for {enemy.damage} damage!{Colors.ENDC}")
+        
+        if fight.enemy_health <= 0:
+            self.io.print(f"\n{Colors.GREEN}You defeated the {enemy.name}!{Colors.ENDC}")
+            exp_gain, level_up_message, gold_reward, drops = fight.victory()
+            self.io.print(f"{Colors.GREEN}You gained {exp_gain} experience!{Colors.ENDC}")
+            if level_up_message:
+                self.io.print(level_up_message)
+            self.io.print(f"{Colors.YELLOW}You found {gold_reward} gold!{Colors.ENDC}")
+            for item in drops:
+                self.io.print(f"{Colors.GREEN}You found: {item}!{Colors.ENDC}")
             return False
+        return None
+
+    def drink(self, potion: str) -> int:
+        if potion not in POTION_HEALING or potion not in self.player.inventory:
+            return 0
+        heal_amount = POTION_HEALING[potion]
+        self.player.health = min(self.player.max_health, self.player.health + heal_amount)
+        self.player.inventory.remove(potion)
+        self.save("drink", potion)
+        return heal_amount
 
     def use_potion(self, potion: str):
-        healing = {
-            "small_potion": 20,
-            "medium_potion": 50,
-            "large_potion": 100
-        }
-        
-        if potion in healing:
-            heal_amount = healing[potion]
-            self.player.health = min(self.player.max_health, self.player.health + heal_amount)
-            self.player.inventory.remove(potion)
-            print(f"\n{Colors.GREEN}You used {potion} and recovered {heal_amount} health!{Colors.ENDC}")
+        heal_amount = self.drink(potion)
+        if heal_amount:
+            self.io.print(f"\n{Colors.GREEN}You used {potion} and recovered {heal_amount} health!{Colors.ENDC}")
         else:
-            print(f"\n{Colors.RED}Invalid potion!{Colors.ENDC}")
+            self.io.print(f"\n{Colors.RED}Invalid potion!{Colors.ENDC}")
 
-    def shop_menu(self):
+    async def shop_menu(self):
         if self.player.current_location != "market":
             return
             
-        shop_items = {
-            "small_potion": 15,
-            "medium_potion": 30,
-            "large_potion": 60,
-            "steel_sword": 100
-        }
+        shop_items = self.SHOP_ITEMS
         
         while True:
-            clear_screen()
-            print(f"\n{Colors.YELLOW}{'='*20} SHOP {'='*20}{Colors.ENDC}")
-            print(f"{Colors.YELLOW}Your gold: {self.player.gold}{Colors.ENDC}")
-            print("\nAvailable items:")
+            self.io.clear()
+            self.io.print(f"\n{Colors.YELLOW}{'='*20} SHOP {'='*20}{Colors.ENDC}")
+            self.io.print(f"{Colors.YELLOW}Your gold: {self.player.gold}{Colors.ENDC}")
+            self.io.print("\nAvailable items:")
             
             for item, price in shop_items.items():
-                print(f"{Colors.GREEN}{item}{Colors.ENDC}: {price} gold")
+                self.io.print(f"{Colors.GREEN}{item}{Colors.ENDC}: {price} gold")
                 
-            print(f"\n{Colors.BLUE}Enter item name to buy or 'exit' to leave shop{Colors.ENDC}")
-            choice = input(">>> ").lower()
+            self.io.print(f"\n{Colors.BLUE}Enter item name to buy or 'exit' to leave shop{Colors.ENDC}")
+            choice = (await self.io.input(">>> ")).lower()
             
             if choice == "exit":
                 break
                 
             if choice in shop_items:
-                if self.player.gold >= shop_items[choice]:
-                    self.player.gold -= shop_items[choice]
-                    self.player.inventory.append(choice)
-                    print(f"\n{Colors.GREEN}Purchased {choice}!{Colors.ENDC}")
+                if self.buy(choice):
+                    self.io.print(f"\n{Colors.GREEN}Purchased {choice}!{Colors.ENDC}")
                 else:
-                    print(f"\n{Colors.RED}Not enough gold!{Colors.ENDC}")
+                    self.io.print(f"\n{Colors.RED}Not enough gold!{Colors.ENDC}")
             else:
-                print(f"\n{Colors.RED}Invalid item!{Colors.ENDC}")
+                self.io.print(f"\n{Colors.RED}Invalid item!{Colors.ENDC}")
             
-            time.sleep(1)
+            await self.io.sleep(1)
+
+    SHOP_ITEMS = {
+        "small_potion": 15,
+        "medium_potion": 30,
+        "large_potion": 60,
+        "steel_sword": 100
+    }
 
-    def handle_quests(self):
-        location = self.player.current_location
+    def buy(self, item: str) -> bool:
+        price = self.SHOP_ITEMS[item]
+        if self.player.gold < price:
+            return False
+        self.player.gold -= price
+        self.player.inventory.add(item)
+        self.quest_event(quests.PICKUP, item)
+        self.save("buy", item)
+        if metrics.active:
+            metrics.active.purchases.inc(item)
+        return True
+
+    GATE_MESSAGES = {
+        "island": "You need a compass to navigate to the island!",
+        "cave": "You need a map to find the cave entrance!",
+        "treasure_room": "You need the spectral key to enter the treasure room!"
+    }
+
+    def holds(self, item: str) -> bool:
+        return item in self.player.inventory
+
+    def gate_message(self, location: str) -> Optional[str]:
+        required = self.world.requires(location)
+        if required and not self.holds(required):
+            return self.GATE_MESSAGES.get(location, f"You need the {required} to go there!")
+        return None
+
+    def route_to(self, destination: str) -> Optional[List[str]]:
+        return routes.index_for(self.world.base).route(self.player.current_location, destination, self.holds)
+
+    def move(self, location: str) -> Optional[str]:
+        self.player.current_location = location
+        self.quest_event(quests.ENTER, location)
+        self.save("move", location)
         
-        # Add new quests based on location and inventory
-        if location == "tavern" and "Find the ghost ship" not in self.quest_log:
-            self.quest_log.append("Find the ghost ship")
-            print(f"\n{Colors.YELLOW}New Quest: Find the ghost ship{Colors.ENDC}")
-            
-        elif location == "island" and "Explore the temple ruins" not in self.quest_log:
-            self.quest_log.append("Explore the temple ruins")
-            print(f"\n{Colors.YELLOW}New Quest: Explore the temple ruins{Colors.ENDC}")
-            
-        # Complete quests
-        if location == "ghost_ship" and "Find the ghost ship" in self.quest_log:
-            self.quest_log.remove("Find the ghost ship")
-            self.player.gold += 200
-            print(f"\n{Colors.GREEN}Quest completed: Find the ghost ship{Colors.ENDC}")
-            print(f"{Colors.YELLOW}Reward: 200 gold{Colors.ENDC}")
-            
-        elif location == "temple_ruins" and "Explore the temple ruins" in self.quest_log:
-            self.quest_log.remove("Explore the temple ruins")
-            self.player.gold += 300
-            print(f"\n{Colors.GREEN}Quest completed: Explore the temple ruins{Colors.ENDC}")
-            print(f"{Colors.YELLOW}Reward: 300 gold{Colors.ENDC}")
-
-    def handle_input(self):
-        print(f"\n{Colors.YELLOW}What would you like to do?{Colors.ENDC}")
-        print("1. Move")
-        print("2. Take item")
-        print("3. Use item")
-        print("4. View inventory")
-        print("5. Shop (if in market)")
-        print("6. Quit")
+        # Handle random encounters
+        enemies = self.world.enemies(location)
+        if self.rng.random() < ENCOUNTER_CHANCE and enemies:
+            enemy_type = self.rng.choice(enemies)
+            if metrics.active:
+                metrics.active.encounters.inc(enemy_type)
+            return enemy_type
+        return None
+
+    def take(self, item: str) -> bool:
+        # In a shared world someone else may have got there first.
+        if not self.world.take(self.player.current_location, item):
+            return False
+        self.player.inventory.add(item)
         
-        choice = input(f"\n{Colors.GREEN}Choose an action (1-6):{Colors.ENDC} ")
+        if item == "treasure":
+            self.player.gold += 1000
+        self.quest_event(quests.PICKUP, item)
+        self.save("pickup", item)
+        return True
+
+    def quest_event(self, event: str, key):
+        changes = self.quests.fire(event, key, self.player.gold)
+        # Gold can cross a threshold through the event itself or through quest rewards.
+        changes += self.quests.gold(self.player.gold)
+        while changes:
+            rewarded = False
+            for kind, quest in changes:
+                if kind == quests.STARTED:
+                    self.io.print(f"\n{Colors.YELLOW}New Quest: {quest.title}{Colors.ENDC}")
+                    continue
+                self.io.print(f"\n{Colors.GREEN}Quest completed: {quest.title}{Colors.ENDC}")
+                self.player.gold += quest.gold
+                for item in quest.items:
+                    self.player.inventory.add(item)
+                rewards = ([f"{quest.gold} gold"] if quest.gold else []) + list(quest.items)
+                if rewards:
+                    self.io.print(f"{Colors.YELLOW}Reward: {', '.join(rewards)}{Colors.ENDC}")
+                    rewarded = True
+            changes = self.quests.gold(self.player.gold) if rewarded else []
+
+    ACTIONS = {"1": "move", "2": "take", "3": "use", "4": "inventory", "5": "shop", "6": "quit", "7": "travel"}
+
+    MENU_PROMPT = f"\n{Colors.GREEN}Choose an action (1-7):{Colors.ENDC} "
+
+    async def handle_input(self, show_menu: bool = True):
+        if show_menu:
+            self.io.write(render.MAIN_MENU)
         
+        choice = await self.io.input(self.MENU_PROMPT)
+        handled = self.handle_choice(choice)
+        if metrics.active:
+            handled = self._timed(metrics.active.action_seconds, self.ACTIONS.get(choice, "invalid"), handled)
+        await handled
+
+    async def handle_choice(self, choice: str):
         if choice == "1":
-            print(f"\n{Colors.YELLOW}Where would you like to go?{Colors.ENDC}")
-            print(f"Available locations: {', '.join(self.LOCATIONS[self.player.current_location]['connections'])}")
-            new_location = input(f"\n{Colors.GREEN}Enter location:{Colors.ENDC} ").lower()
+            self.io.print(f"\n{Colors.YELLOW}Where would you like to go?{Colors.ENDC}")
+            self.io.print(f"Available locations: {', '.join(self.world.connections(self.player.current_location))}")
+            new_location = (await self.io.input(f"\n{Colors.GREEN}Enter location:{Colors.ENDC} ")).lower()
             
-            if new_location in self.LOCATIONS[self.player.current_location]["connections"]:
-                if new_location == "island" and "compass" not in self.player.inventory:
-                    print(f"\n{Colors.RED}You need a compass to navigate to the island!{Colors.ENDC}")
-                    time.sleep(2)
-                    return
-                if new_location == "cave" and not self.player.has_map:
-                    print(f"\n{Colors.RED}You need a map to find the cave entrance!{Colors.ENDC}")
-                    time.sleep(2)
-                    return
-                if new_location == "treasure_room" and not self.player.has_key:
-                    print(f"\n{Colors.RED}You need the spectral key to enter the treasure room!{Colors.ENDC}")
-                    time.sleep(2)
+            if new_location in self.world.connections(self.player.current_location):
+                message = self.gate_message(new_location)
+                if message:
+                    self.io.print(f"\n{Colors.RED}{message}{Colors.ENDC}")
+                    await self.io.sleep(2)
                     return
                     
-                self.player.current_location = new_location
-                self.handle_quests()
-                
-                # Handle random encounters
-                if random.random() < 0.3 and self.LOCATIONS[new_location]["enemies"]:
-                    enemy_type = random.choice(self.LOCATIONS[new_location]["enemies"])
-                    self.handle_combat(enemy_type)
+                enemy_type = self.move(new_location)
+                if enemy_type:
+                    await self.handle_combat(enemy_type)
+                    self.save("combat", enemy_type)
             else:
-                print(f"\n{Colors.RED}You can't go there from here!{Colors.ENDC}")
-                time.sleep(1)
+                self.io.print(f"\n{Colors.RED}You can't go there from here!{Colors.ENDC}")
+                await self.io.sleep(1)
                 
         elif choice == "2":
-            location = self.LOCATIONS[self.player.current_location]
-            if not location["items"]:
-                print(f"\n{Colors.RED}Nothing to take here!{Colors.ENDC}")
-                time.sleep(1)
+            items = self.world.items(self.player.current_location)
+            if not items:
+                self.io.print(f"\n{Colors.RED}Nothing to take here!{Colors.ENDC}")
+                await self.io.sleep(1)
                 return
                 
-            print(f"\n{Colors.YELLOW}What would you like to take?{Colors.ENDC}")
-            print(f"Available items: {', '.join(location['items'])}")
-            item = input(f"\n{Colors.GREEN}Enter item name:{Colors.ENDC} ").lower()
+            self.io.print(f"\n{Colors.YELLOW}What would you like to take?{Colors.ENDC}")
+            self.io.print(f"Available items: {', '.join(items)}")
+            item = (await self.io.input(f"\n{Colors.GREEN}Enter item name:{Colors.ENDC} ")).lower()
             
-            if item in location["items"]:
-                if item == "treasure" and not self.player.has_key:
-                    print(f"\n{Colors.RED}You need the spectral key to get the treasure!{Colors.ENDC}")
-                    time.sleep(2)
+            if item in items:
+                if item == "treasure" and not self.holds("spectral_key"):
+                    self.io.print(f"\n{Colors.RED}You need the spectral key to get the treasure!{Colors.ENDC}")
+                    await self.io.sleep(2)
                     return
                     
-                self.player.inventory.append(item)
-                location["items"].remove(item)
-                
-                if item == "treasure_map":
-                    self.player.has_map = True
-                elif item == "spectral_key":
-                    self.player.has_key = True
-                elif item == "treasure":
-                    self.player.gold += 1000
-                    print(f"\n{Colors.GREEN}Congratulations! You found the treasure!{Colors.ENDC}")
-                    print(f"{Colors.YELLOW}You gained 1000 gold!{Colors.ENDC}")
-                    time.sleep(2)
+                if not self.take(item):
+                    self.io.print(f"\n{Colors.RED}Someone else got there first!{Colors.ENDC}")
+                    await self.io.sleep(1)
+                    return
+                if item == "treasure":
+                    self.io.print(f"\n{Colors.GREEN}Congratulations! You found the treasure!{Colors.ENDC}")
+                    self.io.print(f"{Colors.YELLOW}You gained 1000 gold!{Colors.ENDC}")
+                    await self.io.sleep(2)
                     
-                print(f"\n{Colors.GREEN}You picked up: {item}{Colors.ENDC}")
-                time.sleep(1)
+                self.io.print(f"\n{Colors.GREEN}You picked up: {item}{Colors.ENDC}")
+                await self.io.sleep(1)
             else:
-                print(f"\n{Colors.RED}That item isn't here!{Colors.ENDC}")
-                time.sleep(1)
+                self.io.print(f"\n{Colors.RED}That item isn't here!{Colors.ENDC}")
+                await self.io.sleep(1)
                 
         elif choice == "3":
             if not self.player.inventory:
-                print(f"\n{Colors.RED}Your inventory is empty!{Colors.ENDC}")
-                time.sleep(1)
+                self.io.print(f"\n{Colors.RED}Your inventory is empty!{Colors.ENDC}")
+                await self.io.sleep(1)
                 return
                 
-            print(f"\n{Colors.YELLOW}Choose an item to use:{Colors.ENDC}")
-            for i, item in enumerate(self.player.inventory, 1):
-                print(f"{i}. {item}")
+            inventory = list(self.player.inventory)
+            self.io.print(f"\n{Colors.YELLOW}Choose an item to use:{Colors.ENDC}")
+            for i, item in enumerate(inventory, 1):
+                self.io.print(f"{i}. {item}")
                 
             try:
-                item_choice = int(input(f"\n{Colors.GREEN}Enter item number:{Colors.ENDC} ")) - 1
-                if 0 <= item_choice < len(self.player.inventory):
-                    item = self.player.inventory[item_choice]
-                    if "potion" in item:
+                item_choice = int(await self.io.input(f"\n{Colors.GREEN}Enter item number:{Colors.ENDC} ")) - 1
+                if 0 <= item_choice < len(inventory):
+                    item = inventory[item_choice]
+                    if item in POTION_HEALING:
                         self.use_potion(item)
-                    elif "_sword" in item:
+                    elif self.items[item].damage:
                         self.player.equipped_weapon = item
-                        print(f"\n{Colors.GREEN}Equipped {item}!{Colors.ENDC}")
+                        self.save("equip", item)
+                        self.io.print(f"\n{Colors.GREEN}Equipped {item}!{Colors.ENDC}")
                     else:
-                        print(f"\n{Colors.RED}Can't use that item right now!{Colors.ENDC}")
+                        self.io.print(f"\n{Colors.RED}Can't use that item right now!{Colors.ENDC}")
                 else:
-                    print(f"\n{Colors.RED}Invalid choice!{Colors.ENDC}")
+                    self.io.print(f"\n{Colors.RED}Invalid choice!{Colors.ENDC}")
             except ValueError:
-                print(f"\n{Colors.RED}Invalid input!{Colors.ENDC}")
+                self.io.print(f"\n{Colors.RED}Invalid input!{Colors.ENDC}")
                 
         elif choice == "4":
-            print(f"\n{Colors.YELLOW}Your inventory:{Colors.ENDC}")
+            self.io.print(f"\n{Colors.YELLOW}Your inventory:{Colors.ENDC}")
             if self.player.inventory:
                 for item in self.player.inventory:
-                    print(f"- {item}")
+                    self.io.print(f"- {item}")
             else:
-                print("Empty")
-            input(f"\n{Colors.GREEN}Press Enter to continue...{Colors.ENDC}")
+                self.io.print("Empty")
+            await self.io.input(f"\n{Colors.GREEN}Press Enter to continue...{Colors.ENDC}")
             
         elif choice == "5":
-            self.shop_menu()
+            await self.shop_menu()
             
         elif choice == "6":
             self.game_running = False
             
-    def run(self):
-        print_slow(f"""{Colors.YELLOW}
+        elif choice == "7":
+            destination = (await self.io.input(f"\n{Colors.GREEN}Travel to:{Colors.ENDC} ")).lower()
+            await self.travel(destination)
+
+    async def travel(self, destination: str):
+        if destination not in self.world:
+            self.io.print(f"\n{Colors.RED}There's no such place!{Colors.ENDC}")
+            await self.io.sleep(1)
+            return
+        route = self.route_to(destination)
+        if route is None:
+            self.io.print(f"\n{Colors.RED}You don't know a way there yet!{Colors.ENDC}")
+            await self.io.sleep(1)
+            return
+            
+        for location in route:
+            self.io.print(f"{Colors.YELLOW}You travel to {location}...{Colors.ENDC}")
+            enemy_type = self.move(location)
+            if enemy_type:
+                await self.handle_combat(enemy_type)
+                self.save("combat", enemy_type)
+                if not self.game_running:
+                    return
+            
+    async def play(self):
+        await self.io.print_slow(f"""{Colors.YELLOW}
 Welcome to Pirate Adventure!
 Find the legendary treasure, but beware of dangerous pirates!
 You'll need various items to succeed in your quest.
 {Colors.ENDC}""")
-        input(f"{Colors.GREEN}Press Enter to start...{Colors.ENDC}")
-        
-        while self.game_running and self.player.health > 0:
-            self.display_location()
-            self.handle_input()
+        await self.io.input(f"{Colors.GREEN}Press Enter to start...{Colors.ENDC}")
+        await self.turns()
+
+    async def turns(self, resumed: bool = False):
+        """The main loop; a `resumed` session already has its location and menu on screen."""
+        if metrics.active:
+            metrics.active.games.add(self)
+            self.io = metrics.TimingIO(self.io, self)
+        m, started = None, None
+        try:
+            while self.game_running and self.player.health > 0:
+                m = metrics.active
+                if m:
+                    started, waited = time.perf_counter(), self.waited
+                if not resumed:
+                    await self.display_location()
+                await self.handle_input(show_menu=not resumed)
+                resumed = False
+                self.turns_taken += 1
+                if m:
+                    m.turn_seconds.observe(time.perf_counter() - started - (self.waited - waited))
+                    started = None
+        finally:
+            # However the loop ends, a disconnect or hibernation included. A turn cut short that
+            # way still counts, up to the point it stopped.
+            if started is not None:
+                m.turn_seconds.observe(time.perf_counter() - started - (self.waited - waited))
+            # TimingIO and the game refer to each other, so waiting for the game to be collected
+            # could take a while.
+            if metrics.active:
+                metrics.active.games.discard(self)
+        if self.leaderboard:
+            self.leaderboard.record(self)
             
         if self.player.health <= 0:
-            print(f"\n{Colors.RED}Game Over! You died!{Colors.ENDC}")
+            self.io.print(f"\n{Colors.RED}Game Over! You died!{Colors.ENDC}")
         else:
-            print(f"\n{Colors.GREEN}Thanks for playing!{Colors.ENDC}")
+            self.io.print(f"\n{Colors.GREEN}Thanks for playing!{Colors.ENDC}")
             if "treasure" in self.player.inventory:
-                print(f"{Colors.YELLOW}Congratulations on finding the treasure!{Colors.ENDC}")
-                print(f"Final gold count: {self.player.gold}")
+                self.io.print(f"{Colors.YELLOW}Congratulations on finding the treasure!{Colors.ENDC}")
+                self.io.print(f"Final gold count: {self.player.gold}")
+
+    def run(self):
+        asyncio.run(self.play())
+
+DEFAULT_WORLD = World(Game.LOCATIONS, Game.ASCII_ART)
+DEFAULT_QUESTS = quests.QuestBook(Game.QUESTS)
+DEFAULT_LOOT = loot.LootBook(Game.LOOT)
 
 if __name__ == "__main__":
-    game = Game()
+    # Optionally play a world from a data file: python adventure.py world.jsonl
+    game = Game(world=load_world(sys.argv[1]) if len(sys.argv) > 1 else None)
     game.run()
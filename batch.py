@@ -0,0 +1,321 @@
+import functools
+import json
+import random
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from adventure import MAX_STACK, POTION_HEALING, Fight, Game, NullIO, World
+
+# Marks a word's end in a trie node; never a character of a command.
+END = ""
+
+class ParseError(ValueError):
+    pass
+
+class Trie:
+    """Words by prefix: any prefix only one word starts with stands for that word."""
+    __slots__ = ("root",)
+
+    def __init__(self, words: Iterable[str] = ()):
+        self.root: dict = {}
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str):
+        node = self.root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[END] = word
+
+    def complete(self, prefix: str) -> List[str]:
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        # A whole word wins over longer words it is a prefix of.
+        if END in node:
+            return [node[END]]
+        words = []
+        stack = [node]
+        while stack:
+            for char, child in stack.pop().items():
+                if char == END:
+                    words.append(child)
+                else:
+                    stack.append(child)
+        return sorted(words)
+
+    def resolve(self, prefix: str, what: str) -> str:
+        return only(self.complete(prefix), prefix, what)
+
+def only(words: List[str], prefix: str, what: str) -> str:
+    if len(words) == 1:
+        return words[0]
+    if words:
+        raise ParseError(f"ambiguous {what} '{prefix}': {', '.join(words)}")
+    raise ParseError(f"unknown {what} '{prefix}'")
+
+# Spellings of each command; every one can be shortened to any prefix no other shares.
+VERBS = {
+    "go": "go", "move": "go", "travel": "travel", "take": "take", "buy": "buy",
+    "drink": "use", "use": "use", "equip": "use", "attack": "attack", "run": "run", "flee": "run",
+    "hint": "hint", "inventory": "inventory", "look": "look", "quit": "quit",
+}
+COMMANDS = Trie(VERBS)
+# Commands that can be given during a fight.
+IN_FIGHT = {"attack", "run", "use", "hint", "inventory", "look", "quit"}
+
+@functools.lru_cache(maxsize=4096)
+def vocabulary(words: Tuple[str, ...]) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    # Exits, shop stock and most rooms' items repeat, so they are split into segments once.
+    return tuple((word, tuple(word.split("_"))) for word in words)
+
+def complete(arg: str, words: Sequence[str]) -> List[str]:
+    """Names whose `_`-separated segments start with the argument's, in order: 'lar_pot' is
+    large_potion, 'sec' secret_room. A name typed in full wins over longer ones."""
+    if arg in words:
+        return [arg]
+    typed = arg.split("_")
+    return sorted(word for word, segments in vocabulary(tuple(words))
+                  if len(typed) <= len(segments) and all(map(str.startswith, segments, typed)))
+
+def parse(line: str) -> Tuple[str, str]:
+    """'b lar pot' -> ('buy', 'lar_pot'): the command resolved, the argument's words joined by `_`."""
+    words = line.lower().split()
+    if not words:
+        raise ParseError("empty command")
+    return VERBS[COMMANDS.resolve(words[0], "command")], "_".join(words[1:])
+
+class Session:
+    """One game driven by commands instead of menus: no prompts, no pauses, one result each."""
+
+    def __init__(self, game: Game):
+        self.game = game
+        self.fight: Optional[Fight] = None
+        self.over = False
+        self.commands = 0
+
+    def run(self, line: str) -> Dict[str, object]:
+        result: Dict[str, object] = {"cmd": line.strip()}
+        self.commands += 1
+        try:
+            if self.over:
+                raise ParseError("game over")
+            verb, arg = parse(line)
+            if self.fight and self.fight.slain_by_other():
+                # A shared enemy someone else finished off: the fight is over, with nothing won.
+                result["other_kill"] = self.fight.enemy_type
+                self.end_fight()
+            if self.fight and verb not in IN_FIGHT:
+                raise ParseError(f"in a fight with {self.fight.enemy_type}")
+            getattr(self, "do_" + verb)(arg, result)
+            result["ok"] = True
+        except ValueError as error:
+            # ParseError is one too; so is a loot drop onto a full stack. Either ends only this command.
+            result["ok"] = False
+            result["err"] = str(error)
+        player = self.game.player
+        result.update(loc=player.current_location, hp=player.health, gold=player.gold)
+        if self.fight:
+            result["enemy_hp"] = self.fight.enemy_health
+        if player.health <= 0 and not self.over:
+            result["died"] = True
+            self.over = True
+        return result
+
+    def pick(self, arg: str, words: Sequence[str], what: str) -> str:
+        if not arg:
+            raise ParseError(f"which {what}?")
+        return only(complete(arg, words), arg, what)
+
+    def room_for(self, item: str):
+        if self.game.player.inventory.count(item) >= MAX_STACK:
+            raise ParseError(f"can't hold more than {MAX_STACK} of {item}")
+
+    def enter(self, location: str, result: Dict[str, object]) -> bool:
+        enemy_type = self.game.move(location)
+        if enemy_type:
+            self.fight = Fight(self.game, enemy_type)
+            result["fight"] = enemy_type
+            return True
+        return False
+
+    def do_go(self, arg: str, result: Dict[str, object]):
+        game = self.game
+        location = self.pick(arg, game.world.connections(game.player.current_location), "exit")
+        message = game.gate_message(location)
+        if message:
+            raise ParseError(message)
+        self.enter(location, result)
+
+    def do_travel(self, arg: str, result: Dict[str, object]):
+        # Any location; an encounter on the way ends the trip.
+        game = self.game
+        destination = self.pick(arg, tuple(game.world.base), "location")
+        route = game.route_to(destination)
+        if route is None:
+            raise ParseError(f"no open route to {destination}")
+        for location in route:
+            if self.enter(location, result):
+                return
+
+    def do_take(self, arg: str, result: Dict[str, object]):
+        game = self.game
+        item = self.pick(arg, game.world.items(game.player.current_location), "item here")
+        if item == "treasure" and not game.holds("spectral_key"):
+            raise ParseError("you need the spectral key to get the treasure")
+        self.room_for(item)
+        if not game.take(item):
+            raise ParseError("someone else got there first")
+        result["item"] = item
+
+    def do_buy(self, arg: str, result: Dict[str, object]):
+        game = self.game
+        if game.player.current_location != "market":
+            raise ParseError("the shop is in the market")
+        item = self.pick(arg, tuple(game.SHOP_ITEMS), "shop item")
+        self.room_for(item)
+        if not game.buy(item):
+            raise ParseError("not enough gold")
+        result["item"] = item
+
+    def do_use(self, arg: str, result: Dict[str, object]):
+        game = self.game
+        player = game.player
+        item = self.pick(arg, tuple(player.inventory.state()), "item held")
+        if item in POTION_HEALING:
+            result["healed"] = game.drink(item)
+        elif game.items[item].damage and not self.fight:
+            player.equipped_weapon = item
+            game.save("equip", item)
+        else:
+            raise ParseError(f"can't use {item} now")
+        result["item"] = item
+
+    def do_attack(self, arg: str, result: Dict[str, object]):
+        fight = self.need_fight()
+        result["dealt"], result["taken"] = fight.attack()
+        if fight.won:
+            result["xp"], _, result["reward"], result["drops"] = fight.victory()
+            result["won"] = fight.enemy_type
+            self.end_fight()
+
+
+    def do_run(self, arg: str, result: Dict[str, object]):
+        fight = self.need_fight()
+        result["escaped"] = fight.flee()
+        if result["escaped"]:
+            self.end_fight()
+
+    def do_hint(self, arg: str, result: Dict[str, object]):
+        # Imported here because the solver is slow to import and most scripts never ask.
+        import solver
+        fight = self.need_fight()
+        result["hint"], result["survival"] = solver.shared().best_action(
+            self.game.player, fight.enemy_type, fight.enemy_health)
+
+    def do_inventory(self, arg: str, result: Dict[str, object]):
+        result["items"] = self.game.player.inventory.state()
+
+    def do_look(self, arg: str, result: Dict[str, object]):
+        game = self.game
+        location = game.player.current_location
+        result.update(exits=list(game.world.connections(location)), items=game.world.items(location),
+                      enemies=game.world.enemies(location))
+
+    def do_quit(self, arg: str, result: Dict[str, object]):
+        self.over = True
+
+    def need_fight(self) -> Fight:
+        if not self.fight:
+            raise ParseError("nothing to fight")
+        return self.fight
+
+    def end_fight(self):
+        self.game.save("combat", self.fight.enemy_type)
+        self.fight = None
+
+    def summary(self) -> Dict[str, object]:
+        player = self.game.player
+        return {"commands": self.commands, "loc": player.current_location, "hp": player.health, "gold": player.gold,
+                "level": player.level, "treasure": "treasure" in player.inventory,
+                "died": player.health <= 0}
+
+def scripts(lines: Iterable[str]) -> Iterator[List[str]]:
+    """Split a command stream into sessions at '---' lines, dropping blanks and # comments."""
+    script: List[str] = []
+    for line in lines:
+        line = line.strip()
+        if line == "---":
+            yield script
+            script = []
+        elif line and not line.startswith("#"):
+            script.append(line)
+    if script:
+        yield script
+
+def run_script(script: Sequence[str], seed: int, world: Optional[World] = None,
+               verbose: bool = True, leaderboard=None) -> Tuple[List[Dict[str, object]], Dict[str, object]]:
+    game = Game(io=NullIO(), world=world, rng=random.Random(seed))
+    session = Session(game)
+    results = []
+    for line in script:
+        result = session.run(line)
+        if verbose:
+            results.append(result)
+        if session.over:
+            break
+    # Like Game.turns(), only runs that ended (death or quit) count.
+    if leaderboard and session.over:
+        game.captain = f"script{seed}"
+        game.turns_taken = session.commands
+        leaderboard.record(game)
+    return results, session.summary()
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import time
+
+    from leaderboard import Leaderboard
+    from world import load_world
+
+    parser = argparse.ArgumentParser(
+        description="Play scripted sessions without prompts or pauses and print one JSON line per command.")
+    parser.add_argument("script", help="command file ('-' for stdin); '---' lines separate sessions")
+    parser.add_argument("--world", help="world data (.jsonl) or a compiled .world file")
+    parser.add_argument("--seed", type=int, default=0, help="session n plays with seed + n")
+    parser.add_argument("--repeat", type=int, default=1, help="play every session this many times with new seeds")
+    parser.add_argument("--summary", action="store_true", help="print only one line per session")
+    parser.add_argument("--leaderboard", help="record finished sessions in this SQLite file")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.script == "-" else open(args.script)
+    with source:
+        sessions = list(scripts(source))
+    world = load_world(args.world) if args.world else None
+    leaderboard = Leaderboard(args.leaderboard) if args.leaderboard else None
+
+    dumps = json.JSONEncoder(separators=(",", ":")).encode
+    out = []
+    commands = played = 0
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        for script in sessions:
+            seed = args.seed + played
+            results, summary = run_script(script, seed, world, not args.summary, leaderboard)
+            for result in results:
+                out.append(dumps({"session": played, **result}))
+            out.append(dumps({"session": played, "seed": seed, "end": True, **summary}))
+            commands += summary["commands"]
+            played += 1
+            if len(out) >= 4096:
+                sys.stdout.write("\n".join(out) + "\n")
+                out.clear()
+    if out:
+        sys.stdout.write("\n".join(out) + "\n")
+    elapsed = time.perf_counter() - started
+    if leaderboard:
+        leaderboard.close()
+    print(f"{played} sessions, {commands} commands in {elapsed:.2f}s: "
+          f"{played / elapsed:,.0f} sessions/sec, {commands / elapsed:,.0f} commands/sec", file=sys.stderr)
@@ -0,0 +1,124 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import adventure
+import render
+from adventure import ConsoleIO, Game
+from server import SessionHost, StreamIO
+
+class CountingRaw(io.RawIOBase):
+    def __init__(self):
+        self.writes = 0
+        self.bytes = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.writes += 1
+        self.bytes += len(data)
+        return len(data)
+
+class LegacyIO(ConsoleIO):
+    # The pre-renderer display path: a shell for every clear and one write per line.
+    def __init__(self):
+        super().__init__(typewriter=True)
+        self.subprocesses = 0
+
+    def write(self, text: str):
+        for line in text.split("\n")[:-1]:
+            print(line)
+        if not text.endswith("\n"):
+            sys.stdout.write(text.rsplit("\n", 1)[-1])
+            sys.stdout.flush()
+
+    def clear(self):
+        self.subprocesses += 1
+
+def measure(mode: str, turns: int) -> dict:
+    raw = CountingRaw()
+    stdout, stdin, sleep = sys.stdout, sys.stdin, adventure.time.sleep
+    sys.stdout = io.TextIOWrapper(raw, encoding="utf-8", line_buffering=True, write_through=True)
+    sys.stdin = io.StringIO("4\n\n" * turns)
+    # Only syscalls are being counted here, so the typewriter delay itself is skipped.
+    adventure.time.sleep = lambda seconds: None
+
+    if mode == "legacy":
+        game_io = LegacyIO()
+    else:
+        game_io = ConsoleIO(typewriter=(mode == "typewriter"))
+    game = Game(io=game_io)
+
+    async def loop():
+        for _ in range(turns):
+            if mode == "legacy":
+                game.io.clear()
+                game.display_status_bar()
+                head, description, tail = render.location_frame(game)
+                game.io.write(head.split(render.RULE + "\n\n", 1)[1])
+                await game.io.print_slow(description)
+                game.io.write(tail)
+            else:
+                await game.display_location()
+            await game.handle_input()
+
+    started = time.perf_counter()
+    try:
+        asyncio.run(loop())
+        sys.stdout.flush()
+    finally:
+        sys.stdout, sys.stdin, adventure.time.sleep = stdout, stdin, sleep
+    elapsed = time.perf_counter() - started
+
+    return {
+        "mode": mode,
+        "write_syscalls_per_turn": raw.writes / turns,
+        "subprocesses_per_turn": getattr(game_io, "subprocesses", 0) / turns,
+        "bytes_per_turn": raw.bytes / turns,
+        "turns_per_sec": turns / elapsed,
+    }
+
+class ScriptedReader:
+    def __init__(self, lines):
+        self.lines = iter(lines)
+
+    async def readline(self) -> bytes:
+        return next(self.lines, "").encode()
+
+class CountingWriter:
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, data: bytes):
+        self.bytes += len(data)
+
+    async def drain(self):
+        pass
+
+def measure_remote(screen_rows: int, turns: int) -> dict:
+    writer = CountingWriter()
+    reader = ScriptedReader(["\n"] + ["4\n", "\n"] * turns)
+    game = Game(io=StreamIO(reader, writer, SessionHost(), delay_scale=0, screen_rows=screen_rows))
+    try:
+        asyncio.run(game.play())
+    except EOFError:
+        pass
+    return {
+        "mode": f"remote, screen_rows={screen_rows}" if screen_rows else "remote, full frames",
+        "bytes_per_turn": writer.bytes / turns,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Count terminal writes per turn for each display path.")
+    parser.add_argument("--turns", type=int, default=2000)
+    args = parser.parse_args()
+    results = [measure(mode, args.turns) for mode in ("legacy", "typewriter", "instant")]
+    results += [measure_remote(rows, args.turns) for rows in (0, 40)]
+    print(json.dumps(results, indent=2))
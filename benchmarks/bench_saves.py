@@ -0,0 +1,70 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adventure import Game
+from bench_sessions import SCRIPT, ScriptedIO
+from saves import Journal, SaveStore
+
+def measure(sessions: int, turns: int, flush_every: int, compact_every: int, journal: bool) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        store = SaveStore(directory, compact_every=compact_every)
+        games = [Game(io=ScriptedIO(SCRIPT), rng=random.Random(i)) for i in range(sessions)]
+        if journal:
+            for i, game in enumerate(games):
+                game.journal = Journal(store, f"captain{i}", game)
+
+        flushes = []
+
+        async def play():
+            for turn in range(turns):
+                for i, game in enumerate(games):
+                    await game.handle_input()
+                    game.player.health = game.player.max_health
+                    # Stand-in for the server's timer: group-commit after every few turns' worth.
+                    if (turn * sessions + i + 1) % flush_every == 0:
+                        started = time.perf_counter()
+                        store.flush()
+                        flushes.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        asyncio.run(play())
+        elapsed = time.perf_counter() - started
+        store.close()
+
+        mismatches = 0
+        if journal:
+            resumed = SaveStore(directory)
+            for i, game in enumerate(games):
+                fresh = Game()
+                fresh.restore(resumed.load(f"captain{i}"))
+                # Health was reset outside the journal above, so compare everything else.
+                live, restored = game.snapshot(), fresh.snapshot()
+                live.pop("health"), restored.pop("health")
+                mismatches += live != restored
+            resumed.close()
+
+        return {
+            "journal": journal,
+            "us_per_turn": elapsed / (sessions * turns) * 1e6,
+            "flushes": len(flushes),
+            "mean_flush_ms": sum(flushes) / len(flushes) * 1000 if flushes else 0.0,
+            "resume_mismatches": mismatches,
+        }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-turn cost of journaling saves, and resume correctness.")
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--flush-every", type=int, default=1000, help="turns between group commits")
+    parser.add_argument("--compact-every", type=int, default=10000, help="records between snapshots")
+    args = parser.parse_args()
+    print(json.dumps([measure(args.sessions, args.turns, args.flush_every, args.compact_every, journal)
+                      for journal in (False, True)], indent=2))
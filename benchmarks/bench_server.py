@@ -0,0 +1,119 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from server import raise_fd_limit
+
+MENU_PROMPT = b"Choose an action (1-7):"
+CONTINUE_PROMPT = b"Press Enter to continue..."
+
+def proc_cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+def proc_rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+async def roundtrip(reader, writer, line: bytes, prompt: bytes, latencies: List[float]):
+    started = time.perf_counter()
+    writer.write(line)
+    await reader.readuntil(prompt)
+    latencies.append(time.perf_counter() - started)
+
+async def connect(port: int, latencies: List[float]):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=1 << 20)
+    await roundtrip(reader, writer, b"\n", MENU_PROMPT, latencies)
+    return reader, writer
+
+async def play(reader, writer, deadline: float, think: float, latencies: List[float],
+               first: List[float]):
+    # The first turn after the idle wait wakes a hibernated session, if the server hibernates.
+    await roundtrip(reader, writer, b"4\n", CONTINUE_PROMPT, first)
+    await roundtrip(reader, writer, b"\n", MENU_PROMPT, latencies)
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(random.uniform(0.5, 1.5) * think)
+        await roundtrip(reader, writer, b"4\n", CONTINUE_PROMPT, latencies)
+        await roundtrip(reader, writer, b"\n", MENU_PROMPT, latencies)
+
+async def run(args: argparse.Namespace, hibernate_dir: str) -> dict:
+    command = [sys.executable, os.path.join(ROOT, "server.py"), "--port", "0", "--delay-scale", "0",
+               "--max-sessions", str(args.sessions)]
+    if args.hibernate_after:
+        command += ["--hibernate-dir", hibernate_dir, "--hibernate-after", str(args.hibernate_after),
+                    "--max-resident", str(args.max_resident or args.sessions)]
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    try:
+        port = int(server.stdout.readline().rsplit(":", 1)[1])
+        connect_latencies: List[float] = []
+        turn_latencies: List[float] = []
+        first_latencies: List[float] = []
+
+        # Connect everyone first so the measured window only sees steady-state turns.
+        connections = []
+        for _ in range(args.sessions):
+            connections.append(await connect(port, connect_latencies))
+        if args.hibernate_after:
+            await asyncio.sleep(args.hibernate_after + 1)
+        rss_idle = proc_rss_kb(server.pid)
+
+        n_active = int(args.sessions * args.active_fraction)
+        cpu_before = proc_cpu_seconds(server.pid)
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(play(reader, writer, deadline, args.think, turn_latencies, first_latencies)
+                               for reader, writer in connections[:n_active]))
+        elapsed = time.perf_counter() - started
+        cpu = proc_cpu_seconds(server.pid) - cpu_before
+        for _, writer in connections:
+            writer.close()
+    finally:
+        server.terminate()
+        server.wait()
+
+    turn_latencies.sort()
+    first_latencies.sort()
+    turns = len(turn_latencies)
+    cpu_per_turn = cpu / turns if turns else 0.0
+    return {
+        "sessions": args.sessions,
+        "active_sessions": n_active,
+        "server_rss_kb": rss_idle,
+        "rss_per_session_kb": rss_idle / args.sessions,
+        "turns": turns,
+        "turns_per_sec": turns / elapsed,
+        "server_cpu_utilization": cpu / elapsed,
+        "p50_turn_ms": turn_latencies[turns // 2] * 1000 if turns else 0.0,
+        "p99_turn_ms": turn_latencies[min(turns - 1, int(turns * 0.99))] * 1000 if turns else 0.0,
+        "p50_first_turn_ms": first_latencies[len(first_latencies) // 2] * 1000 if first_latencies else 0.0,
+        # A player who thinks for `think` seconds per turn costs cpu_per_turn / think cores.
+        "sessions_per_core": args.think / cpu_per_turn if cpu_per_turn else 0.0,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test server.py with many idle-heavy sessions.")
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--active-fraction", type=float, default=0.1)
+    parser.add_argument("--think", type=float, default=2.0, help="mean seconds between turns")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--hibernate-after", type=float, default=0,
+                        help="run the server with hibernation; idle sessions go to disk after this many seconds")
+    parser.add_argument("--max-resident", type=int, default=0, help="server's in-memory game limit when hibernating")
+    args = parser.parse_args()
+    raise_fd_limit()
+    with tempfile.TemporaryDirectory() as directory:
+        print(json.dumps(asyncio.run(run(args, directory)), indent=2))
@@ -0,0 +1,61 @@
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from adventure import Game, NullIO
+
+# One lap around the starting area: pick things up, check the inventory, move around.
+# Any move can land in a fight, so combat prompts are always answered with an attack.
+SCRIPT = ["2", "compass", "2", "rusty_sword", "3", "2", "4", "", "1", "market",
+          "4", "", "1", "dock", "1", "tavern", "1", "dock"]
+
+class ScriptedIO(NullIO):
+    def __init__(self, lines):
+        self.lines = lines
+        self.position = 0
+
+    async def input(self, prompt: str = "") -> str:
+        if "What do you do?" in prompt:
+            return "attack"
+        line = self.lines[self.position % len(self.lines)]
+        self.position += 1
+        return line
+
+def measure(sessions: int, turns: int) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    games = [Game(io=ScriptedIO(SCRIPT), rng=random.Random(i)) for i in range(sessions)]
+    per_session = (tracemalloc.get_traced_memory()[0] - before) / sessions
+    tracemalloc.stop()
+
+    async def play():
+        for _ in range(turns):
+            for game in games:
+                await game.handle_input()
+                # Keep everyone alive so every session takes the same number of turns.
+                game.player.health = game.player.max_health
+
+    started = time.perf_counter()
+    asyncio.run(play())
+    elapsed = time.perf_counter() - started
+    return {
+        "sessions": sessions,
+        "bytes_per_session": per_session,
+        "us_per_turn": elapsed / (sessions * turns) * 1e6,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory and turn cost with many live sessions.")
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(measure(args.sessions, args.turns), indent=2))
@@ -0,0 +1,74 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from world import SharedWorld, World
+
+FOE_HEALTH = 20
+
+def build_world(locations: int, items: int) -> World:
+    return World({
+        f"loc{i}": {"description": "", "connections": [],
+                    "items": [f"item{i}_{j}" for j in range(items)], "enemies": ["rookie_pirate"]}
+        for i in range(locations)
+    })
+
+async def measure(locations: int, players: int, ops: int, items: int, seed: int) -> dict:
+    shared = SharedWorld(build_world(locations, items))
+    names = [f"loc{i}" for i in range(locations)]
+    taken = [[] for _ in range(players)]
+    kills = [0] * players
+    foes = set()
+
+    async def player(n: int):
+        rng = random.Random(seed * 1000 + n)
+        for op in range(ops):
+            name = rng.choice(names)
+            if op % 2:
+                item = f"{name[3:]}_{rng.randrange(items)}"
+                if shared.take(name, "item" + item):
+                    taken[n].append(name + item)
+            else:
+                foe = shared.engage(name, "rookie_pirate", FOE_HEALTH)
+                foes.add(foe)
+                # Between engaging and hitting, other sessions run, as they would while a player decides.
+                await asyncio.sleep(0)
+                kills[n] += shared.hit(name, "rookie_pirate", foe, rng.randint(1, 8))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(player(n) for n in range(players)))
+    elapsed = time.perf_counter() - started
+
+    # Every item went to exactly one player, and every dead enemy was credited to exactly one.
+    all_taken = [item for mine in taken for item in mine]
+    state = shared.state()
+    double_taken = len(all_taken) - len(set(all_taken))
+    recorded = sum(len(items) for items in state["taken"].values())
+    dead = sum(1 for foe in foes if foe.health <= 0)
+    return {
+        "active_locations": locations,
+        "ops_per_sec": round(players * ops / elapsed),
+        "kills": sum(kills),
+        "consistent": double_taken == 0 and recorded == len(all_taken) and sum(kills) == dead,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Interleave sessions over a shared world and check it stays consistent.")
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--ops", type=int, default=2000, help="operations per player")
+    parser.add_argument("--items", type=int, default=50, help="items per location")
+    parser.add_argument("--locations", type=int, nargs="*", default=[1, 8, 64, 512])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = [asyncio.run(measure(locations, args.players, args.ops, args.items, args.seed))
+              for locations in args.locations]
+    print(json.dumps(report, indent=2))
+    if not all(row["consistent"] for row in report):
+        raise SystemExit(1)
@@ -0,0 +1,194 @@
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from adventure import Game, NullIO
+from bench_sessions import SCRIPT, ScriptedIO
+import replay
+
+# Bigger is better for these; everything else is a cost.
+THROUGHPUTS = ("turns_per_sec", "combats_per_sec", "replay_inputs_per_sec")
+
+class DiscardIO(NullIO):
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, text: str):
+        self.bytes += len(text)
+
+    def print(self, text: str = ""):
+        self.bytes += len(text) + 1
+
+class CombatIO(NullIO):
+    async def input(self, prompt: str = "") -> str:
+        return "attack"
+
+def best_of(repeats: int, run) -> float:
+    # The fastest of a few runs is the least disturbed by whatever else the machine is doing.
+    return min(run() for _ in range(repeats))
+
+def bench_import(repeats: int) -> dict:
+    code = ("import time; started = time.perf_counter(); import adventure; "
+            "print(time.perf_counter() - started)")
+    times = [float(subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True,
+                                  text=True, check=True).stdout) for _ in range(repeats)]
+    return {"import_ms": min(times) * 1000}
+
+def bench_construct(n: int, repeats: int) -> dict:
+    def run():
+        started = time.perf_counter()
+        for i in range(n):
+            Game(io=NullIO(), rng=random.Random(i))
+        return (time.perf_counter() - started) / n
+    return {"game_construct_us": best_of(repeats, run) * 1e6}
+
+def bench_turns(sessions: int, turns: int, repeats: int) -> dict:
+    def run():
+        games = [Game(io=ScriptedIO(SCRIPT), rng=random.Random(i)) for i in range(sessions)]
+
+        async def play():
+            for _ in range(turns):
+                for game in games:
+                    await game.handle_input()
+                    game.player.health = game.player.max_health
+
+        started = time.perf_counter()
+        asyncio.run(play())
+        return (time.perf_counter() - started) / (sessions * turns)
+    return {"turns_per_sec": 1 / best_of(repeats, run)}
+
+def bench_combat(n: int, repeats: int) -> dict:
+    enemies = list(Game().enemies)
+
+    def run():
+        game = Game(io=CombatIO(), rng=random.Random(0))
+        player = game.player
+
+        async def fight_all():
+            for i in range(n):
+                player.health = player.max_health = 10_000
+                await game.handle_combat(enemies[i % len(enemies)])
+
+        started = time.perf_counter()
+        asyncio.run(fight_all())
+        return (time.perf_counter() - started) / n
+    return {"combats_per_sec": 1 / best_of(repeats, run)}
+
+def bench_render(frames: int, repeats: int) -> dict:
+    game = Game(io=DiscardIO(), rng=random.Random(0))
+    locations = list(game.world.base)
+
+    def location():
+        async def draw():
+            for i in range(frames):
+                game.player.current_location = locations[i % len(locations)]
+                await game.display_location()
+
+        started = time.perf_counter()
+        asyncio.run(draw())
+        return (time.perf_counter() - started) / frames
+
+    def status_bar():
+        started = time.perf_counter()
+        for i in range(frames):
+            game.player.gold = i
+            game.display_status_bar()
+        return (time.perf_counter() - started) / frames
+
+    return {"display_location_us": best_of(repeats, location) * 1e6,
+            "display_status_bar_us": best_of(repeats, status_bar) * 1e6,
+            "frame_bytes": game.io.bytes // (frames * repeats * 2)}
+
+def bench_memory(sessions: int) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    games = [Game(io=ScriptedIO(SCRIPT), rng=random.Random(i)) for i in range(sessions)]
+    per_session = (tracemalloc.get_traced_memory()[0] - before) / sessions
+    tracemalloc.stop()
+    del games
+    return {"bytes_per_session": per_session}
+
+def bench_replays(directory: str, repeats: int) -> dict:
+    records = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".json"):
+            with open(os.path.join(directory, name)) as f:
+                records.append(json.load(f))
+    inputs = sum(len(record["inputs"]) for record in records)
+
+    def run():
+        started = time.perf_counter()
+        for record in records:
+            replay.replay(record)
+        return (time.perf_counter() - started) / inputs
+    return {"replay_inputs_per_sec": 1 / best_of(repeats, run)}
+
+def run_suite(quick: bool) -> dict:
+    scale = 10 if quick else 1
+    repeats = 5
+    results = {}
+    results.update(bench_import(repeats))
+    results.update(bench_construct(20000 // scale, repeats))
+    results.update(bench_turns(1000 // scale, 20, repeats))
+    results.update(bench_combat(5000 // scale, repeats))
+    results.update(bench_render(20000 // scale, repeats))
+    results.update(bench_memory(10000 // scale))
+    results.update(bench_replays(os.path.join(ROOT, "replays"), repeats))
+    return results
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for name, value in results.items():
+        old = baseline.get(name)
+        if not old or name == "frame_bytes":
+            continue
+        # Express every metric as "new cost / old cost".
+        ratio = old / value if name in THROUGHPUTS else value / old
+        if ratio > 1 + tolerance:
+            regressions.append(f"{name}: {old:.4g} -> {value:.4g} ({(ratio - 1) * 100:+.0f}% worse)")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fixed-seed benchmarks of the game's hot paths, as JSON.")
+    parser.add_argument("--quick", action="store_true", help="a tenth of the work, for a fast sanity run")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--compare", help="baseline report; exit non-zero if any metric regressed")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown before flagging")
+    args = parser.parse_args()
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": run_suite(args.quick),
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            report["regressions"] = compare(report["results"], json.load(f)["results"], args.tolerance)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if report.get("regressions"):
+        raise SystemExit(1)
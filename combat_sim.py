@@ -0,0 +1,278 @@
+import argparse
+import json
+import math
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from adventure import ESCAPE_CHANCE, EXPERIENCE_REWARD, GOLD_REWARD, POTION_HEALING, Fight, Game
+
+POTIONS = ("small_potion", "medium_potion", "large_potion")
+HEALING = np.array([POTION_HEALING[potion] for potion in POTIONS])
+
+ACTIVE, WON, DIED, ESCAPED = 0, 1, 2, 3
+OUTCOMES = {WON: "won", DIED: "died", ESCAPED: "escaped"}
+
+class Build(NamedTuple):
+    level: int = 1
+    weapon: Optional[str] = None
+    potions: Sequence[int] = (0, 0, 0)
+
+class Policy(NamedTuple):
+    # Fractions of max health at or below which the player drinks / tries to run.
+    potion_below: float = 0.3
+    run_below: float = 0.0
+
+class DrawStream:
+    """Serves one fight's pre-drawn uniforms to the scalar game code in call order."""
+
+    def __init__(self, row: np.ndarray):
+        self.row = row
+        self.position = 0
+
+    def random(self) -> float:
+        value = float(self.row[self.position])
+        self.position += 1
+        return value
+
+    def randint(self, a: int, b: int) -> int:
+        return a + int(self.random() * (b - a + 1))
+
+    def choice(self, seq: Sequence):
+        return seq[int(self.random() * len(seq))]
+
+def make_game(build: Build, rng=None) -> Game:
+    # Fights happen at the dock, which has no location loot table of its own.
+    game = Game(rng=rng)
+    player = game.player
+    for _ in range(build.level - 1):
+        player.level_up()
+    if build.weapon:
+        player.inventory.add(build.weapon)
+        player.equipped_weapon = build.weapon
+    for potion, count in zip(POTIONS, build.potions):
+        for _ in range(count):
+            player.inventory.add(potion)
+    return game
+
+def choose_action(health: int, max_health: int, potions: Sequence[int], policy: Policy) -> str:
+    if health <= policy.potion_below * max_health:
+        for potion, count in reversed(list(zip(POTIONS, potions))):
+            if count:
+                return potion
+    if health <= policy.run_below * max_health:
+        return "run"
+    return "attack"
+
+def max_draws(enemy, build: Build, game: Game) -> int:
+    player = game.player
+    attacks = math.ceil(enemy.health / player.get_total_damage())
+    healing = int(np.dot(HEALING, build.potions))
+    runs = math.ceil((player.max_health + healing) / enemy.damage)
+    # Enough for every turn to be a run attempt, plus the three victory rolls.
+    return attacks + sum(build.potions) + runs + 4
+
+def draw_uniforms(n: int, width: int, seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).random((n, width))
+
+def fight_scalar(enemy_type: str, build: Build, policy: Policy, row: np.ndarray) -> Dict[str, object]:
+    game = make_game(build, DrawStream(row))
+    player = game.player
+    fight = Fight(game, enemy_type)
+    outcome, turns = ACTIVE, 0
+    exp_gain = gold_reward = 0
+    drops = []
+
+    while outcome == ACTIVE:
+        turns += 1
+        potions = [player.inventory.count(potion) for potion in POTIONS]
+        action = choose_action(player.health, player.max_health, potions, policy)
+        if action == "attack":
+            fight.attack()
+        elif action == "run":
+            if fight.flee():
+                outcome = ESCAPED
+        else:
+            game.drink(action)
+
+        if fight.enemy_health <= 0:
+            outcome = WON
+            exp_gain, _, gold_reward, drops = fight.victory()
+        elif outcome == ACTIVE and player.health <= 0:
+            outcome = DIED
+
+    return {"outcome": outcome, "turns": turns, "health": player.health,
+            "experience": exp_gain, "gold": gold_reward, "loot": drops}
+
+def simulate(enemy_type: str, build: Build, policy: Policy, n: int, seed: int = 0,
+             uniforms: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    game = make_game(build)
+    player = game.player
+    enemy = game.enemies[enemy_type]
+    if uniforms is None:
+        uniforms = draw_uniforms(n, max_draws(enemy, build, game), seed)
+
+    damage = player.get_total_damage()
+    max_health = player.max_health
+    health = np.full(n, player.health, dtype=np.int64)
+    enemy_health = np.full(n, enemy.health, dtype=np.int64)
+    potions = np.tile(np.asarray(build.potions, dtype=np.int64), (n, 1))
+    drawn = np.zeros(n, dtype=np.int64)
+    turns = np.zeros(n, dtype=np.int64)
+    outcome = np.zeros(n, dtype=np.int8)
+
+    potion_limit = policy.potion_below * max_health
+    run_limit = policy.run_below * max_health
+    active = np.arange(n)
+    while active.size:
+        turns[active] += 1
+        hp = health[active]
+        has_potion = potions[active].any(axis=1)
+        drinks = (hp <= potion_limit) & has_potion
+        runs = ~drinks & (hp <= run_limit)
+        attacks = ~drinks & ~runs
+
+        rows = active[drinks]
+        if rows.size:
+            # Largest potion first, matching choose_action().
+            kind = 2 - np.argmax(potions[rows][:, ::-1] > 0, axis=1)
+            potions[rows, kind] -= 1
+            health[rows] = np.minimum(max_health, health[rows] + HEALING[kind])
+
+        rows = active[attacks]
+        if rows.size:
+            enemy_health[rows] -= damage
+            hit = rows[enemy_health[rows] > 0]
+            health[hit] -= enemy.damage
+
+        rows = active[runs]
+        if rows.size:
+            escaped = uniforms[rows, drawn[rows]] < ESCAPE_CHANCE
+            drawn[rows] += 1
+            outcome[rows[escaped]] = ESCAPED
+            health[rows[~escaped]] -= enemy.damage
+
+        outcome[active[enemy_health[active] <= 0]] = WON
+        still = active[outcome[active] == ACTIVE]
+        outcome[still[health[still] <= 0]] = DIED
+        active = active[outcome[active] == ACTIVE]
+
+    return {"outcome": outcome, "turns": turns, "health": health, "potions": potions,
+            **_victory_rolls(game, enemy, potions, outcome == WON, uniforms, drawn)}
+
+def _victory_rolls(game: Game, enemy, potions: np.ndarray, won: np.ndarray,
+                   uniforms: np.ndarray, drawn: np.ndarray) -> Dict[str, np.ndarray]:
+    player = game.player
+    n = won.size
+    rows = np.flatnonzero(won)
+    u = uniforms[rows[:, None], drawn[rows, None] + np.arange(4)]
+
+    low, high = EXPERIENCE_REWARD
+    experience = np.zeros(n, dtype=np.int64)
+    experience[rows] = low + (u[:, 0] * (high - low + 1)).astype(np.int64)
+    level = np.full(n, player.level, dtype=np.int64)
+    level[rows] += (player.experience + experience[rows]) >= player.experience_to_level
+
+    low, high = GOLD_REWARD
+    gold = np.zeros(n, dtype=np.int64)
+    gold[rows] = (low + (u[:, 1] * (high - low + 1)).astype(np.int64)) * level[rows]
+
+    # Index of the random drop in the enemy's loot table, or -1. A fresh game has no pity built up.
+    loot = np.full(n, -1, dtype=np.int64)
+    table = game.loot.enemies.get(enemy.key)
+    if table and table.items:
+        drops = u[:, 2] < table.chance
+        pick = np.zeros(rows.size, dtype=np.int64)
+        for value in np.unique(level[rows]):
+            at = level[rows] == value
+            pick[at] = table.alias(int(value)).picks(u[at, 3])
+        held = np.zeros((rows.size, len(table.items)), dtype=bool)
+        for j, item in enumerate(table.items):
+            if item in POTIONS:
+                held[:, j] = potions[rows, POTIONS.index(item)] > 0
+            else:
+                held[:, j] = item in player.inventory or item in table.guaranteed
+        keep = drops & ~held[np.arange(rows.size), pick]
+        loot[rows[keep]] = pick[keep]
+    return {"experience": experience, "gold": gold, "loot": loot}
+
+def drops_of(game: Game, enemy_type: str, won: bool, loot: int, potions: Sequence[int]) -> List[str]:
+    """The list Fight.victory() returns, rebuilt from one row of simulate()'s results."""
+    table = game.loot.enemies.get(enemy_type)
+    if not won or table is None:
+        return []
+    held = dict(zip(POTIONS, potions))
+    drops = [item for item in table.guaranteed
+             if not (held.get(item, 0) if item in POTIONS else item in game.player.inventory)]
+    if loot >= 0:
+        drops.append(table.items[loot])
+    return drops
+
+def verify(enemy_type: str, build: Build, policy: Policy, n: int = 1000, seed: int = 0) -> int:
+    game = make_game(build)
+    enemy = game.enemies[enemy_type]
+    uniforms = draw_uniforms(n, max_draws(enemy, build, game), seed)
+    batch = simulate(enemy_type, build, policy, n, uniforms=uniforms)
+    mismatches = 0
+    for i in range(n):
+        scalar = fight_scalar(enemy_type, build, policy, uniforms[i])
+        vector = {"outcome": batch["outcome"][i], "turns": batch["turns"][i],
+                  "health": batch["health"][i], "experience": batch["experience"][i],
+                  "gold": batch["gold"][i],
+                  "loot": drops_of(game, enemy_type, batch["outcome"][i] == WON, batch["loot"][i],
+                                   batch["potions"][i])}
+        if scalar != vector:
+            mismatches += 1
+    return mismatches
+
+def summarize(result: Dict[str, np.ndarray]) -> Dict[str, object]:
+    outcome = result["outcome"]
+    won = outcome == WON
+    percentiles = (5, 25, 50, 75, 95)
+
+    def distribution(values: np.ndarray) -> Dict[str, float]:
+        if not values.size:
+            return {}
+        return {f"p{p}": float(v) for p, v in zip(percentiles, np.percentile(values, percentiles))}
+
+    return {
+        **{f"{name}_rate": float(np.mean(outcome == code)) for code, name in OUTCOMES.items()},
+        "turns_to_kill": distribution(result["turns"][won]),
+        "health_remaining": distribution(result["health"][won]),
+        "mean_gold": float(result["gold"][won].mean()) if won.any() else 0.0,
+        "loot_rate": float(np.mean(result["loot"][won] >= 0)) if won.any() else 0.0,
+    }
+
+def sweep(enemy_types: List[str], builds: List[Build], policy: Policy, n: int, seed: int) -> List[dict]:
+    report = []
+    for enemy_type in enemy_types:
+        for build in builds:
+            result = simulate(enemy_type, build, policy, n, seed)
+            report.append({"enemy": enemy_type, "build": build._asdict(), **summarize(result)})
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run batches of headless fights for balance sweeps.")
+    parser.add_argument("--fights", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--enemies", nargs="*", default=list(Game().enemies))
+    parser.add_argument("--levels", type=int, nargs="*", default=[1, 2, 3, 4])
+    parser.add_argument("--weapons", nargs="*", default=["none", "rusty_sword", "steel_sword", "magic_cutlass"])
+    parser.add_argument("--potions", type=int, nargs=3, default=[1, 1, 0],
+                        metavar=("SMALL", "MEDIUM", "LARGE"))
+    parser.add_argument("--potion-below", type=float, default=0.3)
+    parser.add_argument("--run-below", type=float, default=0.0)
+    parser.add_argument("--verify", type=int, default=0,
+                        help="also replay N fights per cell through the scalar game rules")
+    args = parser.parse_args()
+
+    policy = Policy(args.potion_below, args.run_below)
+    builds = [Build(level, None if weapon == "none" else weapon, tuple(args.potions))
+              for level in args.levels for weapon in args.weapons]
+    if args.verify:
+        for enemy_type in args.enemies:
+            for build in builds:
+                mismatches = verify(enemy_type, build, policy, args.verify, args.seed)
+                if mismatches:
+                    raise SystemExit(f"{enemy_type} {build}: {mismatches} fights differ from the game rules")
+    print(json.dumps(sweep(args.enemies, builds, policy, args.fights, args.seed), indent=2))
@@ -0,0 +1,182 @@
+import random
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from adventure import ITEM_KEYS, POTION_HEALING, Fight, Game, NullIO, World, register_item
+
+POTIONS = tuple(POTION_HEALING)
+WEAPONS = ("rusty_sword", "steel_sword", "magic_cutlass")
+
+MOVE, TAKE, DRINK, EQUIP, BUY, ATTACK, RUN = range(7)
+
+DEATH_PENALTY = -100.0
+
+class PirateEnv:
+    def __init__(self, seed: Optional[int] = None, world: Optional[World] = None, max_steps: int = 500):
+        self.world = world
+        self.max_steps = max_steps
+        self.rng = random.Random(seed)
+
+        game = Game(io=NullIO(), world=world)
+        self.locations: List[str] = list(game.world.base)
+        for name in self.locations:
+            for item in game.world.items(name):
+                register_item(item)
+        # Same order as the item registry, so inventory counts copy straight across.
+        self.items: List[str] = list(ITEM_KEYS)
+        self.enemies: List[str] = list(game.enemies)
+        self.quests: List[str] = list(game.quests.book)
+        self.location_index = {name: i for i, name in enumerate(self.locations)}
+        self.item_index = {name: i for i, name in enumerate(self.items)}
+        self.enemy_index = {name: i for i, name in enumerate(self.enemies)}
+
+        self.actions: List[Tuple[int, str]] = (
+            [(MOVE, name) for name in self.locations]
+            + [(TAKE, name) for name in self.items]
+            + [(DRINK, name) for name in POTIONS]
+            + [(EQUIP, name) for name in WEAPONS]
+            + [(BUY, name) for name in Game.SHOP_ITEMS]
+            + [(ATTACK, ""), (RUN, "")]
+        )
+        # location, health, max health, gold, level, experience, weapon, map held, key held,
+        # enemy (or -1), enemy health, then one count per item and one flag per quest.
+        self.observation_size = 11 + len(self.items) + len(self.quests)
+        self.weapon_index = {None: -1, **{name: self.item_index[name] for name in WEAPONS}}
+        self.game: Game = game
+        self.fight: Optional[Fight] = None
+        self.steps = 0
+
+    @property
+    def action_count(self) -> int:
+        return len(self.actions)
+
+    def reset(self, seed: Optional[int] = None) -> np.ndarray:
+        if seed is not None:
+            self.rng.seed(seed)
+        self.game = Game(io=NullIO(), world=self.world, rng=self.rng)
+        self.fight = None
+        self.steps = 0
+        return self.observe()
+
+    def observe(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        if out is None:
+            out = np.zeros(self.observation_size, dtype=np.int32)
+        player = self.game.player
+        fight = self.fight
+        out[:11] = (
+            self.location_index[player.current_location], player.health, player.max_health,
+            player.gold, player.level, player.experience, self.weapon_index[player.equipped_weapon],
+            self.game.holds("treasure_map"), self.game.holds("spectral_key"),
+            self.enemy_index[fight.enemy_type] if fight else -1, fight.enemy_health if fight else 0,
+        )
+        # Only the items registered when the env was built have slots; any registered since are left out.
+        held = player.inventory.counts[:len(self.items)]
+        slots = out[11:11 + len(self.items)]
+        slots[:len(held)] = held
+        slots[len(held):] = 0
+        quest_flags = out[11 + len(self.items):]
+        for i, quest in enumerate(self.quests):
+            quest_flags[i] = quest in self.game.quest_log
+        return out
+
+    def _apply(self, kind: int, arg: str) -> bool:
+        game = self.game
+        player = game.player
+        fight = self.fight
+
+        if kind == DRINK:
+            return bool(game.drink(arg))
+        if fight:
+            if kind == ATTACK:
+                fight.attack()
+            elif kind == RUN:
+                if fight.flee():
+                    self.fight = None
+                    return True
+            else:
+                return False
+            if fight.enemy_health <= 0:
+                fight.victory()
+                self.fight = None
+            return True
+
+        if kind == MOVE:
+            if arg not in game.world.connections(player.current_location) or game.gate_message(arg):
+                return False
+            enemy_type = game.move(arg)
+            if enemy_type:
+                self.fight = Fight(game, enemy_type)
+            return True
+        if kind == TAKE:
+            if arg not in game.world.items(player.current_location):
+                return False
+            if arg == "treasure" and not game.holds("spectral_key"):
+                return False
+            game.take(arg)
+            return True
+        if kind == EQUIP:
+            if arg not in player.inventory:
+                return False
+            player.equipped_weapon = arg
+            return True
+        if kind == BUY:
+            return player.current_location == "market" and game.buy(arg)
+        return False
+
+    def step(self, action: int, out: Optional[np.ndarray] = None) -> Tuple[np.ndarray, float, bool]:
+        player = self.game.player
+        gold = player.gold
+        self.steps += 1
+        valid = self._apply(*self.actions[action])
+
+        reward = float(player.gold - gold) - (not valid)
+        done = False
+        if player.health <= 0:
+            reward += DEATH_PENALTY
+            done = True
+        elif "treasure" in player.inventory or self.steps >= self.max_steps:
+            done = True
+        return self.observe(out), reward, done
+
+class VectorEnv:
+    def __init__(self, n: int, seed: int = 0, world: Optional[World] = None, max_steps: int = 500):
+        self.envs = [PirateEnv(seed * 1_000_003 + i, world, max_steps) for i in range(n)]
+        self.action_count = self.envs[0].action_count
+        self.observations = np.zeros((n, self.envs[0].observation_size), dtype=np.int32)
+        self.rewards = np.zeros(n, dtype=np.float32)
+        self.dones = np.zeros(n, dtype=bool)
+
+    def reset(self) -> np.ndarray:
+        for env, row in zip(self.envs, self.observations):
+            env.reset()
+            env.observe(row)
+        return self.observations
+
+    def step(self, actions) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Finished games restart in place; their final observation is overwritten by the new start.
+        observations, rewards, dones = self.observations, self.rewards, self.dones
+        for i, (env, action) in enumerate(zip(self.envs, actions.tolist())):
+            _, rewards[i], dones[i] = env.step(action, observations[i])
+            if dones[i]:
+                env.reset()
+                env.observe(observations[i])
+        return observations, rewards, dones
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Measure random-policy steps per second.")
+    parser.add_argument("--envs", type=int, default=256)
+    parser.add_argument("--steps", type=int, default=200)
+    args = parser.parse_args()
+
+    vec = VectorEnv(args.envs)
+    vec.reset()
+    actions = np.random.default_rng(0).integers(0, vec.action_count, (args.steps, args.envs))
+    started = time.perf_counter()
+    for row in actions:
+        vec.step(row)
+    elapsed = time.perf_counter() - started
+    print(f"{args.envs * args.steps / elapsed:,.0f} steps/sec")
@@ -0,0 +1,205 @@
+import collections
+import contextlib
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    gold INTEGER NOT NULL,
+    treasure INTEGER NOT NULL,
+    death_location TEXT,
+    turns INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    finished REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_gold ON runs (gold DESC);
+CREATE INDEX IF NOT EXISTS runs_player ON runs (player, gold DESC);
+CREATE INDEX IF NOT EXISTS runs_level ON runs (level, gold DESC);
+-- Kept up to date with every batch, so aggregates never scan the runs.
+CREATE TABLE IF NOT EXISTS deaths (
+    location TEXT PRIMARY KEY,
+    runs INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS completions (
+    seconds INTEGER PRIMARY KEY,
+    runs INTEGER NOT NULL
+);
+"""
+
+# player, level, gold, treasure, death_location, turns, duration, finished
+Run = Tuple[str, int, int, int, Optional[str], int, float, float]
+
+class Leaderboard:
+    """Every finished run in a SQLite file, written by a background thread in batches.
+
+    record() only puts the run on a queue; the writer commits up to `batch` runs per
+    transaction, at most `interval` seconds after the first of them arrived. Deaths per
+    location and completion times (to the second) are counted as runs are written, so the
+    deadliest location and the median completion time cost the same however many runs are
+    stored, and top scores come straight off an index.
+    """
+
+    def __init__(self, path: str, batch: int = 1000, interval: float = 0.5):
+        self.path = path
+        self.batch = batch
+        self.interval = interval
+        self.queue: "queue.SimpleQueue[Optional[Run]]" = queue.SimpleQueue()
+        self.local = threading.local()
+        with contextlib.closing(self.connect()) as connection:
+            connection.executescript(SCHEMA)
+        self.writer = threading.Thread(target=self._write_loop, name="leaderboard", daemon=True)
+        self.writer.start()
+
+    def connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def record(self, game):
+        player = game.player
+        died = player.health <= 0
+        finished = time.time()
+        self.queue.put((game.captain or "anonymous", player.level, player.gold, "treasure" in player.inventory,
+                        player.current_location if died else None, game.turns_taken,
+                        finished - game.started, finished))
+
+    def add(self, connection: sqlite3.Connection, runs: Sequence[Run]):
+        deaths = collections.Counter(run[4] for run in runs if run[4])
+        completions = collections.Counter(int(run[6]) for run in runs if run[3])
+        with connection:
+            connection.executemany(
+                "INSERT INTO runs (player, level, gold, treasure, death_location, turns, duration, finished)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", runs)
+            connection.executemany(
+                "INSERT INTO deaths VALUES (?, ?)"
+                " ON CONFLICT (location) DO UPDATE SET runs = runs + excluded.runs", deaths.items())
+            connection.executemany(
+                "INSERT INTO completions VALUES (?, ?)"
+                " ON CONFLICT (seconds) DO UPDATE SET runs = runs + excluded.runs", completions.items())
+
+    def _write_loop(self):
+        with contextlib.closing(self.connect()) as connection:
+            running = True
+            while running:
+                run = self.queue.get()
+                if run is None:
+                    break
+                runs = [run]
+                deadline = time.monotonic() + self.interval
+                while len(runs) < self.batch:
+                    try:
+                        run = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if run is None:
+                        running = False
+                        break
+                    runs.append(run)
+                try:
+                    self.add(connection, runs)
+                except sqlite3.Error as error:
+                    # The batch is lost, but the writer carries on, so later runs are still recorded.
+                    print(f"Leaderboard: {len(runs)} runs not recorded: {error}", file=sys.stderr)
+
+    def close(self):
+        """Write everything recorded so far and stop the writer."""
+        self.queue.put(None)
+        self.writer.join()
+        connection = getattr(self.local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self.local.connection = None
+
+    def _reader(self) -> sqlite3.Connection:
+        # SQLite connections belong to the thread that opened them.
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self.local.connection = self.connect()
+        return connection
+
+    def top_gold(self, limit: int = 10, player: Optional[str] = None, level: Optional[int] = None) -> List[dict]:
+        query = "SELECT player, level, gold, treasure, death_location, turns, duration FROM runs"
+        if player is not None:
+            rows = self._reader().execute(query + " WHERE player = ? ORDER BY gold DESC LIMIT ?", (player, limit))
+        elif level is not None:
+            rows = self._reader().execute(query + " WHERE level = ? ORDER BY gold DESC LIMIT ?", (level, limit))
+        else:
+            rows = self._reader().execute(query + " ORDER BY gold DESC LIMIT ?", (limit,))
+        fields = ("player", "level", "gold", "treasure", "death_location", "turns", "duration")
+        return [dict(zip(fields, row)) for row in rows]
+
+    def deadliest(self, limit: int = 1) -> List[Tuple[str, int]]:
+        return self._reader().execute(
+            "SELECT location, runs FROM deaths ORDER BY runs DESC LIMIT ?", (limit,)).fetchall()
+
+    def median_completion(self) -> Optional[int]:
+        """Median seconds from start to treasure among completed runs, or None if there are none."""
+        histogram = self._reader().execute("SELECT seconds, runs FROM completions ORDER BY seconds").fetchall()
+        half = sum(runs for _, runs in histogram) / 2
+        seen = 0
+        for seconds, runs in histogram:
+            seen += runs
+            if seen >= half:
+                return seconds
+        return None
+
+    def runs(self) -> int:
+        # Runs are never deleted, so the last id is the count.
+        return self._reader().execute("SELECT COALESCE(MAX(id), 0) FROM runs").fetchone()[0]
+
+    def summary(self) -> Dict[str, object]:
+        return {"runs": self.runs(), "top_gold": self.top_gold(), "deadliest": self.deadliest(3),
+                "median_completion_seconds": self.median_completion()}
+
+def synthetic_runs(count: int, seed: int = 0) -> List[Run]:
+    import random
+
+    rng = random.Random(seed)
+    locations = ("dock", "tavern", "island", "cave", "ghost_ship", "temple_ruins", "secret_room")
+    now = time.time()
+    runs = []
+    for i in range(count):
+        treasure = rng.random() < 0.3
+        died = not treasure and rng.random() < 0.6
+        runs.append((f"captain{rng.randrange(count // 10 + 1)}", rng.randint(1, 8), rng.randint(0, 3000),
+                     treasure, rng.choice(locations) if died else None, rng.randint(10, 400),
+                     rng.uniform(60, 3600), now))
+    return runs
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Show the leaderboard, or fill one with synthetic runs and time its queries.")
+    parser.add_argument("path")
+    parser.add_argument("--fill", type=int, default=0, help="first add this many synthetic runs")
+    parser.add_argument("--chunk", type=int, default=100000)
+    args = parser.parse_args()
+
+    board = Leaderboard(args.path)
+    report: Dict[str, object] = {}
+    if args.fill:
+        connection = board.connect()
+        started = time.perf_counter()
+        for start in range(0, args.fill, args.chunk):
+            board.add(connection, synthetic_runs(min(args.chunk, args.fill - start), seed=start))
+        report["inserts_per_sec"] = round(args.fill / (time.perf_counter() - started))
+        connection.close()
+    timings = {}
+    for name, query in (("top_gold", board.top_gold), ("deadliest", board.deadliest),
+                        ("median_completion", board.median_completion)):
+        started = time.perf_counter()
+        query()
+        timings[name] = round((time.perf_counter() - started) * 1000, 3)
+    report["query_ms"] = timings
+    report.update(board.summary())
+    board.close()
+    print(json.dumps(report, indent=2))
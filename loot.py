@@ -0,0 +1,245 @@
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+# Weights stop growing past this level, which also bounds the alias tables kept per loot table.
+MAX_SCALED_LEVEL = 20
+
+class AliasTable:
+    """Vose's alias method: a weighted pick costs one uniform and two list lookups."""
+
+    __slots__ = ("prob", "alias", "n")
+
+    def __init__(self, weights: Sequence[float]):
+        n = len(weights)
+        total = float(sum(weights))
+        if not n or total <= 0 or min(weights) < 0:
+            raise ValueError("alias tables need at least one positive weight and none negative")
+        scaled = [w * n / total for w in weights]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        self.n = n
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Whatever is left over is 1 up to rounding error.
+
+    def pick(self, u: float) -> int:
+        scaled = u * self.n
+        i = min(int(scaled), self.n - 1)
+        return i if scaled - i < self.prob[i] else self.alias[i]
+
+    def picks(self, u):
+        """`pick` over a numpy array of uniforms."""
+        import numpy as np
+
+        scaled = np.asarray(u) * self.n
+        i = np.minimum(scaled.astype(np.int64), self.n - 1)
+        return np.where(scaled - i < np.asarray(self.prob)[i], i, np.asarray(self.alias)[i])
+
+    def probabilities(self) -> List[float]:
+        """The distribution the table actually samples, rebuilt from its columns."""
+        result = [0.0] * self.n
+        for i in range(self.n):
+            result[i] += self.prob[i] / self.n
+            result[self.alias[i]] += (1.0 - self.prob[i]) / self.n
+        return result
+
+class LootTable:
+    """One kill's loot: guaranteed drops, then a `chance` roll for one weighted random drop.
+
+    Each item's weight grows by its `per_level` amount for every player level above the first.
+    With `pity` set, a kill that follows that many kills without a random drop always drops.
+    """
+
+    def __init__(self, name: str, drops: Mapping[str, float], chance: float = 1.0,
+                 guaranteed: Sequence[str] = (), pity: Optional[int] = None,
+                 per_level: Optional[Mapping[str, float]] = None):
+        if pity is not None and pity < 1:
+            raise ValueError(f"{name}: pity must be at least 1")
+        self.name = name
+        self.items: Tuple[str, ...] = tuple(drops)
+        self.weights: Tuple[float, ...] = tuple(drops.values())
+        self.chance = chance
+        self.guaranteed: Tuple[str, ...] = tuple(guaranteed)
+        self.pity = pity
+        per_level = per_level or {}
+        for item in per_level:
+            if item not in drops:
+                raise ValueError(f"{name}: {item} scales with level but is not a drop")
+        self.per_level: Tuple[float, ...] = tuple(per_level.get(item, 0) for item in self.items)
+        self.scaled = any(self.per_level)
+        # Equal weights pick with rng.choice(), as drops always have, so seeds and recordings
+        # from before weighted tables still play out the same.
+        self.uniform = not self.scaled and len(set(self.weights)) == 1
+        self._alias: Dict[int, AliasTable] = {}
+
+    def alias(self, level: int = 1) -> AliasTable:
+        level = min(level, MAX_SCALED_LEVEL) if self.scaled else 1
+        table = self._alias.get(level)
+        if table is None:
+            table = self._alias[level] = AliasTable(self.weights_at(level))
+        return table
+
+    def weights_at(self, level: int) -> List[float]:
+        return [w + step * (level - 1) for w, step in zip(self.weights, self.per_level)]
+
+    def roll(self, rng, level: int, misses: int) -> Optional[str]:
+        """The random drop, if any; always draws one uniform, and a pick on a drop."""
+        if not self.items:
+            return None
+        if rng.random() < self.chance or (self.pity is not None and misses >= self.pity):
+            if self.uniform:
+                return rng.choice(self.items)
+            return self.items[self.alias(level).pick(rng.random())]
+        return None
+
+    def drop_rates(self, level: int = 1) -> Dict[str, float]:
+        """Expected random drops of each item per kill, pity included."""
+        if not self.items:
+            return {}
+        rate = self.chance
+        if self.pity is not None:
+            # Kills between drops form a renewal process capped at pity + 1.
+            rate = 1.0 / sum((1.0 - self.chance) ** k for k in range(self.pity + 1))
+        weights = self.weights_at(min(level, MAX_SCALED_LEVEL))
+        total = sum(weights)
+        return {item: rate * w / total for item, w in zip(self.items, weights)}
+
+    def roll_many(self, players: int, kills: int, level: int = 1, seed: int = 0):
+        """Random drops for `kills` kills by each of `players` players, with pity tracked per player.
+
+        Returns a (players, len(items)) numpy array of counts. Guaranteed drops are left out, and
+        every drop counts whether or not the player would already have held the item.
+        """
+        import numpy as np
+
+        counts = np.zeros((players, len(self.items)), dtype=np.int64)
+        if not self.items:
+            return counts
+        rng = np.random.default_rng(seed)
+        alias = self.alias(level)
+        misses = np.zeros(players, dtype=np.int64)
+        for _ in range(kills):
+            u = rng.random((2, players))
+            hit = u[0] < self.chance
+            if self.pity is not None:
+                hit |= misses >= self.pity
+            rows = np.flatnonzero(hit)
+            counts[rows, alias.picks(u[1, rows])] += 1
+            misses = np.where(hit, 0, misses + 1)
+        return counts
+
+class LootBook:
+    """Loot tables by enemy, plus optional extra tables rolled for kills at particular locations."""
+
+    def __init__(self, data: Mapping[str, Mapping[str, dict]]):
+        self.enemies: Dict[str, LootTable] = {
+            key: self._table(f"enemy:{key}", spec) for key, spec in data.get("enemies", {}).items()}
+        self.locations: Dict[str, LootTable] = {
+            key: self._table(f"location:{key}", spec) for key, spec in data.get("locations", {}).items()}
+
+    @staticmethod
+    def _table(name: str, spec: dict) -> LootTable:
+        return LootTable(name, spec.get("drops", {}), spec.get("chance", 1.0), spec.get("guaranteed", ()),
+                         spec.get("pity"), spec.get("per_level"))
+
+    def roll(self, rng, enemy: str, location: str, level: int, held, pity: Dict[str, int]) -> List[str]:
+        """Everything a kill drops that isn't already in `held`; updates the `pity` miss counts."""
+        drops: List[str] = []
+        for table in (self.enemies.get(enemy), self.locations.get(location)):
+            if table is None:
+                continue
+            for item in table.guaranteed:
+                if item not in held and item not in drops:
+                    drops.append(item)
+            item = table.roll(rng, level, pity.get(table.name, 0))
+            gained = item is not None and item not in held and item not in drops
+            if gained:
+                drops.append(item)
+            if table.pity is not None:
+                if gained:
+                    pity.pop(table.name, None)
+                else:
+                    pity[table.name] = pity.get(table.name, 0) + 1
+        return drops
+
+def check(book: LootBook, players: int = 100000, kills: int = 20, scalar_kills: int = 200000,
+          limit: float = 5.0) -> List[str]:
+    """Statistical self-check of every table's sampled rates against drop_rates().
+
+    Batch players all start right after a drop, so with pity `kills` should be well above it.
+    """
+    import random
+
+    failures = []
+    for table in list(book.enemies.values()) + list(book.locations.values()):
+        if not table.items:
+            continue
+        for level in sorted({1, 5, MAX_SCALED_LEVEL + 5} if table.scaled else {1}):
+            expected = table.drop_rates(level)
+            exact = table.alias(level).probabilities()
+            total = sum(table.weights_at(min(level, MAX_SCALED_LEVEL)))
+            for item, p, w in zip(table.items, exact, table.weights_at(min(level, MAX_SCALED_LEVEL))):
+                if abs(p - w / total) > 1e-9:
+                    failures.append(f"{table.name} level {level}: alias table gives {item} {p}, want {w / total}")
+
+            counts = table.roll_many(players, kills, level).sum(axis=0)
+            n = players * kills
+            rng = random.Random(level)
+            scalar = dict.fromkeys(table.items, 0)
+            misses = 0
+            for _ in range(scalar_kills):
+                item = table.roll(rng, level, misses)
+                misses = 0 if item else misses + 1
+                if item:
+                    scalar[item] += 1
+            for source, observed, trials in (("batch", dict(zip(table.items, counts.tolist())), n),
+                                             ("roll", scalar, scalar_kills)):
+                for item, rate in expected.items():
+                    # Pity makes successive kills dependent; the binomial spread is close enough
+                    # for a bound this loose.
+                    spread = (trials * rate * (1 - rate)) ** 0.5 or 1.0
+                    z = (observed[item] - trials * rate) / spread
+                    if abs(z) > limit:
+                        failures.append(f"{table.name} level {level} {source}: {item} dropped "
+                                        f"{observed[item] / trials:.5f} per kill, expected {rate:.5f} (z={z:.1f})")
+    return failures
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import random
+    import time
+
+    from adventure import DEFAULT_LOOT
+
+    parser = argparse.ArgumentParser(description="Check loot tables' drop rates and time the samplers.")
+    parser.add_argument("--players", type=int, default=100000)
+    parser.add_argument("--kills", type=int, default=20)
+    args = parser.parse_args()
+
+    failures = check(DEFAULT_LOOT, args.players, args.kills)
+    for line in failures:
+        print(line)
+
+    table = DEFAULT_LOOT.enemies["kraken_spawn"]
+    rng = random.Random(0)
+    started = time.perf_counter()
+    for _ in range(200000):
+        table.roll(rng, 3, 0)
+    scalar = (time.perf_counter() - started) / 200000
+    started = time.perf_counter()
+    table.roll_many(args.players, args.kills, 3)
+    batch = (time.perf_counter() - started) / (args.players * args.kills)
+    print(json.dumps({
+        "tables": len(DEFAULT_LOOT.enemies) + len(DEFAULT_LOOT.locations),
+        "failures": len(failures),
+        "us_per_roll": scalar * 1e6,
+        "batch_rolls_per_sec": 1 / batch,
+        "rates": {name: table.drop_rates() for name, table in DEFAULT_LOOT.enemies.items()},
+    }, indent=2))
+    raise SystemExit(1 if failures else 0)
@@ -0,0 +1,176 @@
+import math
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from adventure import POTION_HEALING, Game
+from sweep import Policy, equip_best, fight
+
+# What a bot can do between fights; fights themselves are played out by sweep's fighter.
+Action = Tuple[str, str]
+
+FIGHTER = Policy()
+
+def actions(game: Game) -> List[Action]:
+    player = game.player
+    location = player.current_location
+    options: List[Action] = [("take", item) for item in game.world.items(location)
+                             if item != "treasure" or game.holds("spectral_key")]
+    if location == "market":
+        options += [("buy", item) for item, price in game.SHOP_ITEMS.items() if price <= player.gold]
+    if player.health < player.max_health:
+        options += [("drink", potion) for potion in POTION_HEALING if potion in player.inventory]
+    options += [("move", name) for name in game.world.connections(location) if not game.gate_message(name)]
+    return options
+
+def apply(game: Game, action: Action):
+    kind, arg = action
+    if kind == "move":
+        enemy_type = game.move(arg)
+        if enemy_type:
+            fight(game, enemy_type, FIGHTER)
+    elif kind == "take":
+        game.take(arg)
+        equip_best(game)
+    elif kind == "buy":
+        game.buy(arg)
+        equip_best(game)
+    else:
+        game.drink(arg)
+
+def finished(game: Game) -> bool:
+    return game.player.health <= 0 or "treasure" in game.player.inventory
+
+def score(game: Game, gates: Tuple[str, ...]) -> float:
+    """1 for the treasure, 0 for dying, and in between for gate items, level and health."""
+    player = game.player
+    if player.health <= 0:
+        return 0.0
+    if "treasure" in player.inventory:
+        return 1.0
+    held = sum(game.holds(item) for item in gates) / len(gates) if gates else 0.0
+    return 0.1 + 0.6 * held + 0.1 * min(player.level, 5) / 5 + 0.1 * player.health / player.max_health
+
+class Node:
+    __slots__ = ("visits", "total", "children")
+
+    def __init__(self):
+        self.visits = 0
+        self.total = 0.0
+        self.children: Dict[Action, "Node"] = {}
+
+class MCTSBot:
+    """Open-loop Monte Carlo tree search over the moves between fights.
+
+    Every iteration forks the real game with its own random stream, walks the tree by UCT
+    (encounters and loot come out differently each time, so the tree holds action sequences
+    rather than states), adds one new action, then plays randomly to `depth` actions.
+    """
+
+    def __init__(self, iterations: int = 200, depth: int = 30, exploration: float = 0.7,
+                 seed: Optional[int] = None):
+        self.iterations = iterations
+        self.depth = depth
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.gates: Tuple[str, ...] = ()
+
+    def choose(self, game: Game) -> Action:
+        root = Node()
+        for _ in range(self.iterations):
+            sim = game.fork(rng=random.Random(self.rng.getrandbits(64)))
+            node, path, steps = root, [root], 0
+            while steps < self.depth and not finished(sim):
+                options = actions(sim)
+                untried = [action for action in options if action not in node.children]
+                if untried:
+                    action = self.rng.choice(untried)
+                    node.children[action] = node = Node()
+                else:
+                    action = max(options, key=lambda option: self._uct(node, node.children[option]))
+                    node = node.children[action]
+                apply(sim, action)
+                path.append(node)
+                steps += 1
+                if node.visits == 0:
+                    break
+            value = self.rollout(sim, self.depth - steps)
+            for visited in path:
+                visited.visits += 1
+                visited.total += value
+        return max(root.children.items(), key=lambda child: child[1].visits)[0]
+
+    def _uct(self, parent: Node, child: Node) -> float:
+        return child.total / child.visits + self.exploration * math.sqrt(math.log(parent.visits) / child.visits)
+
+    def rollout(self, game: Game, steps: int) -> float:
+        rng = self.rng
+        for _ in range(steps):
+            if finished(game):
+                break
+            options = actions(game)
+            # Picking things up is almost always right, so rollouts do it first.
+            takes = [action for action in options if action[0] == "take"]
+            apply(game, takes[0] if takes else rng.choice(options))
+        return score(game, self.gates)
+
+    def play(self, game: Game, max_turns: int = 300) -> int:
+        world = game.world
+        self.gates = tuple(sorted({world.requires(name) for name in world.base if world.requires(name)}))
+        turns = 0
+        while turns < max_turns and not finished(game):
+            turns += 1
+            apply(game, self.choose(game))
+        return turns
+
+def fork_cost(game: Game, forks: int = 20000) -> Dict[str, float]:
+    rng = random.Random(0)
+    started = time.perf_counter()
+    for _ in range(forks):
+        game.fork(rng=rng)
+    shared_rng = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(forks):
+        game.fork()
+    copied_rng = time.perf_counter() - started
+    return {"fork_us": round(shared_rng / forks * 1e6, 2), "fork_copying_rng_us": round(copied_rng / forks * 1e6, 2)}
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from adventure import NullIO
+    from world import World
+    from worldgen import Generator
+
+    parser = argparse.ArgumentParser(description="Play games with the tree-search bot and time Game.fork().")
+    parser.add_argument("--games", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=200, help="search iterations per move")
+    parser.add_argument("--depth", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fork-sizes", type=int, nargs="*", default=[1000, 100000],
+                        help="also time forks in generated worlds of these sizes")
+    args = parser.parse_args()
+
+    report: Dict[str, object] = {"fork": {"default": fork_cost(Game(io=NullIO(), rng=random.Random(0)))}}
+    for size in args.fork_sizes:
+        world = World({record.pop("location"): record for record in Generator(size, args.seed)})
+        game = Game(io=NullIO(), world=world, rng=random.Random(0))
+        # A bit of history, so there is something to copy.
+        for name in list(world)[:50]:
+            for item in game.world.items(name):
+                game.world.take(name, item)
+        report["fork"][str(size)] = fork_cost(game)
+
+    completed = died = turns = 0
+    started = time.perf_counter()
+    for index in range(args.games):
+        game = Game(io=NullIO(), rng=random.Random(args.seed * 1_000_003 + index))
+        turns += MCTSBot(args.iterations, args.depth, seed=index).play(game)
+        completed += "treasure" in game.player.inventory
+        died += game.player.health <= 0
+    elapsed = time.perf_counter() - started
+    report["bot"] = {"games": args.games, "completion_rate": completed / args.games,
+                     "death_rate": died / args.games, "mean_turns": turns / args.games,
+                     "seconds_per_move": round(elapsed / max(turns, 1), 4)}
+    print(json.dumps(report, indent=2))
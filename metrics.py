@@ -0,0 +1,207 @@
+import asyncio
+import bisect
+import os
+import time
+import weakref
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from 10 us to 5 s.
+LATENCY_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+def _escape(value) -> str:
+    # The exposition format's escapes for label values.
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(label_name: Optional[str], label, extra: str = "") -> str:
+    parts = [f'{label_name}="{_escape(label)}"'] if label_name and label is not None else []
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, label: Optional[str] = None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values: Dict[object, float] = {}
+
+    def inc(self, label=None, amount: float = 1):
+        self.values[label] = self.values.get(label, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_labels(self.label, label)} {value}" for label, value in sorted(
+            self.values.items(), key=lambda item: str(item[0]))]
+
+class Gauge:
+    """A value read when metrics are exported, so keeping it current costs nothing per turn."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def samples(self) -> List[str]:
+        return [f"{self.name} {self.read()}"]
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, label: Optional[str] = None,
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        # label -> [count per bucket (plus +Inf), sum]
+        self.series: Dict[object, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, label=None):
+        series = self.series.get(label)
+        if series is None:
+            series = self.series[label] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for label, (counts, total) in sorted(self.series.items(), key=lambda item: str(item[0])):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label, label, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label, label)} {total[0]}")
+            lines.append(f"{self.name}_count{_labels(self.label, label)} {cumulative}")
+        return lines
+
+class TimingIO:
+    """Wraps a game's io to add the time spent waiting for input to `game.waited`."""
+
+    def __init__(self, io, game):
+        self.io = io
+        self.game = game
+
+    def __getattr__(self, name):
+        return getattr(self.io, name)
+
+    async def input(self, prompt: str = "") -> str:
+        started = time.perf_counter()
+        try:
+            return await self.io.input(prompt)
+        finally:
+            self.game.waited += time.perf_counter() - started
+
+class Metrics:
+    def __init__(self):
+        # Sessions currently inside Game.play().
+        self.games: "weakref.WeakSet" = weakref.WeakSet()
+        self.turn_seconds = Histogram("pirate_turn_seconds", "Time to draw and handle one main-menu turn, "
+                                      "excluding time waiting for the player")
+        self.action_seconds = Histogram("pirate_action_seconds", "Time to handle a main-menu action, "
+                                        "excluding time waiting for the player", "action")
+        self.combat_round_seconds = Histogram("pirate_combat_round_seconds", "Time to resolve one combat round",
+                                              "enemy")
+        self.render_seconds = Histogram("pirate_render_seconds", "Time to build and write a location screen")
+        self.wake_seconds = Histogram("pirate_wake_seconds", "Time to bring a hibernated session back into memory")
+        self.encounters = Counter("pirate_encounters_total", "Random encounters", "enemy")
+        self.deaths = Counter("pirate_deaths_total", "Player deaths", "location")
+        self.escapes = Counter("pirate_escapes_total", "Successful escapes from combat", "enemy")
+        self.purchases = Counter("pirate_purchases_total", "Shop purchases", "item")
+        self.level_ups = Counter("pirate_level_ups_total", "Player level-ups")
+        self.sessions = Gauge("pirate_live_sessions", "Sessions currently playing", lambda: len(self.games))
+        self.gold = Gauge("pirate_gold_in_circulation", "Gold held by live players",
+                          lambda: sum(game.player.gold for game in list(self.games)))
+
+    def all(self):
+        return [metric for metric in vars(self).values() if hasattr(metric, "samples")]
+
+    def exposition(self) -> str:
+        lines = []
+        for metric in self.all():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        # Written whole and renamed, as the node exporter's textfile collector expects.
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "w") as f:
+            f.write(self.exposition())
+        os.replace(partial, path)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 9323) -> asyncio.AbstractServer:
+        async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+            try:
+                request = await reader.readline()
+                while (await reader.readline()).strip():
+                    pass
+                if request.split()[1:2] == [b"/metrics"]:
+                    body, status = self.exposition().encode(), b"200 OK"
+                else:
+                    body, status = b"not found\n", b"404 Not Found"
+                writer.write(b"HTTP/1.1 " + status + b"\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                             b"Content-Length: " + str(len(body)).encode() + b"\r\nConnection: close\r\n\r\n" + body)
+                await writer.drain()
+            except ConnectionError:
+                pass
+            finally:
+                writer.close()
+
+        return await asyncio.start_server(handle, host, port)
+
+# None while disabled: every hook in the game is a single `if metrics.active` check.
+active: Optional[Metrics] = None
+
+def enable() -> Metrics:
+    global active
+    if active is None:
+        active = Metrics()
+    return active
+
+def disable():
+    global active
+    active = None
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import random
+    import sys
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+    # The game reads the imported module's switch, not this script's copy of it.
+    import metrics
+    from adventure import Game
+    from bench_sessions import SCRIPT, ScriptedIO
+
+    parser = argparse.ArgumentParser(description="Per-turn cost of the instrumentation hooks, off and on.")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--show", action="store_true", help="print the resulting exposition")
+    args = parser.parse_args()
+
+    def measure() -> float:
+        games = [Game(io=ScriptedIO(SCRIPT), rng=random.Random(i)) for i in range(args.sessions)]
+
+        async def play():
+            for _ in range(args.turns):
+                for game in games:
+                    await game.display_location()
+                    await game.handle_input()
+                    game.player.health = game.player.max_health
+
+        started = time.perf_counter()
+        asyncio.run(play())
+        return (time.perf_counter() - started) / (args.sessions * args.turns) * 1e6
+
+    disabled = min(measure() for _ in range(3))
+    metrics.enable()
+    enabled = min(measure() for _ in range(3))
+    print(json.dumps({"us_per_turn_disabled": disabled, "us_per_turn_enabled": enabled}, indent=2))
+    if args.show:
+        print(metrics.active.exposition())
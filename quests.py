@@ -0,0 +1,169 @@
+import bisect
+import heapq
+from typing import Dict, Iterator, List, Mapping, NamedTuple, Set, Tuple
+
+# Trigger events. The key is a location, item or enemy name, or a gold amount for GOLD.
+ENTER, PICKUP, DEFEAT, GOLD = "enter", "pickup", "defeat", "gold"
+EVENTS = (ENTER, PICKUP, DEFEAT, GOLD)
+
+STARTED, COMPLETED = "started", "completed"
+
+class Quest(NamedTuple):
+    title: str
+    start: Tuple[str, object]
+    complete: Tuple[str, object]
+    gold: int = 0
+    items: Tuple[str, ...] = ()
+    # Repeatable quests can be picked up again once completed.
+    repeatable: bool = False
+
+class QuestBook:
+    """A quest catalogue with every trigger indexed by (event, key).
+
+    Gold thresholds are kept sorted, so an event only ever looks at the quests it can affect.
+    """
+
+    def __init__(self, quests: Mapping[str, dict]):
+        self.quests: Dict[str, Quest] = {}
+        self.starts: Dict[Tuple[str, object], List[Quest]] = {}
+        self.completes: Dict[Tuple[str, object], List[Quest]] = {}
+        gold_starts = []
+        for title, data in quests.items():
+            quest = Quest(
+                title,
+                tuple(data["start"]),
+                tuple(data["complete"]),
+                data.get("gold", 0),
+                tuple(data.get("items", ())),
+                data.get("repeatable", False),
+            )
+            for event, _ in (quest.start, quest.complete):
+                if event not in EVENTS:
+                    raise ValueError(f"{title}: unknown trigger event {event!r}")
+            self.quests[title] = quest
+            if quest.start[0] == GOLD:
+                gold_starts.append((quest.start[1], title))
+            else:
+                self.starts.setdefault(quest.start, []).append(quest)
+            if quest.complete[0] != GOLD:
+                self.completes.setdefault(quest.complete, []).append(quest)
+        gold_starts.sort()
+        self.gold_start_amounts = [amount for amount, _ in gold_starts]
+        self.gold_start_quests = [self.quests[title] for _, title in gold_starts]
+
+    def __contains__(self, title: str) -> bool:
+        return title in self.quests
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.quests)
+
+    def __len__(self) -> int:
+        return len(self.quests)
+
+class QuestLog:
+    __slots__ = ("book", "active", "done", "gold_goals", "gold_started")
+
+    def __init__(self, book: QuestBook):
+        self.book = book
+        # Active quests by title, in the order they were picked up.
+        self.active: Dict[str, Quest] = {}
+        self.done: Set[str] = set()
+        # (amount, title) for active quests that complete on reaching a gold amount.
+        self.gold_goals: List[Tuple[int, str]] = []
+        # How many of the book's gold-threshold starts have already fired.
+        self.gold_started = 0
+
+    def fork(self) -> "QuestLog":
+        child = QuestLog(self.book)
+        child.active = dict(self.active)
+        child.done = set(self.done)
+        child.gold_goals = list(self.gold_goals)
+        child.gold_started = self.gold_started
+        return child
+
+    def state(self) -> dict:
+        return {"active": list(self.active), "done": sorted(self.done), "gold_started": self.gold_started}
+
+    def restore(self, state: dict):
+        self.active = {title: self.book.quests[title] for title in state["active"] if title in self.book}
+        self.done = set(state["done"])
+        self.gold_started = state["gold_started"]
+        self.gold_goals = [(quest.complete[1], quest.title) for quest in self.active.values()
+                           if quest.complete[0] == GOLD]
+        heapq.heapify(self.gold_goals)
+
+    def fire(self, event: str, key, gold: int) -> List[Tuple[str, Quest]]:
+        changes: List[Tuple[str, Quest]] = []
+        for quest in self.book.starts.get((event, key), ()):
+            self._start(quest, gold, changes)
+        for quest in self.book.completes.get((event, key), ()):
+            if quest.title in self.active:
+                self._complete(quest, changes)
+        return changes
+
+    def gold(self, gold: int) -> List[Tuple[str, Quest]]:
+        changes: List[Tuple[str, Quest]] = []
+        book = self.book
+        reached = bisect.bisect_right(book.gold_start_amounts, gold)
+        while self.gold_started < reached:
+            self._start(book.gold_start_quests[self.gold_started], gold, changes)
+            self.gold_started += 1
+        goals = self.gold_goals
+        while goals and goals[0][0] <= gold:
+            _, title = heapq.heappop(goals)
+            quest = self.active.get(title)
+            if quest:
+                self._complete(quest, changes)
+        return changes
+
+    def _start(self, quest: Quest, gold: int, changes: List[Tuple[str, Quest]]):
+        if quest.title in self.active or (quest.title in self.done and not quest.repeatable):
+            return
+        self.active[quest.title] = quest
+        changes.append((STARTED, quest))
+        event, amount = quest.complete
+        if event == GOLD:
+            if gold >= amount:
+                self._complete(quest, changes)
+            else:
+                heapq.heappush(self.gold_goals, (amount, quest.title))
+
+    def _complete(self, quest: Quest, changes: List[Tuple[str, Quest]]):
+        del self.active[quest.title]
+        self.done.add(quest.title)
+        changes.append((COMPLETED, quest))
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    import time
+
+    parser = argparse.ArgumentParser(description="Time quest events against catalogues of growing size.")
+    parser.add_argument("--per-location", type=int, default=5,
+                        help="quests starting at each location, so catalogues grow with the map")
+    parser.add_argument("--events", type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    for size in (10, 1000, 100000):
+        places = [f"loc_{i}" for i in range(max(1, size // args.per_location))]
+        events = [(ENTER, rng.choice(places)) for _ in range(args.events)]
+        book = QuestBook({
+            f"quest_{i}": {
+                "start": (ENTER, rng.choice(places)),
+                "complete": rng.choice([(ENTER, rng.choice(places)), (GOLD, rng.randrange(1, 5000))]),
+                "gold": 10,
+            }
+            for i in range(size)
+        })
+        log = QuestLog(book)
+        gold = 0
+        started = time.perf_counter()
+        for event, key in events:
+            for kind, quest in log.fire(event, key, gold):
+                if kind == COMPLETED:
+                    gold += quest.gold
+            log.gold(gold)
+        elapsed = time.perf_counter() - started
+        print(f"{size:>7} quests: {elapsed / args.events * 1e6:.2f} us per move, "
+              f"{len(log.done)} completed")
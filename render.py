@@ -0,0 +1,158 @@
+import re
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+CLEAR = "\033[2J\033[H"
+ANSI_ESCAPE = re.compile(r"\033\[[0-9;]*[A-Za-z]")
+
+class Colors:
+    HEADER = '\033[95m'
+    BLUE = '\033[94m'
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    ENDC = '\033[0m'
+    BOLD = '\033[1m'
+
+RULE = f"{Colors.BOLD}{'=' * 60}{Colors.ENDC}"
+
+MAIN_MENU = (
+    f"\n{Colors.YELLOW}What would you like to do?{Colors.ENDC}\n"
+    "1. Move\n"
+    "2. Take item\n"
+    "3. Use item\n"
+    "4. View inventory\n"
+    "5. Shop (if in market)\n"
+    "6. Quit\n"
+    "7. Travel\n"
+)
+
+def bar(value: int, maximum: int, width: int = 20) -> str:
+    filled = int(value / maximum * width)
+    return "█" * filled + "░" * (width - filled)
+
+def status_bar(player) -> str:
+    return (
+        f"\n{RULE}\n"
+        f"{Colors.BOLD}Level: {player.level} | Gold: {player.gold}{Colors.ENDC}\n"
+        f"{Colors.RED}Health: [{bar(player.health, player.max_health)}] "
+        f"{player.health}/{player.max_health}{Colors.ENDC}\n"
+        f"{Colors.BLUE}EXP:    [{bar(player.experience, player.experience_to_level)}] "
+        f"{player.experience}/{player.experience_to_level}{Colors.ENDC}\n"
+        f"{RULE}\n\n"
+    )
+
+# Pre-colorized pieces that only depend on the (immutable, shared) base world, so every
+# session standing in the same place reuses the same strings.
+_pieces: "weakref.WeakKeyDictionary[object, Dict[str, Tuple[str, str, str]]]" = weakref.WeakKeyDictionary()
+# Item lines are keyed by the items left at a location, so taking one selects a fresh entry.
+_item_lines: Dict[Tuple[str, ...], str] = {}
+
+def location_pieces(game, location: str) -> Tuple[str, str, str]:
+    cache = _pieces.setdefault(game.world.base, {})
+    pieces = cache.get(location)
+    if pieces is None:
+        art = game.world.art(location)
+        art = f"{Colors.GREEN}{art}{Colors.ENDC}\n" if art else ""
+        pieces = cache[location] = (
+            f"{Colors.BOLD}{Colors.YELLOW}Location: {location.upper()}{Colors.ENDC}\n",
+            f"{Colors.BLUE}{game.world.description(location)}{Colors.ENDC}",
+            f"{art}\n{Colors.YELLOW}Paths:{Colors.ENDC} {', '.join(game.world.connections(location))}\n",
+        )
+    return pieces
+
+def item_line(items: List[str]) -> str:
+    key = tuple(items)
+    line = _item_lines.get(key)
+    if line is None:
+        if len(_item_lines) > 4096:
+            _item_lines.clear()
+        line = _item_lines[key] = f"{Colors.GREEN}Items here:{Colors.ENDC} {', '.join(items)}\n"
+    return line
+
+def location_frame(game) -> Tuple[str, str, str]:
+    location = game.player.current_location
+    title, description, paths = location_pieces(game, location)
+
+    tail: List[str] = [paths]
+    items = game.world.items(location)
+    if items:
+        tail.append(item_line(items))
+    if game.player.inventory:
+        tail.append(f"{Colors.BLUE}Inventory:{Colors.ENDC} {', '.join(game.player.inventory)}\n")
+    if game.quest_log:
+        tail.append(f"\n{Colors.YELLOW}Active Quests:{Colors.ENDC}\n")
+        tail.extend(f"- {quest}\n" for quest in game.quest_log)
+    return status_bar(game.player) + title, description, "".join(tail)
+
+def frame(game) -> str:
+    head, description, tail = location_frame(game)
+    return f"{CLEAR}{head}{description}\n{tail}"
+
+def visible_width(line: str) -> int:
+    return len(ANSI_ESCAPE.sub("", line))
+
+class Screen:
+    """Tracks what a remote terminal shows and sends only the rows that changed.
+
+    Output after a CLEAR is collected until the next prompt, then compared row by row
+    with what the terminal already displays. Anything the screen model can't vouch for
+    (scrolling, wrapped lines, the player's echoed input) forces a full redraw.
+    """
+
+    def __init__(self, rows: int = 24, columns: int = 80):
+        self.rows = rows
+        self.columns = columns
+        self.shown: Optional[List[Optional[str]]] = None
+        self.pending: Optional[List[str]] = None
+        self.prompt_row = 0
+        self.prompt_line = ""
+
+    def write(self, text: str) -> str:
+        if text.startswith(CLEAR):
+            self.pending = [text[len(CLEAR):]]
+            return ""
+        if self.pending is not None:
+            self.pending.append(text)
+            return ""
+        self._scrolled_by(text.count("\n"))
+        return text
+
+    def _scrolled_by(self, lines: int):
+        if self.shown is not None:
+            # Transient output below the prompt: forget those rows.
+            self.shown.extend([None] * lines)
+            if len(self.shown) >= self.rows:
+                self.shown = None
+
+    def prompt(self, prompt: str) -> str:
+        if self.pending is None:
+            # The player's Enter moves the cursor down one more row.
+            self._scrolled_by(prompt.count("\n") + 1)
+            return prompt
+
+        lines = ("".join(self.pending) + prompt).split("\n")
+        self.pending = None
+        shown, self.shown = self.shown, None
+        if len(lines) > self.rows or any(visible_width(line) >= self.columns for line in lines):
+            return CLEAR + "\n".join(lines)
+
+        if shown is None:
+            out = [CLEAR, "\n".join(lines)]
+        else:
+            out = []
+            for row, line in enumerate(lines[:-1]):
+                if row >= len(shown) or shown[row] != line:
+                    out.append(f"\033[{row + 1};1H{line}\033[K")
+            # Finish on the prompt row so the cursor ends up after it, wiping the player's
+            # last answer and whatever the previous screen had below.
+            row = len(lines)
+            if row == self.prompt_row and lines[-1] == self.prompt_line:
+                out.append(f"\033[{row};{visible_width(lines[-1]) + 1}H\033[J")
+            else:
+                out.append(f"\033[{row};1H\033[J{lines[-1]}")
+        # The player's typed answer lands on the prompt row, so it is never trusted,
+        # and their Enter moves the cursor to the row below it.
+        self.shown = lines[:-1] + [None, None]
+        self.prompt_row, self.prompt_line = len(lines), lines[-1]
+        return "".join(out)
@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import sys
+import time
+from typing import List, Optional
+
+from adventure import ConsoleIO, Game, NullIO
+from world import load_world
+
+class RecordingIO:
+    """Passes everything through to another io and keeps every line the player typed."""
+
+    def __init__(self, io):
+        self.io = io
+        self.inputs: List[str] = []
+
+    def __getattr__(self, name):
+        return getattr(self.io, name)
+
+    async def input(self, prompt: str = "") -> str:
+        line = await self.io.input(prompt)
+        self.inputs.append(line)
+        return line
+
+class ReplayIO(NullIO):
+    """Feeds recorded lines back with no output and no delays; EOFError when they run out."""
+
+    def __init__(self, inputs: List[str]):
+        self.inputs = inputs
+        self.position = 0
+
+    async def input(self, prompt: str = "") -> str:
+        if self.position >= len(self.inputs):
+            raise EOFError
+        line = self.inputs[self.position]
+        self.position += 1
+        return line
+
+class RandomPlayerIO(NullIO):
+    """Answers every prompt with a plausible random choice, for building a replay corpus."""
+
+    def __init__(self, game: Game, rng: random.Random, turns: int):
+        self.game = game
+        self.rng = rng
+        self.turns = turns
+
+    async def input(self, prompt: str = "") -> str:
+        game, rng = self.game, self.rng
+        player = game.player
+        if "Choose an action" in prompt:
+            self.turns -= 1
+            if self.turns <= 0:
+                return "6"
+            # Quit is 6 and Travel 7; 6 here stands for Travel, so the draws match older corpora.
+            action = rng.randint(1, 6)
+            return "7" if action == 6 else str(action)
+        if "Enter location" in prompt:
+            return rng.choice(game.world.connections(player.current_location))
+        if "Enter item name" in prompt:
+            return rng.choice(game.world.items(player.current_location) or ["nothing"])
+        if "Enter item number" in prompt or "Choose a potion" in prompt:
+            return str(rng.randint(1, max(1, len(player.inventory))))
+        if "What do you do?" in prompt:
+            if player.health < player.max_health // 3:
+                return rng.choice(["use_potion", "run"])
+            return "attack"
+        if "Travel to" in prompt:
+            return rng.choice(list(game.world.base))
+        if prompt == ">>> ":
+            return rng.choice(list(game.SHOP_ITEMS) + ["exit", "exit"])
+        return ""
+
+def recording(seed: int, inputs: List[str], game: Game, start: Optional[dict] = None,
+              world: Optional[str] = None) -> dict:
+    return {"seed": seed, "world": world, "start": start, "inputs": inputs, "final": game.snapshot()}
+
+async def _play(game: Game):
+    try:
+        await game.play()
+    except EOFError:
+        pass
+
+def replay(record: dict) -> Game:
+    world = load_world(record["world"]) if record.get("world") else None
+    game = Game(io=ReplayIO(record["inputs"]), world=world, rng=random.Random(record["seed"]))
+    if record.get("start"):
+        game.restore(record["start"])
+    asyncio.run(_play(game))
+    return game
+
+def differences(expected: dict, actual: dict) -> List[str]:
+    diffs = []
+    for field in sorted(expected.keys() | actual.keys()):
+        if field not in actual:
+            diffs.append(f"{field}: expected {expected[field]!r}, missing")
+        elif field not in expected:
+            diffs.append(f"{field}: unexpected {actual[field]!r}")
+        elif expected[field] != actual[field]:
+            diffs.append(f"{field}: expected {expected[field]!r}, got {actual[field]!r}")
+    return diffs
+
+def generate(count: int, directory: str, turns: int, seed: int):
+    os.makedirs(directory, exist_ok=True)
+    for i in range(count):
+        session_seed = seed * 1_000_003 + i
+        game = Game(io=NullIO(), rng=random.Random(session_seed))
+        game.io = RecordingIO(RandomPlayerIO(game, random.Random(~session_seed), turns))
+        asyncio.run(_play(game))
+        with open(os.path.join(directory, f"session_{i:04d}.json"), "w") as f:
+            json.dump(recording(session_seed, game.io.inputs, game), f)
+
+def check(paths: List[str]) -> int:
+    failures = 0
+    total_inputs = 0
+    started = time.perf_counter()
+    for path in paths:
+        with open(path) as f:
+            record = json.load(f)
+        total_inputs += len(record["inputs"])
+        diffs = differences(record["final"], replay(record).snapshot())
+        if diffs:
+            failures += 1
+            print(f"{path}: final state differs", file=sys.stderr)
+            for line in diffs:
+                print(f"  {line}", file=sys.stderr)
+    elapsed = time.perf_counter() - started
+    print(f"{len(paths)} replays, {total_inputs} inputs, {failures} differ; "
+          f"{elapsed * 1000 / max(1, len(paths)):.2f} ms per replay, "
+          f"{total_inputs / elapsed if elapsed else 0:,.0f} inputs/sec")
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record sessions and replay them deterministically.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    play = commands.add_parser("record", help="play in this terminal and save the session")
+    play.add_argument("path")
+    play.add_argument("--seed", type=int)
+    play.add_argument("--world")
+    build = commands.add_parser("generate", help="record random-input sessions as a replay corpus")
+    build.add_argument("directory")
+    build.add_argument("--count", type=int, default=20)
+    build.add_argument("--turns", type=int, default=150)
+    build.add_argument("--seed", type=int, default=0)
+    verify = commands.add_parser("check", help="replay recordings and compare final states")
+    verify.add_argument("paths", nargs="+", help="recording files or directories")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        seed = args.seed if args.seed is not None else random.getrandbits(32)
+        io = RecordingIO(ConsoleIO())
+        game = Game(io=io, world=load_world(args.world) if args.world else None, rng=random.Random(seed))
+        try:
+            asyncio.run(_play(game))
+        except KeyboardInterrupt:
+            pass
+        with open(args.path, "w") as f:
+            json.dump(recording(seed, io.inputs, game, world=args.world), f)
+    elif args.command == "generate":
+        generate(args.count, args.directory, args.turns, args.seed)
+    else:
+        paths = []
+        for path in args.paths:
+            paths.extend(sorted(glob.glob(os.path.join(path, "*.json"))) if os.path.isdir(path) else [path])
+        raise SystemExit(1 if check(paths) else 0)
@@ -0,0 +1,239 @@
+import collections
+import weakref
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Cache every (gate items held, destination) tree for maps up to this many
+# entries in total; bigger maps keep only the most recently used trees.
+ALL_PAIRS_LIMIT = 1 << 22
+LARGE_MAP_TREES = 64
+
+class RouteIndex:
+    """Shortest routes over a world graph for every combination of gate items held.
+
+    For each (held-items mask, destination) pair the index keeps a breadth-first tree of
+    next hops towards that destination, so a route is read off by following pointers.
+    Locations are numbered; a compiled world's own numbering and connection tables are used
+    as they are, so building the index decodes no locations.
+    """
+
+    def __init__(self, world, capacity: Optional[int] = None):
+        self.trees: "collections.OrderedDict[Tuple[int, int], Tuple[array, array]]" = collections.OrderedDict()
+        if hasattr(world, "sources"):
+            self.size = len(world)
+            self.number: Callable[[str], int] = world.number
+            self.name: Callable[[int], str] = world.name
+            self.sources: Callable[[int], Sequence[int]] = world.sources
+            self.gate_bits = world.gate_bits
+            self.gate_items: Dict[str, int] = world.gates()
+        else:
+            # An in-memory world is indexed in lists, which add_location() and friends update.
+            self.names: List[str] = []
+            self.index: Dict[str, int] = {}
+            self.into: List[List[int]] = []
+            self.gate_bits = []
+            self.gate_items = {}
+            self.size = 0
+            self.number = lambda name: self.index.get(name, -1)
+            self.name = self.names.__getitem__
+            self.sources = self.into.__getitem__
+            for name in world:
+                self._add_node(name, world[name].requires)
+            for name in world:
+                for neighbour in world[name].connections:
+                    self.into[self.index[neighbour]].append(self.index[name])
+
+        masks = 1 << len(self.gate_items)
+        if capacity is None:
+            fits = self.size * self.size * masks <= ALL_PAIRS_LIMIT
+            capacity = self.size * masks if fits else LARGE_MAP_TREES
+        self.capacity = capacity
+
+    def _add_node(self, name: str, requires: Optional[str]) -> int:
+        node = self.size
+        self.names.append(name)
+        self.index[name] = node
+        self.into.append([])
+        self.size += 1
+        bit = 0
+        if requires:
+            if requires not in self.gate_items:
+                # A new gate item changes what every mask means.
+                self.trees.clear()
+                self.gate_items[requires] = 1 << len(self.gate_items)
+            bit = self.gate_items[requires]
+        self.gate_bits.append(bit)
+        for dist, next_hop in self.trees.values():
+            dist.append(-1)
+            next_hop.append(-1)
+        return node
+
+    def mask(self, holds: Callable[[str], bool]) -> int:
+        return sum(bit for item, bit in self.gate_items.items() if holds(item))
+
+    def _tree(self, mask: int, target: int) -> Tuple[array, array]:
+        key = (mask, target)
+        tree = self.trees.get(key)
+        if tree is not None:
+            self.trees.move_to_end(key)
+            return tree
+
+        n = self.size
+        dist = array("i", [-1]) * n
+        next_hop = array("i", [-1]) * n
+        gate_bits, sources = self.gate_bits, self.sources
+        if gate_bits[target] & ~mask == 0:
+            dist[target] = 0
+            frontier = [target]
+            while frontier:
+                following = []
+                for v in frontier:
+                    d = dist[v] + 1
+                    for u in sources(v):
+                        if dist[u] < 0:
+                            dist[u] = d
+                            next_hop[u] = v
+                            # Entering u needs its gate item; the route's start is exempt.
+                            if gate_bits[u] & ~mask == 0:
+                                following.append(u)
+                frontier = following
+
+        self.trees[key] = (dist, next_hop)
+        if len(self.trees) > self.capacity:
+            self.trees.popitem(last=False)
+        return dist, next_hop
+
+    def route(self, source: str, target: str, holds: Callable[[str], bool]) -> Optional[List[str]]:
+        node, goal = self.number(source), self.number(target)
+        if node < 0 or goal < 0:
+            return None
+        if node == goal:
+            return []
+        dist, next_hop = self._tree(self.mask(holds), goal)
+        if dist[node] < 0:
+            return None
+        path = []
+        while node != goal:
+            node = next_hop[node]
+            path.append(self.name(node))
+        return path
+
+    def distance(self, source: str, target: str, holds: Callable[[str], bool]) -> int:
+        dist, _ = self._tree(self.mask(holds), self.number(target))
+        return dist[self.number(source)]
+
+    # Incremental updates, for in-memory worlds only: cached trees are patched or dropped
+    # rather than rebuilt from scratch.
+
+    def add_location(self, name: str, connections: Iterable[str] = (), requires: Optional[str] = None):
+        self._add_node(name, requires)
+        for neighbour in connections:
+            self.add_connection(name, neighbour)
+
+    def add_connection(self, source: str, target: str):
+        u, v = self.index[source], self.index[target]
+        self.into[v].append(u)
+        for (mask, _), (dist, next_hop) in self.trees.items():
+            if dist[v] < 0 or self.gate_bits[v] & ~mask or 0 <= dist[u] <= dist[v] + 1:
+                continue
+            # The new edge shortens u's route; push the improvement back through its predecessors.
+            dist[u] = dist[v] + 1
+            next_hop[u] = v
+            frontier = [u]
+            while frontier:
+                following = []
+                for x in frontier:
+                    if self.gate_bits[x] & ~mask:
+                        continue
+                    d = dist[x] + 1
+                    for w in self.into[x]:
+                        if dist[w] < 0 or d < dist[w]:
+                            dist[w] = d
+                            next_hop[w] = x
+                            following.append(w)
+                frontier = following
+
+    def remove_connection(self, source: str, target: str):
+        u, v = self.index[source], self.index[target]
+        self.into[v].remove(u)
+        # Only trees that actually routed through the removed edge need rebuilding.
+        stale = [key for key, (_, next_hop) in self.trees.items() if next_hop[u] == v]
+        for key in stale:
+            del self.trees[key]
+
+_indexes: "weakref.WeakKeyDictionary[object, RouteIndex]" = weakref.WeakKeyDictionary()
+
+def cached(world) -> Optional[RouteIndex]:
+    return _indexes.get(world)
+
+def index_for(world) -> RouteIndex:
+    index = _indexes.get(world)
+    if index is None:
+        index = _indexes[world] = RouteIndex(world)
+    return index
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import random
+    import tempfile
+    import time
+
+    from world import World, export_world, load_world
+
+    parser = argparse.ArgumentParser(description="Time route index builds and lookups on a random map.")
+    parser.add_argument("--locations", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--destinations", type=int, default=16)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    names = [f"loc_{i}" for i in range(args.locations)]
+    edges: Dict[str, List[str]] = {name: [] for name in names}
+    for i in range(1, args.locations):
+        j = rng.randrange(max(0, i - 50), i)
+        edges[names[i]].append(names[j])
+        edges[names[j]].append(names[i])
+    gates = ["compass", "treasure_map", "spectral_key"]
+    world = World({name: {"description": "", "connections": edges[name], "items": [], "enemies": [],
+                          "requires": rng.choice(gates) if rng.random() < 0.01 else None}
+                   for name in names})
+
+    started = time.perf_counter()
+    index = RouteIndex(world)
+    built = time.perf_counter() - started
+
+    destinations = rng.sample(names, args.destinations)
+    holds = lambda item: item != "spectral_key"
+    started = time.perf_counter()
+    for destination in destinations:
+        index.route(names[0], destination, holds)
+    first = (time.perf_counter() - started) / args.destinations
+
+    pairs = [(rng.choice(names), rng.choice(destinations)) for _ in range(args.lookups)]
+    started = time.perf_counter()
+    hops = 0
+    for source, destination in pairs:
+        path = index.route(source, destination, holds)
+        hops += len(path) if path else 0
+    cached = (time.perf_counter() - started) / args.lookups
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "world.jsonl")
+        export_world(world, source)
+        mapped = load_world(source)
+        started = time.perf_counter()
+        mapped_index = RouteIndex(mapped)
+        mapped_built = time.perf_counter() - started
+        started = time.perf_counter()
+        for destination in destinations:
+            if mapped_index.route(names[0], destination, holds) != index.route(names[0], destination, holds):
+                raise SystemExit(f"compiled world routes differently to {destination}")
+        mapped_first = (time.perf_counter() - started) / args.destinations
+        decoded = len(mapped._loaded)
+
+    print(f"build: {built * 1000:.1f} ms")
+    print(f"first lookup per destination: {first * 1000:.1f} ms")
+    print(f"cached lookup: {cached * 1e6:.1f} us (mean route {hops / args.lookups:.1f} hops)")
+    print(f"compiled world: build {mapped_built * 1000:.1f} ms, first lookup per destination "
+          f"{mapped_first * 1000:.1f} ms, {decoded} locations decoded")
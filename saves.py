@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+from typing import Dict, List, Optional
+
+SNAPSHOT = "snapshot.jsonl"
+LOG = "journal.jsonl"
+
+encode = json.JSONEncoder(separators=(",", ":")).encode
+
+class SaveStore:
+    """Append-only journal of every session's state changes, shared by all sessions of a process.
+
+    Each record holds only the fields an event changed. Records are buffered and written with
+    one fsync per flush (group commit); once the log grows past `compact_every` records the
+    latest state of every session is written to a snapshot and the log starts over. Records
+    carry a sequence number, so a crash between the two steps never replays stale changes.
+    """
+
+    def __init__(self, directory: str, compact_every: int = 100000):
+        self.directory = directory
+        self.compact_every = compact_every
+        self.states: Dict[str, dict] = {}
+        self.pending: List[dict] = []
+        self.sequence = 0
+        self.logged = 0
+        self.writing: Optional[asyncio.Future] = None
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+        self.log = open(os.path.join(directory, LOG), "ab")
+
+    def _load(self):
+        snapshot_sequence = 0
+        path = os.path.join(self.directory, SNAPSHOT)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                snapshot_sequence = json.loads(f.readline())["sequence"]
+                for line in f:
+                    record = json.loads(line)
+                    self.states[record["session"]] = record["state"]
+        self.sequence = snapshot_sequence
+        path = os.path.join(self.directory, LOG)
+        if os.path.exists(path):
+            with open(path, "r+b") as f:
+                good = 0
+                for line in f:
+                    try:
+                        # A line without its newline was cut short too, even if it happens to parse.
+                        record = json.loads(line) if line.endswith(b"\n") else None
+                    except ValueError:
+                        record = None
+                    if record is None:
+                        # A torn write at the end of the log from a crash mid-flush.
+                        break
+                    good += len(line)
+                    self.logged += 1
+                    if record["n"] <= snapshot_sequence:
+                        continue
+                    self.states.setdefault(record["session"], {}).update(record["changes"])
+                    self.sequence = record["n"]
+                # Cut the torn tail off, or the next record appended would be glued onto it.
+                f.truncate(good)
+
+    def load(self, session: str) -> Optional[dict]:
+        state = self.states.get(session)
+        return dict(state) if state else None
+
+    def discard(self, session: str):
+        """Forget a session's state, so its next journal starts over with a whole state."""
+        self.states.pop(session, None)
+
+    def append(self, session: str, event: str, key, changes: dict):
+        self.sequence += 1
+        self.states.setdefault(session, {}).update(changes)
+        # Change sets are never mutated afterwards, so encoding them can wait for the flush.
+        self.pending.append({"n": self.sequence, "session": session, "event": event,
+                             "key": key, "changes": changes})
+
+    def flush(self):
+        self._write(self._take())
+
+    def _take(self) -> Optional[tuple]:
+        # Runs on the event loop, so it can read session states safely; _write may not.
+        if not self.pending:
+            return None
+        batch, self.pending = self.pending, []
+        self.logged += len(batch)
+        snapshot = None
+        if self.logged >= self.compact_every:
+            snapshot = (self.sequence, [(session, dict(state)) for session, state in self.states.items()])
+            self.logged = 0
+        return batch, snapshot
+
+    def _write(self, work: Optional[tuple]):
+        if work is None:
+            return
+        batch, snapshot = work
+        self.log.write("".join(encode(record) + "\n" for record in batch).encode())
+        self.log.flush()
+        os.fsync(self.log.fileno())
+        if snapshot:
+            path = os.path.join(self.directory, SNAPSHOT)
+            sequence, states = snapshot
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(encode({"sequence": sequence}) + "\n")
+                f.writelines(encode({"session": session, "state": state}) + "\n" for session, state in states)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + ".tmp", path)
+            self.log.close()
+            self.log = open(os.path.join(self.directory, LOG), "wb")
+
+    async def run(self, interval: float = 0.05):
+        """Flush every `interval` seconds, doing the file work off the event loop."""
+        while True:
+            await asyncio.sleep(interval)
+            # Shielded, so cancelling run() never abandons a write halfway; aclose() waits for it.
+            self.writing = asyncio.ensure_future(asyncio.to_thread(self._write, self._take()))
+            await asyncio.shield(self.writing)
+
+    def close(self):
+        self.flush()
+        self.log.close()
+
+    async def aclose(self):
+        """close() once any write run() started has finished, so batches stay in order."""
+        if self.writing:
+            await asyncio.wait((self.writing,))
+        self.close()
+
+class Journal:
+    __slots__ = ("store", "session", "last")
+
+    def __init__(self, store: SaveStore, session: str, game):
+        self.store = store
+        self.session = session
+        # A new session's first record carries its whole state; a resumed one only what changes.
+        self.last = game.snapshot() if session in store.states else {}
+
+    def record(self, game, event: str, key=None):
+        state = game.snapshot()
+        last = self.last
+        changes = {field: value for field, value in state.items() if field not in last or last[field] != value}
+        if changes:
+            self.store.append(self.session, event, key, changes)
+        self.last = state
@@ -0,0 +1,409 @@
+import argparse
+import asyncio
+import collections
+import json
+import os
+import pickle
+import random
+import time
+import zlib
+from array import array
+from typing import Deque, Dict, Optional, Set
+
+import metrics
+from adventure import DEFAULT_WORLD, Colors, Game
+from leaderboard import Leaderboard
+from render import CLEAR, Screen
+from replay import RecordingIO, recording
+from saves import Journal, SaveStore
+from world import SharedWorld, load_world
+
+class StreamIO:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 host: "SessionHost", delay_scale: float = 1.0, screen_rows: int = 0):
+        self.reader = reader
+        self.writer = writer
+        self.host = host
+        self.delay_scale = delay_scale
+        self.turn_started: Optional[float] = None
+        # The line being read; it outlives the Game while the session is hibernated.
+        self.pending: Optional[asyncio.Future] = None
+        # Set by the Hibernator to ask a session parked at the menu to hibernate now.
+        self.evict: Optional[asyncio.Future] = None
+        # Diffed screen updates need to know the terminal won't scroll under them,
+        # so they are only used when the client's height is known.
+        self.screen = Screen(screen_rows) if screen_rows and not delay_scale else None
+
+    async def input(self, prompt: str = "") -> str:
+        if self.pending is None:
+            if self.turn_started is not None:
+                self.host.record_turn(time.perf_counter() - self.turn_started)
+            menu = prompt == Game.MENU_PROMPT
+            if self.screen:
+                prompt = self.screen.prompt(prompt)
+            self._send(prompt)
+            await self.writer.drain()
+            self.pending = asyncio.ensure_future(self.reader.readline())
+            if menu and self.host.hibernator:
+                # Raises Hibernate if the player stays idle or memory is needed.
+                await self.host.hibernator.park(self)
+        line = await self.pending
+        self.pending = None
+        if not line:
+            raise EOFError
+        self.turn_started = time.perf_counter()
+        return line.decode(errors="replace").strip()
+
+    @property
+    def typewriter(self) -> bool:
+        return self.delay_scale > 0
+
+    def print(self, text: str = ""):
+        self.write(text + "\n")
+
+    def write(self, text: str):
+        if self.screen:
+            text = self.screen.write(text)
+        self._send(text)
+
+    def _send(self, text: str):
+        if text:
+            self.writer.write(text.replace("\n", "\r\n").encode())
+
+    async def print_slow(self, text: str, delay: float = 0.03):
+        delay *= self.delay_scale
+        if not delay:
+            self.print(text)
+            return
+        for char in text.replace("\n", "\r\n"):
+            self.writer.write(char.encode())
+            await self.writer.drain()
+            await asyncio.sleep(delay)
+        self.writer.write(b"\r\n")
+
+    async def sleep(self, seconds: float):
+        if self.delay_scale:
+            await asyncio.sleep(seconds * self.delay_scale)
+
+    def clear(self):
+        self.write(CLEAR)
+
+class Hibernate(Exception):
+    """Unwinds a session's Game from the main-menu prompt so it can be dropped from memory."""
+
+class Hibernator:
+    """Keeps at most `max_resident` Games in memory; the rest wait on disk.
+
+    Sessions become candidates when they reach the main-menu prompt. One idle there for
+    `idle` seconds, or the least recently used one when a slot is needed, is written to
+    `directory` and its Game dropped. The next line the player sends brings it back.
+    """
+
+    def __init__(self, directory: str, idle: float = 300.0, max_resident: int = 1000,
+                 latency_window: int = 100000):
+        self.directory = directory
+        self.idle = idle or None
+        self.max_resident = max_resident
+        self.resident = 0
+        self.hibernated = 0
+        # Sessions waiting at the menu, least recently used first.
+        self.parked: "collections.OrderedDict[StreamIO, None]" = collections.OrderedDict()
+        self.changed = asyncio.Condition()
+        self.wake_latencies: Deque[float] = collections.deque(maxlen=latency_window)
+        os.makedirs(directory, exist_ok=True)
+        # Sessions don't outlive their connection, so anything here is from an earlier run.
+        for entry in os.listdir(directory):
+            if entry.endswith(".session"):
+                os.remove(os.path.join(directory, entry))
+
+    async def admit(self):
+        """Wait for room for one more Game in memory, hibernating idle sessions to make it."""
+        async with self.changed:
+            while self.resident >= self.max_resident:
+                if self.parked:
+                    io, _ = self.parked.popitem(last=False)
+                    if not io.evict.done():
+                        io.evict.set_result(None)
+                await self.changed.wait()
+            self.resident += 1
+
+    async def release(self):
+        async with self.changed:
+            self.resident -= 1
+            self.changed.notify_all()
+
+    async def park(self, io: StreamIO):
+        io.evict = asyncio.get_running_loop().create_future()
+        self.parked[io] = None
+        async with self.changed:
+            self.changed.notify_all()
+        try:
+            done, _ = await asyncio.wait((io.pending, io.evict), timeout=self.idle,
+                                         return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self.parked.pop(io, None)
+        if io.pending not in done:
+            raise Hibernate
+
+    def path(self, session: int) -> str:
+        return os.path.join(self.directory, f"{session}.session")
+
+    def store(self, session: int, game: Game):
+        version, state, gauss = game.rng.getstate()
+        data = pickle.dumps((game.snapshot(), version, array("I", state).tobytes(), gauss, game.waited,
+                             game.turns_taken, game.started), protocol=pickle.HIGHEST_PROTOCOL)
+        with open(self.path(session), "wb") as f:
+            f.write(zlib.compress(data, 1))
+        self.hibernated += 1
+
+    def load(self, session: int, game: Game):
+        path = self.path(session)
+        with open(path, "rb") as f:
+            snapshot, version, state, gauss, waited, turns_taken, started = pickle.loads(zlib.decompress(f.read()))
+        os.remove(path)
+        self.hibernated -= 1
+        game.restore(snapshot)
+        game.rng.setstate((version, tuple(array("I", state)), gauss))
+        game.waited = waited
+        game.turns_taken = turns_taken
+        game.started = started
+
+class SessionHost:
+    def __init__(self, delay_scale: float = 1.0, max_sessions: int = 10000,
+                 latency_window: int = 100000, screen_rows: int = 0, world=None,
+                 saves: Optional[SaveStore] = None, record_dir: Optional[str] = None,
+                 world_path: Optional[str] = None, hibernator: Optional[Hibernator] = None,
+                 leaderboard: Optional[Leaderboard] = None):
+        self.delay_scale = delay_scale
+        self.hibernator = hibernator
+        self.leaderboard = leaderboard
+        self.world = world
+        self.world_path = world_path
+        self.saves = saves
+        self.record_dir = record_dir
+        self.playing: Set[str] = set()
+        self.screen_rows = screen_rows
+        self.max_sessions = max_sessions
+        self.active = 0
+        self.total = 0
+        self.turns = 0
+        self.latencies: Deque[float] = collections.deque(maxlen=latency_window)
+
+    def record_turn(self, seconds: float):
+        self.turns += 1
+        self.latencies.append(seconds)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        if self.active >= self.max_sessions:
+            writer.write(b"Server full, try again later.\r\n")
+            await writer.drain()
+            writer.close()
+            return
+
+        self.active += 1
+        self.total += 1
+        session = self.total
+        seed = random.getrandbits(32)
+        stream = StreamIO(reader, writer, self, self.delay_scale, self.screen_rows)
+        hibernator = self.hibernator
+        resident = False
+        if hibernator:
+            await hibernator.admit()
+            resident = True
+        game = Game(io=stream, world=self.world, rng=random.Random(seed))
+        game.leaderboard = self.leaderboard
+        io = stream
+        name = start = None
+        try:
+            if self.saves:
+                name = await self.sign_in(game)
+                if name is None:
+                    return
+            if self.record_dir:
+                start = game.snapshot() if name else None
+                game.io = io = RecordingIO(game.io)
+            running = game.play()
+            while True:
+                try:
+                    await running
+                    break
+                except Hibernate:
+                    hibernator.store(session, game)
+                # Outside the except block, so no traceback keeps the old Game's frames alive.
+                game = running = None
+                await hibernator.release()
+                resident = False
+                await asyncio.wait((stream.pending,))
+                await hibernator.admit()
+                resident = True
+                started = time.perf_counter()
+                game = Game(io=io, world=self.world, rng=random.Random(0))
+                game.leaderboard = self.leaderboard
+                hibernator.load(session, game)
+                if name:
+                    game.journal = Journal(self.saves, name, game)
+                    game.captain = name
+                hibernator.wake_latencies.append(time.perf_counter() - started)
+                if metrics.active:
+                    metrics.active.wake_seconds.observe(hibernator.wake_latencies[-1])
+                running = game.turns(resumed=True)
+            await writer.drain()
+        except (EOFError, ConnectionError):
+            pass
+        finally:
+            self.active -= 1
+            self.playing.discard(name)
+            writer.close()
+            if resident:
+                await hibernator.release()
+            if isinstance(io, RecordingIO) and game:
+                path = os.path.join(self.record_dir, f"{session:06d}-{seed}.json")
+                with open(path, "w") as f:
+                    json.dump(recording(seed, io.inputs, game, start, self.world_path), f)
+
+    async def sign_in(self, game: Game) -> Optional[str]:
+        name = (await game.io.input(f"{Colors.GREEN}Captain's name:{Colors.ENDC} ")).strip().lower()
+        if not name:
+            return None
+        if name in self.playing:
+            game.io.print(f"{Colors.RED}That captain is already at sea.{Colors.ENDC}")
+            return None
+        self.playing.add(name)
+        state = self.saves.load(name)
+        # A captain who died starts over.
+        if state and state["health"] > 0:
+            game.restore(state)
+            game.io.print(f"{Colors.YELLOW}Welcome back, {name}!{Colors.ENDC}")
+        elif state:
+            self.saves.discard(name)
+        game.journal = Journal(self.saves, name, game)
+        game.captain = name
+        return name
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 2323) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle, host, port, backlog=4096)
+
+    def stats(self) -> Dict[str, float]:
+        latencies = sorted(self.latencies)
+
+        def percentile(values, p: float) -> float:
+            if not values:
+                return 0.0
+            return values[min(len(values) - 1, int(p * len(values)))]
+
+        stats = {
+            "active_sessions": self.active,
+            "total_sessions": self.total,
+            "turns": self.turns,
+            "p50_turn_ms": percentile(latencies, 0.50) * 1000,
+            "p99_turn_ms": percentile(latencies, 0.99) * 1000,
+        }
+        if self.hibernator:
+            wakes = sorted(self.hibernator.wake_latencies)
+            stats.update({
+                "resident_sessions": self.hibernator.resident,
+                "hibernated_sessions": self.hibernator.hibernated,
+                "p50_wake_ms": percentile(wakes, 0.50) * 1000,
+                "p99_wake_ms": percentile(wakes, 0.99) * 1000,
+            })
+        return stats
+
+def raise_fd_limit():
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+async def write_metrics(collected: metrics.Metrics, path: str, interval: float):
+    while True:
+        collected.write_textfile(path)
+        await asyncio.sleep(interval)
+
+async def keep_world(shared: SharedWorld, path: str, interval: float):
+    while True:
+        await asyncio.sleep(interval)
+        shared.save(path)
+
+async def main(args: argparse.Namespace):
+    raise_fd_limit()
+    world = load_world(args.world) if args.world else None
+    shared = state_path = None
+    if args.shared_world:
+        shared = world = SharedWorld(world or DEFAULT_WORLD)
+        if args.save_dir:
+            os.makedirs(args.save_dir, exist_ok=True)
+            state_path = os.path.join(args.save_dir, "world.json")
+            shared.load(state_path)
+    host = SessionHost(delay_scale=args.delay_scale, max_sessions=args.max_sessions,
+                       screen_rows=args.screen_rows, world=world,
+                       saves=SaveStore(args.save_dir) if args.save_dir else None,
+                       record_dir=args.record_dir, world_path=args.world,
+                       hibernator=Hibernator(args.hibernate_dir, args.hibernate_after, args.max_resident)
+                       if args.hibernate_dir else None,
+                       leaderboard=Leaderboard(args.leaderboard) if args.leaderboard else None)
+    if args.record_dir:
+        os.makedirs(args.record_dir, exist_ok=True)
+    server = await host.serve(args.host, args.port)
+    address = server.sockets[0].getsockname()
+    print(f"Listening on {address[0]}:{address[1]}", flush=True)
+
+    flusher = asyncio.create_task(host.saves.run()) if host.saves else None
+    if state_path:
+        asyncio.create_task(keep_world(shared, state_path, args.world_save_interval))
+    if args.metrics_port or args.metrics_file:
+        collected = metrics.enable()
+        if args.metrics_port:
+            await collected.serve(args.host, args.metrics_port)
+            print(f"Metrics on http://{args.host}:{args.metrics_port}/metrics", flush=True)
+        if args.metrics_file:
+            asyncio.create_task(write_metrics(collected, args.metrics_file, args.metrics_interval))
+
+    async with server:
+        try:
+            while True:
+                await asyncio.sleep(args.stats_interval or 3600)
+                if args.stats_interval:
+                    print(host.stats(), flush=True)
+        finally:
+            if flusher:
+                flusher.cancel()
+                await host.saves.aclose()
+            if state_path:
+                shared.save(state_path)
+            if host.leaderboard:
+                host.leaderboard.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Host many Pirate Adventure sessions over TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2323)
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--delay-scale", type=float, default=1.0,
+                        help="multiplier for typewriter and pause delays (0 for bots)")
+    parser.add_argument("--screen-rows", type=int, default=0,
+                        help="terminal height of clients; enables diffed screen updates (needs --delay-scale 0)")
+    parser.add_argument("--world", help="world data (.jsonl, compiled on first use) or a compiled .world file")
+    parser.add_argument("--shared-world", action="store_true",
+                        help="all sessions play in one world: items taken and bosses beaten are gone for everyone")
+    parser.add_argument("--world-save-interval", type=float, default=30,
+                        help="seconds between writes of the shared world to --save-dir")
+    parser.add_argument("--save-dir", help="keep an append-only save journal here and resume captains by name")
+    parser.add_argument("--record-dir", help="save each session's seed and inputs here for replay.py check")
+    parser.add_argument("--hibernate-dir", help="move idle sessions' games to disk here")
+    parser.add_argument("--hibernate-after", type=float, default=300,
+                        help="seconds idle at the main menu before a session is moved to disk (0: only when full)")
+    parser.add_argument("--max-resident", type=int, default=1000,
+                        help="most games kept in memory with --hibernate-dir; least recently used go first")
+    parser.add_argument("--leaderboard", help="record every finished run in this SQLite file")
+    parser.add_argument("--metrics-port", type=int, default=0, help="serve Prometheus metrics at /metrics")
+    parser.add_argument("--metrics-file", help="write Prometheus metrics to this file (textfile collector)")
+    parser.add_argument("--metrics-interval", type=float, default=15, help="seconds between metrics file writes")
+    parser.add_argument("--stats-interval", type=float, default=0,
+                        help="print session and latency stats every N seconds")
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
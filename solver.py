@@ -0,0 +1,181 @@
+import atexit
+import hashlib
+import json
+import os
+import pickle
+import sys
+from typing import Dict, Optional, Tuple
+
+from adventure import ENEMIES, ESCAPE_CHANCE, POTION_HEALING, Player
+
+POTIONS = ("small_potion", "medium_potion", "large_potion")
+# Potions beyond this many of a kind are treated as this many; it keeps the state space small
+# and only ever underestimates the odds.
+POTION_CAP = 3
+SOLVER_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+# (player health, enemy health, potions held of each kind)
+State = Tuple[int, int, Tuple[int, int, int]]
+# Expected (survived, won, healing left in potions); compared in that order.
+Value = Tuple[float, float, float]
+
+DIED: Value = (0.0, 0.0, 0.0)
+EPSILON = 1e-12
+
+def data_version() -> str:
+    """Changes whenever anything the solver depends on does, so stale caches are never read."""
+    data = {
+        "solver": SOLVER_VERSION,
+        "enemies": {key: (enemy.health, enemy.damage) for key, enemy in ENEMIES.items()},
+        "potions": [POTION_HEALING[potion] for potion in POTIONS],
+        "escape": ESCAPE_CHANCE,
+        "cap": POTION_CAP,
+    }
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()[:12]
+
+def better(a: Value, b: Value) -> bool:
+    for x, y in zip(a, b):
+        if x > y + EPSILON:
+            return True
+        if x < y - EPSILON:
+            return False
+    return False
+
+def mix(p: float, a: Value, b: Value) -> Value:
+    return tuple(p * x + (1 - p) * y for x, y in zip(a, b))
+
+class CombatSolver:
+    """Survival-maximizing fight policies, solved on demand and cached on disk.
+
+    A fight is a Markov decision process: attacks are deterministic, a run escapes with
+    ESCAPE_CHANCE or costs a hit, and drinking costs a potion but no hit. Every move lowers
+    the enemy's health, the player's health or the potion count, so the state graph has no
+    cycles and memoized recursion over it gives the exact optimum.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.path = os.path.join(cache_dir or DEFAULT_CACHE_DIR, f"combat-{data_version()}.pickle")
+        # (enemy type, player damage, player max health) -> state -> (best action, value)
+        self.tables: Dict[Tuple[str, int, int], Dict[State, Tuple[str, Value]]] = {}
+        self.dirty = False
+        try:
+            with open(self.path, "rb") as f:
+                self.tables = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            pass
+
+    def save(self):
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        partial = f"{self.path}.{os.getpid()}.tmp"
+        with open(partial, "wb") as f:
+            pickle.dump(self.tables, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(partial, self.path)
+        self.dirty = False
+
+    def lookup(self, enemy_type: str, damage: int, max_health: int, health: int, enemy_health: int,
+               potions: Tuple[int, int, int]) -> Tuple[str, Value]:
+        table = self.tables.get((enemy_type, damage, max_health))
+        if table is None:
+            table = self.tables[(enemy_type, damage, max_health)] = {}
+        state = (health, enemy_health, tuple(min(POTION_CAP, count) for count in potions))
+        entry = table.get(state)
+        if entry is None:
+            self.dirty = True
+            entry = self._solve(table, ENEMIES[enemy_type].damage, damage, max_health, state)
+        return entry
+
+    def _solve(self, table, enemy_damage: int, damage: int, max_health: int, state: State) -> Tuple[str, Value]:
+        health, enemy_health, potions = state
+        kept = float(sum(count * POTION_HEALING[potion] for potion, count in zip(POTIONS, potions)))
+
+        def value(next_state: State) -> Value:
+            if next_state[0] <= 0:
+                return DIED
+            entry = table.get(next_state)
+            if entry is None:
+                entry = self._solve(table, enemy_damage, damage, max_health, next_state)
+            return entry[1]
+
+        if enemy_health - damage <= 0:
+            best = ("attack", (1.0, 1.0, kept))
+        else:
+            best = ("attack", value((health - enemy_damage, enemy_health - damage, potions)))
+        escaped = (1.0, 0.0, kept)
+        run = mix(ESCAPE_CHANCE, escaped, value((health - enemy_damage, enemy_health, potions)))
+        if better(run, best[1]):
+            best = ("run", run)
+        if health < max_health:
+            for i, potion in enumerate(POTIONS):
+                if potions[i]:
+                    left = potions[:i] + (potions[i] - 1,) + potions[i + 1:]
+                    healed = min(max_health, health + POTION_HEALING[potion])
+                    drink = value((healed, enemy_health, left))
+                    if better(drink, best[1]):
+                        best = (potion, drink)
+        table[state] = best
+        return best
+
+    def best_action(self, player: Player, enemy_type: str, enemy_health: int) -> Tuple[str, float]:
+        """The best move now ("attack", "run" or a potion) and the chance of surviving the fight."""
+        potions = tuple(player.inventory.count(potion) for potion in POTIONS)
+        action, value = self.lookup(enemy_type, player.get_total_damage(), player.max_health,
+                                    player.health, enemy_health, potions)
+        return action, value[0]
+
+_shared: Optional[CombatSolver] = None
+
+def shared() -> CombatSolver:
+    """The process's solver; whatever it solved is saved when the process exits."""
+    global _shared
+    if _shared is None:
+        _shared = CombatSolver()
+        atexit.register(_save_shared)
+    return _shared
+
+def _save_shared():
+    try:
+        _shared.save()
+    except OSError as error:
+        # The cache only saves work, so an unwritable cache directory isn't worth failing over.
+        print(f"Solver cache not saved: {error}", file=sys.stderr)
+
+if __name__ == "__main__":
+    import argparse
+    import itertools
+    import time
+
+    parser = argparse.ArgumentParser(description="Solve and cache fight policies; print full-health survival odds.")
+    parser.add_argument("--levels", type=int, nargs="*", default=[1, 2, 3, 4])
+    parser.add_argument("--weapons", nargs="*", default=["none", "rusty_sword", "steel_sword", "magic_cutlass"])
+    parser.add_argument("--cache-dir")
+    args = parser.parse_args()
+
+    solver = CombatSolver(args.cache_dir)
+    report = []
+    started = time.perf_counter()
+    for enemy_type, level, weapon in itertools.product(ENEMIES, args.levels, args.weapons):
+        player = Player()
+        for _ in range(level - 1):
+            player.level_up()
+        if weapon != "none":
+            player.equipped_weapon = weapon
+        row = {"enemy": enemy_type, "level": level, "weapon": weapon}
+        for potions in ((0, 0, 0), (1, 1, 0), (POTION_CAP,) * 3):
+            action, value = solver.lookup(enemy_type, player.get_total_damage(), player.max_health,
+                                          player.health, ENEMIES[enemy_type].health, potions)
+            row[f"potions {potions}"] = {"first_move": action, "survival": round(value[0], 4)}
+        report.append(row)
+    solved = time.perf_counter() - started
+    solver.save()
+
+    states = sum(len(table) for table in solver.tables.values())
+    started = time.perf_counter()
+    for _ in range(100000):
+        solver.lookup("ghost_pirate", 15, 120, 60, 50, (1, 0, 1))
+    lookup = (time.perf_counter() - started) / 100000
+    print(json.dumps(report, indent=2))
+    print(f"{states} states solved in {solved * 1000:.0f} ms, cached lookup {lookup * 1e6:.2f} us, "
+          f"cache {solver.path}")
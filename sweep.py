@@ -0,0 +1,219 @@
+import argparse
+import collections
+import itertools
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Counter, Dict, List, NamedTuple, Optional
+
+import solver
+from adventure import POTION_HEALING, Fight, Game, NullIO
+
+WEAPONS = ("rusty_sword", "steel_sword", "magic_cutlass")
+
+class Policy(NamedTuple):
+    potion_below: float = 0.3
+    potion_reserve: int = 2
+    buy_sword: bool = True
+    max_turns: int = 500
+    # Fight with solver.py's survival-maximizing moves instead of potion_below.
+    solve_fights: bool = False
+
+class Result(NamedTuple):
+    completed: bool
+    died: bool
+    death_location: Optional[str]
+    gold: int
+    level: int
+    turns: int
+
+def next_step(game: Game, target_items: bool = True) -> Optional[str]:
+    # Breadth-first search to the nearest open location that still has something to pick up.
+    start = game.player.current_location
+    previous = {start: None}
+    queue = collections.deque([start])
+    while queue:
+        location = queue.popleft()
+        if location != start and target_items and game.world.items(location):
+            while previous[location] != start:
+                location = previous[location]
+            return location
+        for neighbour in game.world.connections(location):
+            if neighbour not in previous and not game.gate_message(neighbour):
+                previous[neighbour] = location
+                queue.append(neighbour)
+    return None
+
+def heal_if_needed(game: Game, policy: Policy):
+    player = game.player
+    while player.health <= policy.potion_below * player.max_health:
+        potions = [item for item in player.inventory if item in POTION_HEALING]
+        if not potions:
+            return
+        game.drink(max(potions, key=POTION_HEALING.get))
+
+def fight(game: Game, enemy_type: str, policy: Policy):
+    combat = Fight(game, enemy_type)
+    player = game.player
+    while combat.enemy_health > 0 and player.health > 0:
+        if policy.solve_fights:
+            action, _ = solver.shared().best_action(player, enemy_type, combat.enemy_health)
+            if action == "run":
+                if combat.flee():
+                    return
+            elif action == "attack":
+                combat.attack()
+            else:
+                game.drink(action)
+            continue
+        health = player.health
+        heal_if_needed(game, policy)
+        if player.health == health:
+            combat.attack()
+    if combat.enemy_health <= 0:
+        combat.victory()
+        equip_best(game)
+
+def equip_best(game: Game):
+    for weapon in reversed(WEAPONS):
+        if weapon in game.player.inventory:
+            game.player.equipped_weapon = weapon
+            return
+
+def shop(game: Game, policy: Policy):
+    player = game.player
+    if policy.buy_sword and player.equipped_weapon in (None, "rusty_sword"):
+        if game.buy("steel_sword"):
+            equip_best(game)
+    while sum(item in POTION_HEALING for item in player.inventory) < policy.potion_reserve:
+        if not game.buy("medium_potion"):
+            break
+
+def play_through(seed: int, policy: Policy) -> Result:
+    game = Game(io=NullIO(), rng=random.Random(seed))
+    player = game.player
+    turns = 0
+    while player.health > 0 and turns < policy.max_turns:
+        turns += 1
+        location = player.current_location
+        for item in game.world.items(location):
+            if item != "treasure" or game.holds("spectral_key"):
+                game.take(item)
+        if "treasure" in player.inventory:
+            break
+        equip_best(game)
+        if location == "market":
+            shop(game, policy)
+        heal_if_needed(game, policy)
+
+        destination = next_step(game)
+        if destination is None:
+            # Nothing left in reach: wander towards the market to stock up and try again.
+            connections = [c for c in game.world.connections(location) if not game.gate_message(c)]
+            destination = game.rng.choice(connections)
+        enemy_type = game.move(destination)
+        if enemy_type:
+            fight(game, enemy_type, policy)
+
+    died = player.health <= 0
+    return Result("treasure" in player.inventory, died, player.current_location if died else None,
+                  player.gold, player.level, turns)
+
+class Summary:
+    def __init__(self):
+        self.runs = 0
+        self.completed = 0
+        self.deaths: Counter[str] = collections.Counter()
+        self.gold: Counter[int] = collections.Counter()
+        self.levels: Counter[int] = collections.Counter()
+        self.turns = 0
+
+    def add(self, result: Result):
+        self.runs += 1
+        self.completed += result.completed
+        if result.died:
+            self.deaths[result.death_location] += 1
+        # Bucket gold to the nearest 50 so summaries stay small however many runs they hold.
+        self.gold[result.gold // 50 * 50] += 1
+        self.levels[result.level] += 1
+        self.turns += result.turns
+
+    def merge(self, other: "Summary"):
+        self.runs += other.runs
+        self.completed += other.completed
+        self.deaths.update(other.deaths)
+        self.gold.update(other.gold)
+        self.levels.update(other.levels)
+        self.turns += other.turns
+
+    def report(self) -> Dict[str, object]:
+        def percentile(counts: Counter[int], p: float) -> int:
+            target = p * self.runs
+            seen = 0
+            for value in sorted(counts):
+                seen += counts[value]
+                if seen >= target:
+                    return value
+            return 0
+
+        return {
+            "runs": self.runs,
+            "completion_rate": self.completed / self.runs if self.runs else 0.0,
+            "death_rate": sum(self.deaths.values()) / self.runs if self.runs else 0.0,
+            "mean_turns": self.turns / self.runs if self.runs else 0.0,
+            "gold_p50": percentile(self.gold, 0.5),
+            "gold_p90": percentile(self.gold, 0.9),
+            "level_distribution": dict(sorted(self.levels.items())),
+            "death_locations": dict(self.deaths.most_common()),
+        }
+
+def run_chunk(root_seed: int, start: int, count: int, policy: Policy) -> Summary:
+    summary = Summary()
+    for index in range(start, start + count):
+        # Seeds depend only on the run index, so results don't depend on how work was scheduled.
+        summary.add(play_through(root_seed * 1_000_003 + index, policy))
+    if policy.solve_fights:
+        solver.shared().save()
+    return summary
+
+def sweep(policies: List[Policy], runs: int, root_seed: int = 0, workers: Optional[int] = None,
+          chunk: int = 250) -> List[Dict[str, object]]:
+    summaries = [Summary() for _ in policies]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(run_chunk, root_seed, start, min(chunk, runs - start), policy): i
+            for i, policy in enumerate(policies)
+            for start in range(0, runs, chunk)
+        }
+        for future in as_completed(futures):
+            summaries[futures[future]].merge(future.result())
+    return [{"policy": policy._asdict(), **summary.report()}
+            for policy, summary in zip(policies, summaries)]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo playthroughs across a grid of bot policies.")
+    parser.add_argument("--runs", type=int, default=10000, help="playthroughs per policy")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk", type=int, default=250)
+    parser.add_argument("--potion-below", type=float, nargs="*", default=[0.3])
+    parser.add_argument("--potion-reserve", type=int, nargs="*", default=[2])
+    parser.add_argument("--buy-sword", type=int, nargs="*", default=[1], choices=[0, 1])
+    parser.add_argument("--max-turns", type=int, default=500)
+    parser.add_argument("--solve-fights", type=int, nargs="*", default=[0], choices=[0, 1],
+                        help="1 to fight with the solver's moves (see solver.py)")
+    args = parser.parse_args()
+
+    policies = [Policy(potion_below, reserve, bool(buy_sword), args.max_turns, bool(solve_fights))
+                for potion_below, reserve, buy_sword, solve_fights
+                in itertools.product(args.potion_below, args.potion_reserve, args.buy_sword, args.solve_fights)]
+    started = time.perf_counter()
+    report = sweep(policies, args.runs, args.seed, args.workers, args.chunk)
+    elapsed = time.perf_counter() - started
+    print(json.dumps({
+        "workers": args.workers,
+        "playthroughs_per_sec": args.runs * len(policies) / elapsed,
+        "policies": report,
+    }, indent=2))
@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from adventure import MAX_STACK, Game, NullIO
+from batch import ParseError, Session, Trie, complete, parse
+
+def session(seed: int = 0) -> Session:
+    return Session(Game(io=NullIO(), rng=random.Random(seed)))
+
+def test_a_full_stack_refuses_the_command_not_the_run():
+    s = session()
+    game = s.game
+    game.player.current_location = "market"
+    game.player.gold = 10 ** 6
+    for _ in range(MAX_STACK - game.player.inventory.count("small_potion")):
+        game.player.inventory.add("small_potion")
+    gold = game.player.gold
+    result = s.run("buy small potion")
+    assert result["ok"] is False and "65535" in result["err"]
+    assert game.player.gold == gold
+    assert s.run("look")["ok"]
+
+def test_travel_takes_a_prefix():
+    s = session()
+    result = s.run("travel mar")
+    assert result["ok"], result
+    assert result["loc"] == "market" or "fight" in result
+
+def test_an_ambiguous_prefix_names_every_match():
+    with pytest.raises(ParseError, match="ambiguous command 't': take, travel"):
+        parse("t compass")
+    assert complete("s", ["small_potion", "steel_sword"]) == ["small_potion", "steel_sword"]
+    result = session().run("t compass")
+    assert not result["ok"] and result["err"].startswith("ambiguous command")
+
+def test_a_whole_word_wins_over_longer_ones():
+    assert Trie(["go", "gold"]).complete("go") == ["go"]
+    assert complete("sword", ["sword", "sword_fish"]) == ["sword"]
+    assert parse("ta compass") == ("take", "compass")
+
+def test_each_segment_can_be_cut_short():
+    assert parse("b lar pot") == ("buy", "lar_pot")
+    assert complete("lar_pot", ["large_potion", "small_potion"]) == ["large_potion"]
+    assert complete("s_s", ["steel_sword", "small_potion", "secret_room"]) == ["steel_sword"]
+    # More segments than the name has never match.
+    assert complete("lar_pot_x", ["large_potion"]) == []
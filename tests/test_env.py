@@ -0,0 +1,23 @@
+import numpy as np
+
+from adventure import register_item
+from env import PirateEnv
+
+def test_items_registered_later_stay_out_of_the_observation():
+    env = PirateEnv(seed=0)
+    observation = env.reset()
+    assert observation.shape == (env.observation_size,)
+    # More new items than there are quest slots after the item counts.
+    late = [f"test_env_late_item_{i}" for i in range(len(env.quests) + 2)]
+    for item in late:
+        register_item(item)
+    env.reset()
+    env.game.player.inventory.add(late[-1])
+    env.game.player.inventory.add("compass")
+    out = np.full(env.observation_size, 7, dtype=np.int32)
+    env.observe(out)
+    items = out[11:11 + len(env.items)]
+    assert items[env.item_index["compass"]] == 1
+    assert items.sum() == 1
+    quest_flags = out[11 + len(env.items):]
+    assert list(quest_flags) == [quest in env.game.quest_log for quest in env.quests]
@@ -0,0 +1,106 @@
+import random
+
+import pytest
+
+from adventure import DEFAULT_LOOT, LOOT_CHANCE
+from loot import MAX_SCALED_LEVEL, AliasTable, LootBook, LootTable, check
+
+# The drops each enemy had before loot tables; the defaults must keep them.
+ORIGINAL_DROPS = {
+    "rookie_pirate": ["rusty_sword", "small_potion"],
+    "seasoned_pirate": ["steel_sword", "medium_potion"],
+    "pirate_captain": ["magic_cutlass", "large_potion", "treasure_map"],
+    "ghost_pirate": ["spectral_key", "ghost_essence"],
+    "kraken_spawn": ["kraken_tentacle", "ocean_pearl"],
+}
+
+TUNED = LootBook({
+    "enemies": {
+        "boss": {"chance": 0.3, "drops": {"gem": 1, "potion": 3, "sword": 2}, "pity": 3,
+                 "guaranteed": ["trophy"], "per_level": {"gem": 1}},
+    },
+    "locations": {"crypt": {"chance": 0.25, "drops": {"essence": 1}}},
+})
+
+def z_score(observed: int, trials: int, rate: float) -> float:
+    return (observed - trials * rate) / ((trials * rate * (1 - rate)) ** 0.5)
+
+def test_defaults_are_the_original_drops():
+    assert set(DEFAULT_LOOT.enemies) == set(ORIGINAL_DROPS)
+    assert not DEFAULT_LOOT.locations
+    for enemy, items in ORIGINAL_DROPS.items():
+        table = DEFAULT_LOOT.enemies[enemy]
+        assert list(table.items) == items
+        assert table.uniform and not table.guaranteed and table.pity is None
+        for rate in table.drop_rates().values():
+            assert rate == pytest.approx(LOOT_CHANCE / len(items))
+
+def test_uniform_tables_draw_like_the_original_code():
+    for items in ORIGINAL_DROPS.values():
+        table = LootTable("t", dict.fromkeys(items, 1), LOOT_CHANCE)
+        ours, theirs = random.Random(7), random.Random(7)
+        for _ in range(2000):
+            expected = theirs.choice(items) if theirs.random() < LOOT_CHANCE else None
+            assert table.roll(ours, 1, 0) == expected
+
+@pytest.mark.parametrize("weights", [[1], [1, 1], [1, 2, 3], [0.1, 5, 0, 2.5], [7] * 9 + [1]])
+def test_alias_tables_sample_their_weights_exactly(weights):
+    table = AliasTable(weights)
+    total = sum(weights)
+    assert table.probabilities() == pytest.approx([w / total for w in weights], abs=1e-12)
+
+def test_alias_tables_reject_bad_weights():
+    for weights in ([], [0, 0], [1, -1]):
+        with pytest.raises(ValueError):
+            AliasTable(weights)
+
+@pytest.mark.parametrize("level", [1, 5, MAX_SCALED_LEVEL + 5])
+def test_sampled_rates_match_expected_rates(level):
+    table = TUNED.enemies["boss"]
+    expected = table.drop_rates(level)
+    rng = random.Random(level)
+    counts = dict.fromkeys(table.items, 0)
+    kills, misses = 200000, 0
+    for _ in range(kills):
+        item = table.roll(rng, level, misses)
+        misses = 0 if item else misses + 1
+        if item:
+            counts[item] += 1
+    for item, rate in expected.items():
+        assert abs(z_score(counts[item], kills, rate)) < 5, (item, counts[item] / kills, rate)
+
+def test_batch_rolls_match_expected_rates():
+    # Every player starts right after a drop, so short runs undercount pity drops; long runs
+    # keep that start-up bias well under the bound.
+    table = TUNED.enemies["boss"]
+    counts = table.roll_many(2000, 200, level=3, seed=1).sum(axis=0)
+    for item, observed in zip(table.items, counts.tolist()):
+        assert abs(z_score(observed, 2000 * 200, table.drop_rates(3)[item])) < 5
+
+def test_pity_raises_the_drop_rate():
+    table = TUNED.enemies["boss"]
+    rate = sum(table.drop_rates().values())
+    # Without pity 30% of kills drop; a drop is forced after 3 dry kills.
+    assert rate > 0.3
+    assert rate == pytest.approx(1 / sum(0.7 ** k for k in range(4)))
+
+def test_self_check_passes():
+    assert check(TUNED, players=1000, kills=200, scalar_kills=50000) == []
+    assert check(DEFAULT_LOOT, players=1000, kills=200, scalar_kills=50000) == []
+
+def test_book_skips_held_items_and_counts_pity():
+    pity = {}
+    rng = random.Random(0)
+    for _ in range(200):
+        before = pity.get("enemy:boss", 0)
+        drops = TUNED.roll(rng, "boss", "crypt", 1, {"sword"}, pity)
+        assert "sword" not in drops
+        assert drops[0] == "trophy"
+        assert len(drops) == len(set(drops))
+        gained = [item for item in drops[1:] if item in TUNED.enemies["boss"].items]
+        assert pity.get("enemy:boss", 0) == (0 if gained else before + 1)
+    assert TUNED.roll(rng, "boss", "dock", 1, {"trophy", "gem", "potion", "sword"}, pity) == []
+    # Nothing new can drop, so the miss counts keep growing past pity.
+    for _ in range(5):
+        TUNED.roll(rng, "boss", "dock", 1, {"trophy", "gem", "potion", "sword"}, pity)
+    assert pity["enemy:boss"] > 3
@@ -0,0 +1,31 @@
+import asyncio
+import random
+
+import pytest
+
+import metrics
+from adventure import Game, NullIO
+
+class Interrupted(Exception):
+    pass
+
+class InterruptingIO(NullIO):
+    async def input(self, prompt: str = "") -> str:
+        # Like a session hibernated while the player is thinking.
+        raise Interrupted
+
+def test_an_interrupted_turn_is_observed():
+    m = metrics.enable()
+    try:
+        game = Game(io=InterruptingIO(), rng=random.Random(0))
+        with pytest.raises(Interrupted):
+            asyncio.run(game.turns())
+        assert sum(m.turn_seconds.series[None][0]) == 1
+        assert not m.games
+    finally:
+        metrics.disable()
+
+def test_label_values_are_escaped():
+    counter = metrics.Counter("pirate_test_total", "Test", "item")
+    counter.inc('a "b"\\c\nd')
+    assert counter.samples() == ['pirate_test_total{item="a \\"b\\"\\\\c\\nd"} 1']
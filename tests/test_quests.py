@@ -0,0 +1,53 @@
+from quests import COMPLETED, DEFEAT, ENTER, GOLD, PICKUP, STARTED, QuestBook, QuestLog
+
+BOOK = QuestBook({
+    "errand": {"start": (ENTER, "tavern"), "complete": (PICKUP, "compass"), "gold": 10},
+    "savings": {"start": (ENTER, "market"), "complete": (GOLD, 100)},
+    "rich": {"start": (GOLD, 50), "complete": (DEFEAT, "ghost_pirate")},
+    "richer": {"start": (GOLD, 200), "complete": (GOLD, 300)},
+    "bounty": {"start": (ENTER, "dock"), "complete": (DEFEAT, "rookie_pirate"), "repeatable": True},
+})
+
+def changes(found):
+    return [(kind, quest.title) for kind, quest in found]
+
+def test_triggers_start_and_complete_quests():
+    log = QuestLog(BOOK)
+    assert changes(log.fire(PICKUP, "compass", 0)) == []
+    assert changes(log.fire(ENTER, "tavern", 0)) == [(STARTED, "errand")]
+    assert changes(log.fire(ENTER, "tavern", 0)) == []
+    assert changes(log.fire(PICKUP, "compass", 0)) == [(COMPLETED, "errand")]
+    assert changes(log.fire(ENTER, "tavern", 0)) == []
+    assert log.done == {"errand"} and not log.active
+
+def test_repeatable_quests_start_again():
+    log = QuestLog(BOOK)
+    for _ in range(2):
+        assert changes(log.fire(ENTER, "dock", 0)) == [(STARTED, "bounty")]
+        assert changes(log.fire(DEFEAT, "rookie_pirate", 0)) == [(COMPLETED, "bounty")]
+
+def test_gold_thresholds_fire_once_when_crossed():
+    log = QuestLog(BOOK)
+    assert changes(log.gold(49)) == []
+    assert changes(log.gold(250)) == [(STARTED, "rich"), (STARTED, "richer")]
+    # Falling back under a threshold and crossing it again starts nothing twice.
+    assert changes(log.gold(0)) == []
+    assert changes(log.gold(250)) == []
+    assert changes(log.gold(300)) == [(COMPLETED, "richer")]
+
+def test_a_gold_goal_already_reached_completes_at_once():
+    log = QuestLog(BOOK)
+    assert changes(log.fire(ENTER, "market", 150)) == [(STARTED, "savings"), (COMPLETED, "savings")]
+    log = QuestLog(BOOK)
+    assert changes(log.fire(ENTER, "market", 20)) == [(STARTED, "savings")]
+    assert changes(log.gold(45)) == []
+    assert changes(log.gold(100)) == [(STARTED, "rich"), (COMPLETED, "savings")]
+
+def test_gold_goals_survive_a_restore():
+    log = QuestLog(BOOK)
+    log.fire(ENTER, "market", 0)
+    log.gold(60)
+    restored = QuestLog(BOOK)
+    restored.restore(log.state())
+    assert changes(restored.gold(60)) == []
+    assert changes(restored.gold(100)) == [(COMPLETED, "savings")]
@@ -0,0 +1,6 @@
+from replay import differences
+
+def test_missing_and_extra_fields_are_reported():
+    assert differences({"gold": 1, "has_map": True}, {"gold": 2, "pity": {}}) == [
+        "gold: expected 1, got 2", "has_map: expected True, missing", "pity: unexpected {}"]
+    assert differences({"gold": 1}, {"gold": 1}) == []
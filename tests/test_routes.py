@@ -0,0 +1,36 @@
+import random
+
+import routes
+from world import World
+
+def ring(size: int) -> World:
+    return World({f"loc{i}": {"description": "", "connections": [f"loc{(i + 1) % size}"], "items": [],
+                              "enemies": [], "requires": "compass" if i == size // 2 else None}
+                  for i in range(size)})
+
+def all_routes(index, names, holds):
+    return {(a, b): index.route(a, b, holds) for a in names for b in names}
+
+def test_changes_update_the_index_like_a_rebuild():
+    world = ring(12)
+    index = routes.index_for(world)
+    rng = random.Random(0)
+    for holds in (lambda item: False, lambda item: True):
+        all_routes(index, list(world), holds)
+    world.add_location("shortcut", {"description": "", "connections": ["loc9"], "requires": "treasure_map"})
+    world.connect("loc1", "shortcut")
+    for _ in range(10):
+        a, b = rng.sample(list(world), 2)
+        world.connect(a, b)
+    world.disconnect("loc5", "loc6")
+    fresh = routes.RouteIndex(world)
+    for holds in (lambda item: False, lambda item: item == "compass", lambda item: True):
+        assert all_routes(index, list(world), holds) == all_routes(fresh, list(world), holds)
+
+def test_gates_block_routes_until_held():
+    world = ring(6)
+    index = routes.RouteIndex(world)
+    assert index.route("loc0", "loc4", lambda item: False) is None
+    assert index.route("loc0", "loc4", lambda item: True) == ["loc1", "loc2", "loc3", "loc4"]
+    assert index.route("loc0", "loc0", lambda item: False) == []
+    assert index.route("loc0", "nowhere", lambda item: True) is None
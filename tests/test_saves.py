@@ -0,0 +1,87 @@
+import os
+import random
+
+from adventure import Game, NullIO
+from saves import LOG, SNAPSHOT, Journal, SaveStore
+
+def test_torn_record_is_cut_before_appending(tmp_path):
+    store = SaveStore(str(tmp_path))
+    store.append("ann", "move", "tavern", {"current_location": "tavern", "gold": 5})
+    store.close()
+    with open(os.path.join(tmp_path, LOG), "ab") as f:
+        f.write(b'{"n":2,"session":"ann","event":"pickup","key":"compass","chan')
+
+    store = SaveStore(str(tmp_path))
+    assert store.load("ann") == {"current_location": "tavern", "gold": 5}
+    store.append("ann", "buy", "small_potion", {"gold": 2})
+    store.close()
+
+    store = SaveStore(str(tmp_path))
+    assert store.load("ann") == {"current_location": "tavern", "gold": 2}
+    assert store.sequence == 2
+    store.close()
+
+def play(game: Game, turns: int):
+    for turn in range(turns):
+        game.move(("tavern", "dock")[turn % 2])
+        game.player.gold += 7
+        game.save("move", game.player.current_location)
+
+def captain(store: SaveStore, name: str, seed: int = 0) -> Game:
+    game = Game(io=NullIO(), rng=random.Random(seed))
+    state = store.load(name)
+    if state:
+        game.restore(state)
+    game.journal = Journal(store, name, game)
+    return game
+
+def test_compaction_keeps_every_session(tmp_path):
+    store = SaveStore(str(tmp_path), compact_every=4)
+    ann, bob = captain(store, "ann"), captain(store, "bob", 1)
+    for _ in range(3):
+        play(ann, 2)
+        play(bob, 1)
+        store.flush()
+    store.close()
+    assert os.path.exists(os.path.join(tmp_path, SNAPSHOT))
+    with open(os.path.join(tmp_path, LOG), "rb") as f:
+        assert len(f.readlines()) < 4
+
+    store = SaveStore(str(tmp_path), compact_every=4)
+    assert store.load("ann") == ann.snapshot()
+    assert store.load("bob") == bob.snapshot()
+    store.close()
+
+def test_a_resumed_session_journals_only_its_changes(tmp_path):
+    store = SaveStore(str(tmp_path))
+    ann = captain(store, "ann")
+    play(ann, 3)
+    store.close()
+
+    store = SaveStore(str(tmp_path))
+    resumed = captain(store, "ann")
+    assert resumed.snapshot() == ann.snapshot()
+    resumed.player.gold += 1
+    resumed.save("buy", "compass")
+    assert store.pending[-1]["changes"] == {"gold": ann.player.gold + 1}
+    store.close()
+
+    store = SaveStore(str(tmp_path))
+    assert captain(store, "ann").player.gold == ann.player.gold + 1
+    store.close()
+
+def test_a_torn_write_after_compaction_is_dropped(tmp_path):
+    store = SaveStore(str(tmp_path), compact_every=2)
+    ann = captain(store, "ann")
+    play(ann, 2)
+    store.flush()
+    play(ann, 1)
+    sequence = store.sequence
+    store.close()
+    with open(os.path.join(tmp_path, LOG), "ab") as f:
+        f.write(b'{"n":99,"session":"ann","event":"move","key":"ship","changes":{"current_loc')
+
+    store = SaveStore(str(tmp_path), compact_every=2)
+    assert store.load("ann") == ann.snapshot()
+    assert store.sequence == sequence
+    store.close()
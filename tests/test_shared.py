@@ -0,0 +1,46 @@
+import asyncio
+import random
+
+from adventure import DEFAULT_WORLD, Fight, Game, NullIO
+from batch import Session
+from world import SharedWorld
+
+def captains(count: int):
+    world = SharedWorld(DEFAULT_WORLD)
+    return [Game(io=NullIO(), world=world, rng=random.Random(seed)) for seed in range(count)]
+
+def finish(fight: Fight):
+    while fight.enemy_health > 0:
+        fight.attack()
+
+def test_only_the_killing_blow_wins():
+    a, b = captains(2)
+    fa, fb = Fight(a, "rookie_pirate"), Fight(b, "rookie_pirate")
+    fb.attack()
+    finish(fa)
+    assert fa.won
+    assert fb.slain_by_other() and not fb.won
+    assert fb.attack() == (0, 0)
+    assert b.player.health == 100 - fb.enemy.damage
+
+def test_a_dead_foe_never_hits_back():
+    a, b = captains(2)
+    fa, fb = Fight(a, "seasoned_pirate"), Fight(b, "seasoned_pirate")
+    finish(fa)
+    health = b.player.health
+    assert fb.flee()
+    assert b.player.health == health
+    gold = b.player.gold
+    assert asyncio.run(b.combat_round(fb, "use_potion")) is False
+    assert b.player.health == health and b.player.gold == gold
+
+def test_batch_reports_someone_elses_kill():
+    a, b = captains(2)
+    sa, sb = Session(a), Session(b)
+    sa.fight, sb.fight = Fight(a, "rookie_pirate"), Fight(b, "rookie_pirate")
+    while sa.fight:
+        result = sa.run("attack")
+    assert result["won"] == "rookie_pirate"
+    result = sb.run("run")
+    assert result["other_kill"] == "rookie_pirate"
+    assert sb.fight is None and result["hp"] == 100
@@ -0,0 +1,544 @@
+import json
+import mmap
+import os
+import struct
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Iterator, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+import routes
+
+class Location(NamedTuple):
+    description: str
+    connections: Tuple[str, ...]
+    items: Tuple[str, ...]
+    enemies: Tuple[str, ...]
+    # Item the player must hold to enter this location.
+    requires: Optional[str] = None
+
+class World:
+    def __init__(self, locations: Mapping[str, dict], art: Optional[Mapping[str, str]] = None):
+        self._locations: Dict[str, Location] = {
+            name: Location(
+                data["description"],
+                tuple(data["connections"]),
+                tuple(data["items"]),
+                tuple(data["enemies"]),
+                data.get("requires"),
+            )
+            for name, data in locations.items()
+        }
+        self.locations: Mapping[str, Location] = MappingProxyType(self._locations)
+        self._art: Dict[str, str] = dict(art or {})
+        self._art.update((name, data["art"]) for name, data in locations.items() if data.get("art"))
+
+    def art(self, name: str) -> Optional[str]:
+        return self._art.get(name)
+
+    def session(self) -> "WorldState":
+        return WorldState(self)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.locations
+
+    def __getitem__(self, name: str) -> Location:
+        return self.locations[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.locations)
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    # Changing the map keeps a route index already built for it up to date instead of rebuilding it.
+
+    def add_location(self, name: str, data: dict):
+        if name in self._locations:
+            raise ValueError(f"location {name!r} already exists")
+        self._locations[name] = Location(data["description"], (), tuple(data.get("items", ())),
+                                         tuple(data.get("enemies", ())), data.get("requires"))
+        index = routes.cached(self)
+        if index:
+            index.add_location(name, requires=data.get("requires"))
+        for neighbour in data.get("connections", ()):
+            self.connect(name, neighbour)
+
+    def connect(self, source: str, target: str):
+        location = self._locations[source]
+        if target not in self._locations:
+            raise KeyError(target)
+        self._locations[source] = location._replace(connections=location.connections + (target,))
+        index = routes.cached(self)
+        if index:
+            index.add_connection(source, target)
+
+    def disconnect(self, source: str, target: str):
+        location = self._locations[source]
+        connections = list(location.connections)
+        connections.remove(target)
+        self._locations[source] = location._replace(connections=tuple(connections))
+        index = routes.cached(self)
+        if index:
+            index.remove_connection(source, target)
+
+class WorldState:
+    __slots__ = ("base", "taken", "defeated")
+
+    def __init__(self, base: World):
+        self.base = base
+        # Only locations this session has changed get an entry. The sets are replaced rather
+        # than changed in place, so forks can share them.
+        self.taken: Dict[str, FrozenSet[str]] = {}
+        self.defeated: Dict[str, FrozenSet[str]] = {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.base
+
+    def description(self, name: str) -> str:
+        return self.base[name].description
+
+    def connections(self, name: str) -> Tuple[str, ...]:
+        return self.base[name].connections
+
+    def requires(self, name: str) -> Optional[str]:
+        return self.base[name].requires
+
+    def art(self, name: str) -> Optional[str]:
+        return self.base.art(name)
+
+    def items(self, name: str) -> List[str]:
+        taken = self.taken.get(name)
+        if not taken:
+            return list(self.base[name].items)
+        return [item for item in self.base[name].items if item not in taken]
+
+    def enemies(self, name: str) -> List[str]:
+        defeated = self.defeated.get(name)
+        if not defeated:
+            return list(self.base[name].enemies)
+        return [enemy for enemy in self.base[name].enemies if enemy not in defeated]
+
+    def take(self, name: str, item: str) -> bool:
+        if item not in self.items(name):
+            return False
+        self.taken[name] = self.taken.get(name, frozenset()) | {item}
+        return True
+
+    def defeat(self, name: str, enemy_type: str):
+        self.defeated[name] = self.defeated.get(name, frozenset()) | {enemy_type}
+
+    def fork(self) -> "WorldState":
+        child = WorldState(self.base)
+        child.taken = dict(self.taken)
+        child.defeated = dict(self.defeated)
+        return child
+
+    def engage(self, name: str, enemy_type: str, health: int) -> Optional["Foe"]:
+        # Nobody else is in a private world, so every fight keeps its own enemy.
+        return None
+
+    def state(self) -> dict:
+        return {"taken": {name: sorted(items) for name, items in self.taken.items()},
+                "defeated": {name: sorted(enemies) for name, enemies in self.defeated.items()}}
+
+    def restore(self, state: dict):
+        self.taken = {name: frozenset(items) for name, items in state["taken"].items()}
+        self.defeated = {name: frozenset(enemies) for name, enemies in state["defeated"].items()}
+
+class Foe:
+    """An enemy in a shared world; everyone fighting that enemy type at a location hits the same one."""
+    __slots__ = ("health",)
+
+    def __init__(self, health: int):
+        self.health = health
+
+class SharedWorld:
+    """One world state for every session.
+
+    The server runs every session on one event-loop thread, and no operation here awaits, so
+    each pickup, hit or boss defeat finishes before any other session runs: two captains can't
+    both take the last compass, and no locks are needed. It must not be shared across threads.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.taken: Dict[str, Set[str]] = {}
+        self.defeated: Dict[str, Set[str]] = {}
+        self.foes: Dict[Tuple[str, str], Foe] = {}
+
+    def session(self) -> "SharedView":
+        return SharedView(self)
+
+    def items(self, name: str) -> List[str]:
+        taken = self.taken.get(name)
+        if not taken:
+            return list(self.base[name].items)
+        return [item for item in self.base[name].items if item not in taken]
+
+    def enemies(self, name: str) -> List[str]:
+        defeated = self.defeated.get(name)
+        if not defeated:
+            return list(self.base[name].enemies)
+        return [enemy for enemy in self.base[name].enemies if enemy not in defeated]
+
+    def take(self, name: str, item: str) -> bool:
+        taken = self.taken.get(name)
+        if item not in self.base[name].items or (taken and item in taken):
+            return False
+        self.taken.setdefault(name, set()).add(item)
+        return True
+
+    def defeat(self, name: str, enemy_type: str):
+        self.defeated.setdefault(name, set()).add(enemy_type)
+
+    def engage(self, name: str, enemy_type: str, health: int) -> Foe:
+        foe = self.foes.get((name, enemy_type))
+        if foe is None:
+            foe = self.foes[(name, enemy_type)] = Foe(health)
+        return foe
+
+    def hit(self, name: str, enemy_type: str, foe: Foe, damage: int) -> bool:
+        """Damage `foe`, unless it is already dead; True only for the hit that kills it.
+
+        A dead foe is gone, so the next fight there is with a fresh one.
+        """
+        if foe.health <= 0:
+            return False
+        foe.health -= damage
+        if foe.health > 0:
+            return False
+        self.foes.pop((name, enemy_type), None)
+        return True
+
+    def state(self) -> dict:
+        state = {"taken": {name: sorted(items) for name, items in self.taken.items()},
+                 "defeated": {name: sorted(enemies) for name, enemies in self.defeated.items()},
+                 "foes": {}}
+        for (name, enemy_type), foe in self.foes.items():
+            state["foes"].setdefault(name, {})[enemy_type] = foe.health
+        return state
+
+    def restore(self, state: dict):
+        self.taken = {name: set(items) for name, items in state["taken"].items()}
+        self.defeated = {name: set(enemies) for name, enemies in state["defeated"].items()}
+        self.foes = {(name, enemy_type): Foe(health)
+                     for name, foes in state.get("foes", {}).items() for enemy_type, health in foes.items()}
+
+    def save(self, path: str):
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "w") as f:
+            json.dump(self.state(), f)
+        os.replace(partial, path)
+
+    def load(self, path: str) -> bool:
+        try:
+            with open(path) as f:
+                self.restore(json.load(f))
+        except FileNotFoundError:
+            return False
+        return True
+
+class SharedView(WorldState):
+    """A session's window on a SharedWorld: reads and changes go to the shared state, and
+    the session's own saves carry no world state."""
+    __slots__ = ("shared",)
+
+    def __init__(self, shared: SharedWorld):
+        super().__init__(shared.base)
+        self.shared = shared
+
+    def items(self, name: str) -> List[str]:
+        return self.shared.items(name)
+
+    def enemies(self, name: str) -> List[str]:
+        return self.shared.enemies(name)
+
+    def take(self, name: str, item: str) -> bool:
+        return self.shared.take(name, item)
+
+    def defeat(self, name: str, enemy_type: str):
+        self.shared.defeat(name, enemy_type)
+
+    def engage(self, name: str, enemy_type: str, health: int) -> Foe:
+        return self.shared.engage(name, enemy_type, health)
+
+    def hit(self, name: str, enemy_type: str, foe: Foe, damage: int) -> bool:
+        return self.shared.hit(name, enemy_type, foe, damage)
+
+    def fork(self) -> "SharedFork":
+        # Trying things out mustn't change the world everyone else is playing in.
+        return SharedFork(self.shared)
+
+    def restore(self, state: dict):
+        pass
+
+class SharedFork(WorldState):
+    """A private what-if on top of a SharedWorld: sees the shared world as it is now, minus
+    whatever this fork has taken or beaten itself."""
+    __slots__ = ("shared",)
+
+    def __init__(self, shared: SharedWorld):
+        super().__init__(shared.base)
+        self.shared = shared
+
+    def items(self, name: str) -> List[str]:
+        taken = self.taken.get(name)
+        items = self.shared.items(name)
+        return [item for item in items if item not in taken] if taken else items
+
+    def enemies(self, name: str) -> List[str]:
+        defeated = self.defeated.get(name)
+        enemies = self.shared.enemies(name)
+        return [enemy for enemy in enemies if enemy not in defeated] if defeated else enemies
+
+    def fork(self) -> "SharedFork":
+        child = SharedFork(self.shared)
+        child.taken = dict(self.taken)
+        child.defeated = dict(self.defeated)
+        return child
+
+# Compiled world file: a fixed header, then six tables (offsets of names, records and art, the
+# name order used for lookups, each location's gate bit, and offsets of each location's incoming
+# connections), then the blobs they point into: names, records, art, the gate items as a JSON
+# list, and the incoming connections as location numbers. Every location is decoded on first
+# use, routes are found from the last two tables without decoding any, and the file is
+# memory-mapped read-only so every process serving the same world shares its pages.
+MAGIC = b"PWORLD02"
+HEADER = struct.Struct("<8sQQQ")
+# Gate bits are stored in one 64-bit word per location.
+MAX_GATES = 64
+
+def compile_world(source: str, target: str):
+    names: List[bytes] = []
+    records: List[bytes] = []
+    art: List[bytes] = []
+    connections: List[List[str]] = []
+    requires: List[Optional[str]] = []
+    seen: Set[str] = set()
+    with open(source, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            name = data.get("location")
+            if not name:
+                raise ValueError(f"{source}:{number}: record has no location name")
+            if name in seen:
+                raise ValueError(f"{source}:{number}: duplicate location {name!r}")
+            seen.add(name)
+            names.append(name.encode())
+            connections.append(data.get("connections", []))
+            requires.append(data.get("requires"))
+            records.append(json.dumps([
+                data.get("description", ""),
+                connections[-1],
+                data.get("items", []),
+                data.get("enemies", []),
+                requires[-1],
+            ], separators=(",", ":")).encode())
+            art.append((data.get("art") or "").encode())
+
+    count = len(names)
+    number_of = {name.decode(): i for i, name in enumerate(names)}
+    into: List[List[int]] = [[] for _ in range(count)]
+    for i, targets in enumerate(connections):
+        for name in targets:
+            if name not in number_of:
+                raise ValueError(f"{source}: {names[i].decode()!r} connects to unknown location {name!r}")
+            into[number_of[name]].append(i)
+    gates = sorted({item for item in requires if item})
+    if len(gates) > MAX_GATES:
+        raise ValueError(f"{source}: more than {MAX_GATES} different gate items")
+    gate_bit = {item: 1 << bit for bit, item in enumerate(gates)}
+    order = sorted(range(count), key=names.__getitem__)
+
+    tables = HEADER.size + 8 * (6 * count + 4)
+    offsets = []
+    position = tables
+    for blobs in (names, records, art):
+        table = [position]
+        for blob in blobs:
+            position += len(blob)
+            table.append(position)
+        offsets.append(table)
+    gate_list = json.dumps(gates).encode()
+    position += len(gate_list)
+    into_offsets = [position]
+    for sources in into:
+        position += 4 * len(sources)
+        into_offsets.append(position)
+
+    stat = os.stat(source)
+    partial = f"{target}.{os.getpid()}.tmp"
+    with open(partial, "wb") as f:
+        f.write(HEADER.pack(MAGIC, count, stat.st_size, stat.st_mtime_ns))
+        for table in offsets:
+            f.write(struct.pack(f"<{count + 1}Q", *table))
+        f.write(struct.pack(f"<{count}Q", *order))
+        f.write(struct.pack(f"<{count}Q", *(gate_bit.get(item, 0) for item in requires)))
+        f.write(struct.pack(f"<{count + 1}Q", *into_offsets))
+        for blobs in (names, records, art):
+            f.writelines(blobs)
+        f.write(gate_list)
+        for sources in into:
+            f.write(struct.pack(f"<{len(sources)}I", *sources))
+    # Readers either see the old file or the finished new one.
+    os.replace(partial, target)
+
+class MappedWorld:
+    """A compiled world file, decoded a location at a time as sessions reach it."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, _, _ = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a compiled world file")
+        view = memoryview(self._map)
+        tables = []
+        position = HEADER.size
+        for length in (self._count + 1,) * 3 + (self._count,) * 2 + (self._count + 1,):
+            tables.append(view[position:position + 8 * length].cast("Q"))
+            position += 8 * length
+        self._names, self._records, self._art, self._order, self.gate_bits, self._into = tables
+        self._view = view
+        self._index: Dict[str, int] = {}
+        self._loaded: Dict[int, Location] = {}
+
+    def _name(self, i: int) -> bytes:
+        return self._map[self._names[i]:self._names[i + 1]]
+
+    def _find(self, name: str) -> int:
+        i = self._index.get(name)
+        if i is None:
+            key = name.encode()
+            lo, hi = 0, self._count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self._name(self._order[mid]) < key:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo == self._count or self._name(self._order[lo]) != key:
+                return -1
+            i = self._index[name] = self._order[lo]
+        return i
+
+    def __contains__(self, name: str) -> bool:
+        return self._find(name) >= 0
+
+    def __getitem__(self, name: str) -> Location:
+        i = self._find(name)
+        if i < 0:
+            raise KeyError(name)
+        location = self._loaded.get(i)
+        if location is None:
+            description, connections, items, enemies, requires = json.loads(
+                self._map[self._records[i]:self._records[i + 1]])
+            location = self._loaded[i] = Location(
+                description, tuple(connections), tuple(items), tuple(enemies), requires)
+        return location
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._count):
+            yield self._name(i).decode()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def session(self) -> WorldState:
+        return WorldState(self)
+
+    # Routing straight off the tables: locations by number, each with its gate bit and the
+    # numbers of the locations that connect to it.
+
+    def gates(self) -> Dict[str, int]:
+        """Gate items and their bits."""
+        gates = json.loads(self._map[self._art[self._count]:self._into[0]])
+        return {item: 1 << bit for bit, item in enumerate(gates)}
+
+    def number(self, name: str) -> int:
+        """The location's number, or -1 if there's no such location."""
+        return self._find(name)
+
+    def name(self, i: int) -> str:
+        return self._name(i).decode()
+
+    def sources(self, i: int) -> memoryview:
+        return self._view[self._into[i]:self._into[i + 1]].cast("I")
+
+    def art(self, name: str) -> Optional[str]:
+        i = self._find(name)
+        if i < 0 or self._art[i] == self._art[i + 1]:
+            return None
+        return self._map[self._art[i]:self._art[i + 1]].decode()
+
+def is_fresh(source: str, target: str) -> bool:
+    try:
+        with open(target, "rb") as f:
+            magic, _, size, mtime_ns = HEADER.unpack(f.read(HEADER.size))
+    except (OSError, struct.error):
+        return False
+    stat = os.stat(source)
+    return magic == MAGIC and (size, mtime_ns) == (stat.st_size, stat.st_mtime_ns)
+
+def load_world(path: str, cache: Optional[str] = None) -> MappedWorld:
+    """Open a world from JSON Lines source (compiled next to it on first use) or a compiled file."""
+    if path.endswith(".jsonl"):
+        cache = cache or path[:-len(".jsonl")] + ".world"
+        if not is_fresh(path, cache):
+            compile_world(path, cache)
+        path = cache
+    return MappedWorld(path)
+
+def export_world(world, target: str):
+    with open(target, "w", encoding="utf-8") as f:
+        for name in world:
+            location = world[name]
+            record = {"location": name, **location._asdict()}
+            if world.art(name):
+                record["art"] = world.art(name)
+            f.write(json.dumps(record) + "\n")
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    import tempfile
+    import time
+
+    parser = argparse.ArgumentParser(description="Compare cold start of an in-memory and a compiled world.")
+    parser.add_argument("--locations", type=int, default=100000)
+    parser.add_argument("--visits", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    names = [f"loc_{i}" for i in range(args.locations)]
+    data = {name: {"description": f"A place numbered {i}. " * 8,
+                   "connections": [names[rng.randrange(max(1, i))]] if i else [],
+                   "items": [], "enemies": [], "art": "~~~~\n" * 6}
+            for i, name in enumerate(names)}
+    visits = rng.sample(names, min(args.visits, len(names)))
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "world.jsonl")
+        started = time.perf_counter()
+        world = World(data)
+        eager = time.perf_counter() - started
+        export_world(world, source)
+
+        started = time.perf_counter()
+        load_world(source)
+        compiled = time.perf_counter() - started
+
+        started = time.perf_counter()
+        mapped = load_world(source)
+        opened = time.perf_counter() - started
+        started = time.perf_counter()
+        for name in visits:
+            mapped[name], mapped.art(name)
+        visited = (time.perf_counter() - started) / len(visits)
+        assert all(mapped[name] == world[name] and mapped.art(name) == world.art(name) for name in names[:1000])
+
+    print(f"in-memory build: {eager * 1000:.1f} ms")
+    print(f"compile: {compiled * 1000:.1f} ms (once per source change)")
+    print(f"open compiled: {opened * 1000:.2f} ms")
+    print(f"first visit: {visited * 1e6:.1f} us per location")
@@ -0,0 +1,248 @@
+import json
+from typing import Dict, Iterator, List, Set, Tuple
+
+# Every connection joins locations at most this many places apart in generation order, so
+# a location's record is complete once the generator is that far past it.
+WINDOW = 32
+# Percent of locations with a second path back, which makes loops instead of a plain tree.
+LOOP_PERCENT = 30
+ITEM_PERCENT = 12
+ENEMY_PERCENT = 35
+
+START, SHOP, TREASURE_ROOM = "dock", "market", "treasure_room"
+# Each region's entrance needs the item hidden somewhere in the region before it.
+GATES = ("compass", "treasure_map", "spectral_key")
+
+TERRAIN = {
+    "cove": "A sheltered cove where the tide laps at black sand.",
+    "reef": "Jagged coral breaks the surface, waiting for careless hulls.",
+    "lagoon": "Still green water ringed by leaning palms.",
+    "wreck": "The ribs of a long-sunk galleon rise from the shallows.",
+    "cliffs": "Sea birds wheel around white cliffs battered by surf.",
+    "grotto": "Water drips from the roof of a glowing sea cave.",
+    "village": "Fishermen mend nets and eye strangers warily.",
+    "fort": "A crumbling fort whose cannons still point out to sea.",
+    "swamp": "Mangrove roots tangle over brackish, sucking mud.",
+    "shoals": "Sandbars shift beneath a thin skin of water.",
+}
+TERRAIN_NAMES = tuple(TERRAIN)
+MOODS = ("The wind carries the smell of salt.", "Something moves just out of sight.",
+         "Gulls cry overhead.", "An eerie quiet hangs over everything.",
+         "Old footprints lead off in several directions.", "Distant thunder rolls across the water.")
+
+# Per region: items that may lie around, and enemies that may lurk.
+REGION_ITEMS = (
+    ("small_potion", "small_potion", "rusty_sword", "medium_potion"),
+    ("medium_potion", "small_potion", "steel_sword", "ghost_essence"),
+    ("large_potion", "medium_potion", "magic_cutlass", "ocean_pearl", "kraken_tentacle"),
+)
+REGION_ENEMIES = (
+    ("rookie_pirate", "rookie_pirate", "seasoned_pirate"),
+    ("seasoned_pirate", "ghost_pirate"),
+    ("ghost_pirate", "pirate_captain", "kraken_spawn"),
+)
+
+MASK = (1 << 64) - 1
+
+def _mix(x: int) -> int:
+    # splitmix64: a location's every choice is a pure function of (seed, index), so any part
+    # of the world can be generated without the rest.
+    x = (x + 0x9E3779B97F4A7C15) & MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK
+    return x ^ (x >> 31)
+
+class Generator:
+    """A seeded world of `size` locations: three gated regions and the treasure room.
+
+    Region 0 starts at the dock and holds the compass; region 1 is entered through a location
+    that needs the compass and holds the treasure map; region 2 needs the map and holds the
+    spectral key; the treasure room needs the key. Paths only ever lead back into the same
+    region, except each region's entrance, so the gates can't be walked around.
+    """
+
+    def __init__(self, size: int, seed: int = 0):
+        if size < 10:
+            raise ValueError("a generated world needs at least 10 locations")
+        self.size = size
+        self.seed = seed
+        # Location 0 is the dock, 1 the market and size - 1 the treasure room.
+        inner = size - 1
+        self.starts = (0, inner // 3, 2 * inner // 3, inner)
+        self.gate_items: Dict[int, str] = {}
+        for region, item in enumerate(GATES):
+            start, end = self.starts[region], self.starts[region + 1]
+            # Not on the dock or the market, so it has to be found.
+            low = start + 2 if region == 0 else start
+            self.gate_items[low + self._hash(end, 7) % (end - low)] = item
+
+    def _hash(self, i: int, salt: int) -> int:
+        return _mix((self.seed * 0x100000001B3) ^ (i << 4) ^ salt)
+
+    def region(self, i: int) -> int:
+        for region in (3, 2, 1):
+            if i >= self.starts[region]:
+                return region
+        return 0
+
+    def name(self, i: int) -> str:
+        if i == 0:
+            return START
+        if i == 1:
+            return SHOP
+        if i == self.size - 1:
+            return TREASURE_ROOM
+        return f"{TERRAIN_NAMES[self._hash(i, 1) % len(TERRAIN_NAMES)]}_{i}"
+
+    def back_links(self, i: int) -> List[int]:
+        """Locations before `i` that it connects to; every link is recorded from its later end."""
+        if i == 0:
+            return []
+        region = self.region(i)
+        start = self.starts[region]
+        if i == start:
+            # A region's entrance hangs off the end of the region before it.
+            before = start - self.starts[region - 1]
+            return [start - 1 - self._hash(i, 2) % min(WINDOW, before)]
+        reach = min(WINDOW, i - start)
+        links = [i - 1 - self._hash(i, 2) % reach]
+        if reach > 1 and self._hash(i, 3) % 100 < LOOP_PERCENT:
+            extra = i - 1 - self._hash(i, 4) % reach
+            if extra != links[0]:
+                links.append(extra)
+        return links
+
+    def details(self, i: int, name: str) -> dict:
+        region = self.region(i)
+        record = {"location": name}
+        if i == 0 or i == 1 or i == self.size - 1:
+            record["description"] = {
+                START: "A bustling port at the edge of uncharted waters.",
+                SHOP: "Traders hawk supplies to captains bound for the unknown.",
+                TREASURE_ROOM: "A grand chamber filled with unimaginable riches.",
+            }[name]
+        else:
+            terrain = name.rsplit("_", 1)[0]
+            record["description"] = f"{TERRAIN[terrain]} {MOODS[self._hash(i, 5) % len(MOODS)]}"
+        items: List[str] = []
+        enemies: List[str] = []
+        if i == self.size - 1:
+            items.append("treasure")
+        elif i > 1:
+            if i in self.gate_items:
+                items.append(self.gate_items[i])
+            roll = self._hash(i, 6)
+            if roll % 100 < ITEM_PERCENT:
+                pool = REGION_ITEMS[region]
+                items.append(pool[(roll >> 8) % len(pool)])
+            if (roll >> 16) % 100 < ENEMY_PERCENT:
+                pool = REGION_ENEMIES[region]
+                enemies.append(pool[(roll >> 24) % len(pool)])
+        record["items"] = items
+        record["enemies"] = enemies
+        if i == self.starts[region] and region:
+            record["requires"] = GATES[region - 1]
+        return record
+
+    def __iter__(self) -> Iterator[dict]:
+        """Location records in generation order, holding at most WINDOW of them at a time."""
+        names: Dict[int, str] = {}
+        pending: Dict[int, List[str]] = {}
+        for i in range(self.size + WINDOW):
+            if i < self.size:
+                name = names[i] = self.name(i)
+                links = self.back_links(i)
+                pending[i] = [names[j] for j in links]
+                for j in links:
+                    pending[j].append(name)
+            done = i - WINDOW
+            if done >= 0:
+                record = self.details(done, names.pop(done))
+                record["connections"] = pending.pop(done)
+                yield record
+
+def write_world(target: str, size: int, seed: int = 0, chunk: int = 4096) -> int:
+    """Stream a generated world to a JSON Lines file, `chunk` records per write."""
+    lines: List[str] = []
+    count = 0
+    with open(target, "w", encoding="utf-8") as f:
+        for record in Generator(size, seed):
+            lines.append(json.dumps(record, separators=(",", ":")) + "\n")
+            if len(lines) >= chunk:
+                f.writelines(lines)
+                count += len(lines)
+                lines.clear()
+        f.writelines(lines)
+        count += len(lines)
+    return count
+
+def treasure_reachable(world, start: str = START) -> Tuple[bool, Set[str]]:
+    """Explore from `start`, picking up every gate item found, until nothing new opens up.
+
+    Returns whether the treasure room was reached and the gate items collected on the way.
+    """
+    held: Set[str] = set()
+    seen = {start}
+    explored: Set[str] = set()
+    blocked: Dict[str, List[str]] = {}
+    frontier = [start]
+    while frontier:
+        name = frontier.pop()
+        explored.add(name)
+        location = world[name]
+        for item in location.items:
+            if item in GATES and item not in held:
+                held.add(item)
+                # Everything waiting on this item can now be explored.
+                for waiting in blocked.pop(item, ()):
+                    frontier.append(waiting)
+        for neighbour in location.connections:
+            if neighbour in seen:
+                continue
+            seen.add(neighbour)
+            requires = world[neighbour].requires
+            if requires and requires not in held:
+                blocked.setdefault(requires, []).append(neighbour)
+            else:
+                frontier.append(neighbour)
+    return TREASURE_ROOM in explored, held
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import time
+    import tracemalloc
+
+    from world import load_world
+
+    parser = argparse.ArgumentParser(description="Generate a gated world as JSON Lines and report generation rate.")
+    parser.add_argument("target")
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", action="store_true", help="compile the world and verify the treasure is reachable")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="also report peak memory while generating (slows generation several times)")
+    args = parser.parse_args()
+
+    if args.trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    count = write_world(args.target, args.size, args.seed)
+    elapsed = time.perf_counter() - started
+    report = {
+        "locations": count,
+        "seconds": round(elapsed, 3),
+        "locations_per_sec": round(count / elapsed),
+        "file_mb": round(os.path.getsize(args.target) / 1e6, 1),
+    }
+    if args.trace_memory:
+        report["peak_memory_kb"] = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+    if args.check:
+        world = load_world(args.target)
+        reachable, held = treasure_reachable(world)
+        report["treasure_reachable"] = reachable
+        report["gate_items_found"] = sorted(held)
+    print(json.dumps(report, indent=2))
+    if args.check and not report["treasure_reachable"]:
+        raise SystemExit(1)